@@ -22,19 +22,11 @@ class AreaReward(Reward):
         -------
         float
             The fraction of bin area covered by objects already in the bin.
+            O(1), from the running totals of placed area of the states.
 
         """
         bin_area = state.bin.area
-        old_objects_area, new_objects_area = 0, 0
-        for obj in state.objects:
-            old_objects_area += obj.polygon.area
-        for obj in next_state.objects:
-            new_objects_area += obj.polygon.area
-        print("\nState objects = " + str(state.objects))
-        print("\nNext state objects = " + str(next_state.objects))
-        print("\nOld objects area = " + str(old_objects_area))
-        print("\nNew objects area = " + str(new_objects_area))
-        print("\nBin area = " + str(bin_area))
+        old_objects_area = state.placed_area()
+        new_objects_area = next_state.placed_area()
         result = float(new_objects_area - old_objects_area)/float(bin_area)
-        print("\nresult = " + str(result))
         return result
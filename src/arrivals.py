@@ -0,0 +1,219 @@
+import json
+import queue
+import threading
+from shape_generator import *
+
+class ArrivalQueue:
+    """This class is the sequence of objects arriving at a bin (ie. on a conveyor),
+    drawn on demand from a source iterator. Arrivals are addressed by position, and
+    an arrival never changes once it has been drawn, so states can branch and share
+    one queue: each State only remembers its own position in it.
+    An arrival queue contains:
+    1) a source iterator of PlacementObjects (ie. an ObjectStream, a ReplaySource,
+       a PrefetchingSource or any generator)
+    2) the size of the lookahead window exposed to policies
+    3) the objects drawn from the source so far
+
+    """
+
+    def __init__(self, source, lookahead=1):
+        """Initializes an arrival queue, given a source and a lookahead window.
+
+        Parameters
+        ----------
+        source      : iterator
+            Iterator of PlacementObjects, in order of arrival
+        lookahead   : int, optional
+            Number of arrivals after the next object that policies may see, 1 by default
+
+        Returns
+        -------
+        ArrivalQueue
+            An instance of ArrivalQueue with the above parameters
+
+        """
+        self.source = iter(source)
+        self.lookahead = lookahead
+        self.objects = []
+        self.offset = 0     # position of self.objects[0]
+        self._lock = threading.Lock()
+
+    def get(self, position):
+        """Returns the arrival at a position, drawing from the source if needed.
+
+        Parameters
+        ----------
+        position    : int
+            Position of the arrival, starting at 0
+
+        Returns
+        -------
+        PlacementObject
+            The arrival at that position, or None if the source ran out before it
+
+        """
+        with self._lock:
+            if position < self.offset:
+                raise IndexError("arrival %d was released" % position)
+            while position - self.offset >= len(self.objects):
+                try:
+                    self.objects.append(next(self.source))
+                except StopIteration:
+                    return None
+            return self.objects[position - self.offset]
+
+    def peek(self, position, count=None):
+        """Returns the arrivals in the lookahead window after a position.
+
+        Parameters
+        ----------
+        position    : int
+            Position of the current next object
+        count       : int, optional
+            Size of the window, self.lookahead by default
+
+        Returns
+        -------
+        list
+            Up to `count` PlacementObjects arriving after the one at `position`
+
+        """
+        if count is None:
+            count = self.lookahead
+        upcoming = []
+        for i in range(position + 1, position + 1 + count):
+            obj = self.get(i)
+            if obj is None:
+                break
+            upcoming.append(obj)
+        return upcoming
+
+    def release(self, position):
+        """Frees the arrivals before a position, once no state will go back to them,
+        so that long-running queues do not grow without bound. rollout calls it
+        as the episode advances; getting a released arrival raises IndexError.
+
+        Parameters
+        ----------
+        position    : int
+            Position of the earliest arrival that is still needed
+
+        """
+        with self._lock:
+            drop = min(max(position - self.offset, 0), len(self.objects))
+            del self.objects[:drop]
+            self.offset += drop
+
+class ReplaySource:
+    """This class replays a recorded sequence of arrivals from a file with one JSON
+    object per line, of the form {"points": [[x, y], ...], "type": "random"}, where
+    the points are the original, un-transformed exterior ring of the object. See
+    write_replay for writing such files.
+    """
+
+    def __init__(self, path):
+        """Initializes a replay of the file at the given path.
+
+        Parameters
+        ----------
+        path    : str
+            Path of the replay file
+
+        Returns
+        -------
+        ReplaySource
+            An instance of ReplaySource with the above parameters
+
+        """
+        self.path = path
+
+    def __iter__(self):
+        with open(self.path) as f:
+            for line in f:
+                if line.strip() == "":
+                    continue
+                record = json.loads(line)
+                obj = PlacementObject.__new__(PlacementObject)
+                obj._init_points(np.array(record["points"], dtype=float), np.eye(3), record.get("type", "random"))
+                yield obj
+
+def write_replay(path, objects):
+    """Writes a sequence of arrivals to a replay file (see ReplaySource).
+
+    Parameters
+    ----------
+    path    : str
+        Path of the replay file
+    objects : iterable
+        PlacementObjects in order of arrival
+
+    """
+    with open(path, "w") as f:
+        for obj in objects:
+            f.write(json.dumps({"points": obj.points.tolist(), "type": obj.type}) + "\n")
+
+class PrefetchingSource:
+    """This class draws objects from another source on a background producer thread,
+    ahead of time, so that object generation and validation happen off the
+    simulation's critical path. Objects with invalid polygons are dropped by the
+    producer, and the polygons of the others are already built when handed out.
+    If the wrapped source raises an exception, it is raised again to the consumer
+    once the objects produced before it have been handed out.
+    """
+
+    _END = object()
+
+    def __init__(self, source, buffer_size=1024):
+        """Initializes a prefetching source and starts its producer thread.
+
+        Parameters
+        ----------
+        source      : iterator
+            Iterator of PlacementObjects
+        buffer_size : int, optional
+            Maximum number of objects produced ahead of time, 1024 by default
+
+        Returns
+        -------
+        PrefetchingSource
+            An instance of PrefetchingSource with the above parameters
+
+        """
+        self.source = iter(source)
+        self.buffer = queue.Queue(buffer_size)
+        self.thread = threading.Thread(target=self._produce, daemon=True)
+        self.thread.start()
+
+    def _produce(self):
+        """Producer loop: draws, validates and buffers objects until the source ends
+        or raises.
+        """
+        try:
+            for obj in self.source:
+                if obj.polygon.is_valid:
+                    self.buffer.put(obj)
+        except Exception as error:
+            self.buffer.put(_ProducerError(error))
+        else:
+            self.buffer.put(PrefetchingSource._END)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        obj = self.buffer.get()
+        if obj is PrefetchingSource._END:
+            self.buffer.put(obj)
+            raise StopIteration
+        if isinstance(obj, _ProducerError):
+            # Every later call raises the same error
+            self.buffer.put(obj)
+            raise obj.error
+        return obj
+
+class _ProducerError:
+    """Sentinel carrying an exception from a PrefetchingSource's producer thread.
+    """
+
+    def __init__(self, error):
+        self.error = error
@@ -0,0 +1,229 @@
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import shapely
+from rollout_runner import *
+from constant_reward import *
+from skyline_policy import *
+
+# (bin side length, number of objects placed in the bin) for each bin size
+SIZES = {
+    "small": (10, 16),
+    "medium": (20, 64),
+    "large": (40, 256),
+}
+
+def measure(function, min_time=0.2, min_calls=3):
+    """Calls a function repeatedly, for at least min_time seconds and min_calls
+    calls, and measures its throughput.
+
+    Parameters
+    ----------
+    function    : callable
+        Function to measure, called without arguments
+    min_time    : float, optional
+        Minimum total time in seconds, 0.2 by default
+    min_calls   : int, optional
+        Minimum number of calls, 3 by default
+
+    Returns
+    -------
+    dict
+        The number of calls, total seconds, calls per second and mean milliseconds per call
+
+    """
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        function()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time and calls >= min_calls:
+            break
+    return {"calls": calls, "seconds": elapsed, "per_second": calls / elapsed,
+            "mean_ms": 1000.0 * elapsed / calls}
+
+def filled_state(bin_size, num_objects, rng):
+    """Builds a state whose bin holds num_objects non-overlapping random rectangles,
+    one per cell of a square grid over the bin.
+
+    Parameters
+    ----------
+    bin_size    : int
+        Side length of the square bin
+    num_objects : int
+        Number of objects to place, a square number
+    rng         : numpy.random.Generator
+        Random number generator
+
+    Returns
+    -------
+    State
+        A state with the placed objects and a random next object
+
+    """
+    bin = Rectangle(bin_size, bin_size, np.eye(3))
+    per_side = int(round(math.sqrt(num_objects)))
+    cell = bin_size / per_side
+    objects = []
+    for i in range(per_side):
+        for j in range(per_side):
+            length, width = rng.uniform(0.3 * cell, 0.9 * cell, 2)
+            transform = np.array([[1, 0, -bin_size/2 + (i + 0.5) * cell],
+                                  [0, 1, -bin_size/2 + (j + 0.5) * cell],
+                                  [0, 0, 1]])
+            objects.append(Rectangle(length, width, transform))
+    return State(bin, objects, Rectangle.get_random(1, max(2, int(cell)), rng))
+
+def benchmark_size(name, bin_size, num_objects, seed, min_time):
+    """Measures the geometry hot paths on a bin of the given size.
+
+    Parameters
+    ----------
+    name        : str
+        Name of the bin size
+    bin_size    : int
+        Side length of the square bin
+    num_objects : int
+        Number of objects placed in the bin
+    seed        : int
+        Seed of the random number generators
+    min_time    : float
+        Minimum time in seconds spent measuring each function
+
+    Returns
+    -------
+    dict
+        Throughput of every measured function, and the peak memory used to
+        build the state
+
+    """
+    rng = seed_default_rng(seed)
+    tracemalloc.start()
+    state = filled_state(bin_size, num_objects, rng)
+    state.query_indices((-math.inf, -math.inf, math.inf, math.inf))
+    state_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    rows_policy = RowsPolicy(bin_size, bin_size)
+    random_policy = RandomPolicy(bin_size, bin_size)
+    skyline_policy = SkylinePolicy(bin_size, bin_size)
+    transition = Transition()
+    termination = Termination()
+    objA, objB = state.objects[0], state.objects[1]
+    action = random_policy.get_action(state)
+
+    def done_incremental():
+        state.num_validated = len(state.objects) - 1
+        termination.done(state)
+
+    results = {
+        "bin_size": bin_size,
+        "num_objects": num_objects,
+        "state_peak_memory_bytes": state_memory,
+        "RowsPolicy.get_action": measure(lambda: rows_policy.get_action(state), min_time),
+        "RandomPolicy.get_action": measure(lambda: random_policy.get_action(state), min_time),
+        "SkylinePolicy.get_action": measure(lambda: skyline_policy.get_action(state), min_time),
+        "Transition.execute_action": measure(lambda: transition.execute_action(state, action), min_time),
+        "Termination.done": measure(done_incremental, min_time),
+        "Termination.done(revalidate)": measure(lambda: termination.done(state, revalidate=True), min_time),
+        "utils.intersecting": measure(lambda: intersecting(objA, objB), min_time),
+        "HeatMap.generate_batch": measure(lambda: HeatMap().generate_batch(state, 36), min_time, 1),
+    }
+    if name == "small":
+        # The unbatched heatmap runs a full transition per grid cell, so it is only
+        # measured on the small bin, with a single rotation
+        try:
+            import matplotlib
+            matplotlib.use("Agg")
+            results["HeatMap.generate"] = measure(lambda: HeatMap().generate(state, transition, ConstantReward(), 1), min_time, 1)
+        except ImportError:
+            results["HeatMap.generate"] = None
+    return results
+
+def benchmark_episodes(bin_size, num_episodes, seed):
+    """Measures full RowsPolicy episodes on a square bin, in this process.
+
+    Parameters
+    ----------
+    bin_size        : int
+        Side length of the square bin
+    num_episodes    : int
+        Number of episodes to run
+    seed            : int
+        Base seed of the episodes
+
+    Returns
+    -------
+    dict
+        Steps per second, episodes per second and the peak memory of the episodes
+
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    steps = 0
+    for result in run_episodes(num_episodes, bin_length=bin_size, bin_width=bin_size, seed=seed, processes=1):
+        steps += result["steps"]
+    elapsed = time.perf_counter() - start
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"episodes": num_episodes, "steps": steps, "seconds": elapsed,
+            "steps_per_second": steps / elapsed, "episodes_per_second": num_episodes / elapsed,
+            "peak_memory_bytes": peak_memory}
+
+def run(seed=0, min_time=0.2, num_episodes=20, sizes=SIZES):
+    """Runs the whole benchmark suite.
+
+    Parameters
+    ----------
+    seed            : int, optional
+        Seed of the random number generators, 0 by default
+    min_time        : float, optional
+        Minimum time in seconds spent measuring each function, 0.2 by default
+    num_episodes    : int, optional
+        Number of episodes to run per bin size, 20 by default
+    sizes           : dict, optional
+        Maps the name of each bin size to (bin side length, number of objects)
+
+    Returns
+    -------
+    dict
+        Machine readable benchmark results, with the versions of the libraries used
+
+    """
+    results = {
+        "seed": seed,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "shapely": shapely.__version__,
+        "sizes": {},
+    }
+    for name, (bin_size, num_objects) in sizes.items():
+        results["sizes"][name] = benchmark_size(name, bin_size, num_objects, seed, min_time)
+        results["sizes"][name]["episodes"] = benchmark_episodes(bin_size, num_episodes, seed)
+    return results
+
+def main():
+    """Runs the benchmark suite from the command line and writes the results as JSON.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the bin placing policies and geometry hot paths.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--episodes", type=int, default=20)
+    parser.add_argument("--sizes", nargs="+", choices=sorted(SIZES), default=list(SIZES))
+    parser.add_argument("--output", default=None, help="JSON file to write (stdout by default)")
+    args = parser.parse_args()
+
+    results = run(args.seed, args.min_time, args.episodes, {name: SIZES[name] for name in args.sizes})
+    if args.output is None:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__": main()
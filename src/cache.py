@@ -0,0 +1,99 @@
+from collections import OrderedDict
+
+class LRUCache:
+    """This class is a bounded mapping which evicts its least recently used entry
+    once it is full, so that memoizing over a long run uses a constant amount of
+    memory. Keys should describe the content of what is cached (ie. a
+    State.digest()), not the identity of an object.
+    An LRU cache contains:
+    1) the maximum number of entries
+    2) the entries, from least to most recently used
+    3) counters of the hits and misses of get()
+
+    """
+
+    def __init__(self, maxsize=1024):
+        """Initializes an empty cache, given its size bound.
+
+        Parameters
+        ----------
+        maxsize : int, optional
+            Maximum number of entries, 1024 by default
+
+        Returns
+        -------
+        LRUCache
+            An instance of LRUCache with the above parameters
+
+        """
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def get(self, key, default=None):
+        """Returns the value cached for a key, and marks it as the most recently used.
+
+        Parameters
+        ----------
+        key     : hashable
+            Key of the entry
+        default : optional
+            Value returned when the key is not cached, None by default
+
+        Returns
+        -------
+        object
+            The cached value, or default
+
+        """
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        self.misses += 1
+        return default
+
+    def put(self, key, value):
+        """Caches a value for a key, evicting the least recently used entry if the
+        cache is full.
+
+        Parameters
+        ----------
+        key     : hashable
+            Key of the entry
+        value   : object
+            Value to cache
+
+        """
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """Removes every entry and resets the counters.
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """Returns the counters of this cache.
+
+        Returns
+        -------
+        dict
+            The number of hits, misses, entries and the maximum number of entries,
+            and the hit rate (0 if the cache was never read)
+
+        """
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.entries),
+                "maxsize": self.maxsize, "hit_rate": self.hits / lookups if lookups > 0 else 0.0}
@@ -0,0 +1,195 @@
+from utils import *
+
+def is_convex(ring, tol=1e-9):
+    """Checks whether a closed ring of points is the exterior of a convex polygon.
+    Repeated points (ie. padding) and collinear points are allowed.
+
+    Parameters
+    ----------
+    ring    : numpy array (V,2)
+        Closed exterior ring (first point == last point)
+    tol     : float, optional
+        Tolerance on the cross products of consecutive edges
+
+    Returns
+    -------
+    bool
+        True if the polygon is convex
+
+    """
+    edges = np.diff(np.asarray(ring, dtype=float), axis=0)
+    edges = edges[np.any(np.abs(edges) > tol, axis=1)]
+    if len(edges) < 3:
+        return False
+    following = np.roll(edges, -1, axis=0)
+    cross = edges[:, 0] * following[:, 1] - edges[:, 1] * following[:, 0]
+    if not (np.all(cross >= -tol) or np.all(cross <= tol)):
+        return False
+    # Convex rings turn around exactly once
+    angles = np.arctan2(cross, np.sum(edges * following, axis=1))
+    return bool(abs(abs(np.sum(angles)) - 2*np.pi) < 0.001)
+
+def is_convex_many(rings, tol=1e-9):
+    """Checks which of several padded rings are convex, in one batched pass (see
+    is_convex).
+
+    Parameters
+    ----------
+    rings   : numpy array (N,V,2)
+        Closed exterior rings, which may be padded with repeated points
+    tol     : float, optional
+        Tolerance on the cross products of consecutive edges
+
+    Returns
+    -------
+    numpy array (N,) of bool
+        True where the polygon is convex
+
+    """
+    edges = np.diff(np.asarray(rings, dtype=float), axis=1)
+    nonzero = np.any(np.abs(edges) > tol, axis=2)
+    # Move the non-zero edges to the front, so that each is followed by the next one
+    order = np.argsort(~nonzero, axis=1, kind="stable")
+    edges = np.take_along_axis(edges, order[..., None], axis=1)
+    counts = np.count_nonzero(nonzero, axis=1)
+    positions = np.arange(edges.shape[1])[None, :]
+    following = np.take_along_axis(edges, ((positions + 1) % np.maximum(counts, 1)[:, None])[..., None], axis=1)
+    valid = positions < counts[:, None]
+    cross = edges[..., 0] * following[..., 1] - edges[..., 1] * following[..., 0]
+    same_turn = np.all((cross >= -tol) | ~valid, axis=1) | np.all((cross <= tol) | ~valid, axis=1)
+    angles = np.where(valid, np.arctan2(cross, np.sum(edges * following, axis=2)), 0)
+    return (counts >= 3) & same_turn & (np.abs(np.abs(np.sum(angles, axis=1)) - 2*np.pi) < 0.001)
+
+def convex_overlap_pairs(ringsA, ringsB, tol=0.0001):
+    """Exact separating axis test for pairs of convex polygons, in one batched pass.
+    Two convex polygons overlap (with positive area) unless their projections on
+    the normal of one of their edges are disjoint. Polygons that only touch do not
+    overlap.
+
+    Parameters
+    ----------
+    ringsA  : numpy array (P,Va,2)
+        Closed exterior rings of the first polygon of every pair. Rings may be
+        padded with repeated points.
+    ringsB  : numpy array (P,Vb,2)
+        Closed exterior rings of the second polygon of every pair, padded likewise
+    tol     : float, optional
+        Projections that overlap by less than this distance are treated as touching
+
+    Returns
+    -------
+    numpy array (P,) of bool
+        True where the two polygons of a pair overlap
+
+    """
+    ringsA = np.asarray(ringsA, dtype=float)
+    ringsB = np.asarray(ringsB, dtype=float)
+    profile_count("separating_axis_tests", len(ringsA))
+    edges = np.concatenate([np.diff(ringsA, axis=1), np.diff(ringsB, axis=1)], axis=1)
+    axes = np.stack([-edges[..., 1], edges[..., 0]], axis=-1)                  # (P,E,2)
+    lengths = np.linalg.norm(axes, axis=-1)                                     # (P,E)
+    projA = np.einsum('pei,pvi->pev', axes, ringsA)
+    projB = np.einsum('pei,pvi->pev', axes, ringsB)
+    depth = np.minimum(projA.max(axis=2), projB.max(axis=2)) - np.maximum(projA.min(axis=2), projB.min(axis=2))
+    # Repeated (padding) points give zero length axes, which never separate anything
+    separated = (lengths > 0) & (depth <= tol * lengths)
+    return ~np.any(separated, axis=1)
+
+def _polygons_overlap(ringA, ringB, tol=0.0001):
+    """Exact overlap test for arbitrary (non-convex) polygons with shapely boolean
+    predicates only: disjoint or touching polygons do not overlap. Like the
+    separating axis test, polygons whose interiors meet by no more than tol are
+    treated as touching, so the overlap must reach deeper than tol into polygonA.
+    """
+    profile_count("shapely_overlap_tests")
+    polygonA, polygonB = Polygon(ringA), Polygon(ringB)
+    if not polygonA.intersects(polygonB) or polygonA.touches(polygonB):
+        return False
+    return polygonA.buffer(-tol).intersects(polygonB)
+
+def overlaps_many(ring, rings, bounds, convex, ring_convex=None, tol=0.0001):
+    """Checks one polygon against many others: a cheap bounding box rejection first,
+    then the exact separating axis test for convex pairs, and shapely for the others.
+
+    Parameters
+    ----------
+    ring        : numpy array (V,2)
+        Closed exterior ring of the polygon
+    rings       : numpy array (M,Vb,2)
+        Closed, padded exterior rings of the other polygons
+    bounds      : numpy array (M,4)
+        Bounding boxes (minx, miny, maxx, maxy) of the other polygons
+    convex      : numpy array (M,) of bool
+        Whether each of the other polygons is convex
+    ring_convex : bool, optional
+        Whether the polygon is convex, computed with is_convex by default
+    tol         : float, optional
+        Overlaps shallower than this distance are treated as touching
+
+    Returns
+    -------
+    numpy array (M,) of bool
+        True where the polygon overlaps the other polygon
+
+    """
+    ring = np.asarray(ring, dtype=float)
+    if ring_convex is None:
+        ring_convex = is_convex(ring)
+    ring_bounds = np.concatenate([ring.min(axis=0), ring.max(axis=0)])
+    result = bounds_overlap(ring_bounds, bounds, tol)[0]
+    candidates = np.flatnonzero(result & convex) if ring_convex else np.array([], dtype=int)
+    if len(candidates) > 0:
+        result[candidates] = convex_overlap_pairs(np.broadcast_to(ring, (len(candidates),) + ring.shape),
+                                                  rings[candidates], tol)
+    others = np.flatnonzero(result & ~convex) if ring_convex else np.flatnonzero(result)
+    for m in others:
+        result[m] = _polygons_overlap(ring, rings[m], tol)
+    return result
+
+def polygons_overlap(ringA, ringB, tol=0.0001):
+    """Checks whether two polygons overlap with positive area (touching polygons do
+    not overlap).
+
+    Parameters
+    ----------
+    ringA   : numpy array (Va,2)
+        Closed exterior ring of the first polygon
+    ringB   : numpy array (Vb,2)
+        Closed exterior ring of the second polygon
+    tol     : float, optional
+        Overlaps shallower than this distance are treated as touching
+
+    Returns
+    -------
+    bool
+        True if the polygons overlap
+
+    """
+    ringB = np.asarray(ringB, dtype=float)
+    bounds = np.concatenate([ringB.min(axis=0), ringB.max(axis=0)])[None, :]
+    return bool(overlaps_many(ringA, ringB[None], bounds, np.array([is_convex(ringB)]), tol=tol)[0])
+
+def contained(ring, container, tol=0.0001):
+    """Checks whether a polygon lies inside a container polygon (ie. the bin). For a
+    convex container, this only needs the polygon's vertices.
+
+    Parameters
+    ----------
+    ring        : numpy array (V,2)
+        Closed exterior ring of the polygon
+    container   : numpy array (C,2)
+        Closed exterior ring of the container
+    tol         : float, optional
+        Distance by which the polygon may stick out of the container
+
+    Returns
+    -------
+    bool
+        True if the polygon is inside the container
+
+    """
+    ring = np.asarray(ring, dtype=float)
+    if is_convex(container):
+        return bool(points_in_convex(ring[None], container, tol)[0])
+    profile_count("shapely_containment_tests")
+    return Polygon(container).buffer(tol).contains(Polygon(ring))
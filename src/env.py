@@ -0,0 +1,190 @@
+from rollout_mdp import *
+
+class ObservationEncoder:
+    """This class encodes States into fixed size NumPy arrays for learning agents.
+    The arrays are allocated once and overwritten by every call to encode, so
+    encoding does not allocate per step (copy the arrays to keep an observation).
+    An observation encoder contains:
+    1) the resolution of the occupancy raster
+    2) the maximum number of points of the next object's padded ring
+    3) the preallocated observation arrays (see encode)
+
+    """
+
+    def __init__(self, bin, resolution=DEFAULT_RESOLUTION, max_points=16):
+        """Initializes an encoder for states of a given bin.
+
+        Parameters
+        ----------
+        bin         : PlacementObject
+            The bin of the encoded states
+        resolution  : float, optional
+            Side length of the cells of the occupancy raster, DEFAULT_RESOLUTION by default
+        max_points  : int, optional
+            Size of the next object's padded ring, 16 by default. Rings with more
+            points are truncated.
+
+        Returns
+        -------
+        ObservationEncoder
+            An instance of ObservationEncoder with the above parameters
+
+        """
+        self.resolution = resolution
+        self.max_points = max_points
+        shape = OccupancyGrid(bin, resolution).mask.shape
+        self.observation = {
+            "occupancy": np.zeros(shape, dtype=np.uint8),
+            "next_vertices": np.zeros((max_points, 2), dtype=np.float32),
+            "next_mask": np.zeros(max_points, dtype=bool),
+        }
+
+    def encode(self, state):
+        """Encodes a state into the preallocated observation arrays.
+
+        Parameters
+        ----------
+        state   : State
+            The state to encode
+
+        Returns
+        -------
+        dict
+            "occupancy": uint8 array (rows, cols), the state's occupancy grid
+            (see State.occupancy), indexed [y][x] from the bin's lower left corner;
+            "next_vertices": float32 array (max_points, 2), the closed exterior ring
+            of the next object, padded by repeating its last point;
+            "next_mask": bool array (max_points,), True for the points of the
+            ring which are not padding
+
+        """
+        observation = self.observation
+        np.copyto(observation["occupancy"], state.occupancy(self.resolution).mask)
+        vertices, mask = observation["next_vertices"], observation["next_mask"]
+        if state.next_object is None:
+            vertices[:] = 0
+            mask[:] = False
+            return observation
+        ring = state.next_object.vertices()[:self.max_points]
+        vertices[:len(ring)] = ring
+        vertices[len(ring):] = ring[-1]
+        mask[:len(ring)] = True
+        mask[len(ring):] = False
+        return observation
+
+class BinPlacingEnv:
+    """This class is a gym-style environment around the MDP classes, with
+    reset(seed) and step(action), so that the simulator can be plugged into
+    training loops. Every episode starts from an empty bin, and objects arrive
+    from the Transition's ObjectStream.
+    An environment contains:
+    1) the bin, reward function and termination of the episodes
+    2) the current State and Transition, and the number of steps taken
+    3) an ObservationEncoder
+    4) the random number generator of the episode, which is the default generator
+       (see random_state) while a step runs, and can be passed to a Policy
+
+    Environments never change the process' default generator, so several of them
+    can run side by side without changing each other's random numbers.
+
+    """
+
+    def __init__(self, bin_length=20, bin_width=20, reward=None, termination=None,
+                 resolution=DEFAULT_RESOLUTION, max_points=16, max_steps=None):
+        """Initializes an environment. Call reset before the first step.
+
+        Parameters
+        ----------
+        bin_length  : int, optional
+            Bin length dimension (x), 20 by default
+        bin_width   : int, optional
+            Bin width dimension (y), 20 by default
+        reward      : Reward, optional
+            Reward function, AreaReward() by default
+        termination : Termination, optional
+            Termination, Termination() by default
+        resolution  : float, optional
+            Cell size of the occupancy raster of the observations, DEFAULT_RESOLUTION by default
+        max_points  : int, optional
+            Size of the next object's padded ring in the observations, 16 by default
+        max_steps   : int, optional
+            Maximum number of steps per episode, unlimited (None) by default
+
+        Returns
+        -------
+        BinPlacingEnv
+            An instance of BinPlacingEnv with the above parameters
+
+        """
+        self.bin = Rectangle(bin_length, bin_width, np.eye(3))
+        self.reward = AreaReward() if reward is None else reward
+        self.termination = Termination() if termination is None else termination
+        self.encoder = ObservationEncoder(self.bin, resolution, max_points)
+        self.max_steps = max_steps
+        self.state = None
+        self.transition = None
+        self.rng = None
+        self.steps = 0
+
+    def reset(self, seed=None):
+        """Starts a new episode from an empty bin.
+
+        Parameters
+        ----------
+        seed    : int or numpy.random.SeedSequence, optional
+            Seed of the episode, fresh entropy (None) by default. It seeds the
+            object generation and the environment's generator (self.rng), so an
+            episode is reproducible from its seed and actions.
+
+        Returns
+        -------
+        dict
+            The observation of the initial state (see ObservationEncoder.encode)
+
+        """
+        transition_rng, self.rng = split_rng(seed, 2)
+        self.transition = Transition(rng=transition_rng)
+        self.state = State(self.bin, [], next(self.transition.object_stream))
+        self.steps = 0
+        return self.encoder.encode(self.state)
+
+    def step(self, action):
+        """Places the next object.
+
+        Parameters
+        ----------
+        action  : Action, numpy array (3,3) or numpy array (3,)
+            An Action, a 3x3 transform applied to the next object, or the
+            (x, y, theta) translation and rotation of the next object
+
+        Returns
+        -------
+        observation : dict
+            The observation of the next state (see ObservationEncoder.encode)
+        reward      : float
+            The reward of the step
+        done        : bool
+            True if the episode is finished
+        info        : dict
+            The fraction of the bin covered by placed objects, the number of
+            placed objects and the number of steps taken
+
+        """
+        if not isinstance(action, Action):
+            action = np.asarray(action, dtype=float)
+            if action.shape == (3,):
+                x, y, theta = action
+                action = np.array([[np.cos(theta), -np.sin(theta), x],
+                                   [np.sin(theta), np.cos(theta), y],
+                                   [0, 0, 1]])
+            action = Action(action, self.state.next_object)
+        with default_rng_scope(self.rng):
+            next_state = self.transition.execute_action(self.state, action)
+            reward = self.reward.get_reward(self.state, action, next_state)
+            done = self.termination.done(next_state)
+        self.state = next_state
+        self.steps += 1
+        done = done or (self.max_steps is not None and self.steps >= self.max_steps)
+        info = {"fill_fraction": next_state.fill_fraction(), "num_objects": len(next_state.objects),
+                "steps": self.steps}
+        return self.encoder.encode(next_state), reward, done, info
@@ -1,7 +1,8 @@
 # Generates a heatmap of possible placements.
 
 from mdp import *
-import matplotlib.pyplot as plt
+
+_logger = get_logger(__name__)
 
 class HeatMap:
     """This is a class to generate a heat map given a state, transition, reward
@@ -35,6 +36,7 @@ class HeatMap:
             Nothing is returned. A heatmap is displayed.
 
         """
+        import matplotlib.pyplot as plt
         for i in range(num_rotations):
             # Get rotation angle
             theta = i * (2*np.pi / num_rotations)
@@ -55,6 +57,199 @@ class HeatMap:
                     # print("\nr = " + str(r))
                     rewards[y + int(state.bin.width/2)][x + int(state.bin.length/2)] = r
 
-            print("\nRewards = " + str(rewards) + "\n")
+            _logger.debug("Rewards = %s", rewards)
             plt.imshow(rewards, cmap='hot', interpolation='nearest')
             plt.show()
+
+    def screen_occupancy(self, state, candidates, feasible):
+        """Rejects the candidate placements on a grid of integer translations whose
+        footprints contain an occupied cell of the state's occupancy grid, and so
+        certainly overlap a placed object. The footprint of each rotation is only
+        rasterized once: when the grid's cell size divides 1, moving a candidate by
+        one unit moves its footprint by a whole number of cells. Otherwise, the
+        candidates are returned unchanged.
+
+        Parameters
+        ----------
+        state       : State
+            Starting state
+        candidates  : numpy array (R,W,L,V,2)
+            Vertices of the candidates, for R rotations, W consecutive integer y
+            translations and L consecutive integer x translations
+        feasible    : numpy array (R,W,L) of bool
+            Which candidates are still feasible
+
+        Returns
+        -------
+        numpy array (R,W,L) of bool
+            The feasible candidates which passed the screening
+
+        """
+        grid = state.occupancy()
+        cells_per_unit = int(round(1 / grid.resolution))
+        if not math.isclose(cells_per_unit * grid.resolution, 1):
+            return feasible
+        feasible = feasible.copy()
+        rows_count, cols_count = grid.mask.shape
+        for r in range(len(candidates)):
+            iy, ix = np.nonzero(feasible[r])
+            rows, cols = grid.footprint(candidates[r, 0, 0])
+            if (len(iy) == 0 or len(rows) == 0):
+                continue
+            rows = rows[None, :] + cells_per_unit * iy[:, None]
+            cols = cols[None, :] + cells_per_unit * ix[:, None]
+            inside = (rows >= 0) & (rows < rows_count) & (cols >= 0) & (cols < cols_count)
+            occupied = grid.mask[np.clip(rows, 0, rows_count - 1), np.clip(cols, 0, cols_count - 1)] & inside
+            hits = np.any(occupied, axis=1)
+            feasible[r, iy[hits], ix[hits]] = False
+        return feasible
+
+    def generate_batch(self, state, num_rotations, display=False):
+        """Generates a heat map of feasible placements in one batched pass instead
+        of running a transition per grid cell:
+        1) Stack the transforms for every rotation and every grid location
+        2) Transform the next object's vertices by all of them at once
+        3) Check containment in the bin for all candidates at once
+        4) Reject candidates which cover an occupied cell of the state's
+           occupancy grid, with array indexing alone
+        5) Reject overlaps with placed objects by comparing bounding boxes in
+           bulk, and run exact overlap tests (see collision) only on the
+           remaining pairs
+
+        Parameters
+        ----------
+        state           : State
+            Starting state
+        num_rotations   : int
+            Number of rotations of the target object to consider
+        display         : bool, optional
+            Default False, flag for whether to display each rotation's heatmap
+
+        Returns
+        -------
+        numpy array (num_rotations, bin width, bin length)
+            1.0 where the next object, placed at that grid location with that
+            rotation, lies inside the bin without overlapping any placed
+            object, and 0.0 otherwise. Indexed like the rewards matrix in
+            generate, ie. [rotation][y + width/2][x + length/2].
+
+        """
+        length, width = int(state.bin.length), int(state.bin.width)
+        points = np.array(state.next_object.polygon.exterior.coords)
+        current_pos = state.next_object.get_transform()[:2,2]
+        thetas = np.arange(num_rotations) * (2*np.pi / num_rotations)
+        xs = np.arange(int(-length/2), int(-length/2) + length)
+        ys = np.arange(int(-width/2), int(-width/2) + width)
+        transforms = grid_transforms(thetas, xs - current_pos[0], ys - current_pos[1])
+        candidates = transform_points(points, transforms.reshape(-1, 3, 3))
+
+        # Containment in the (convex) bin only depends on the vertices
+        feasible = points_in_convex(candidates, np.array(state.bin.polygon.exterior.coords))
+
+        if len(state.objects) > 0:
+            feasible = self.screen_occupancy(state, candidates.reshape(num_rotations, len(ys), len(xs), -1, 2),
+                                             feasible.reshape(num_rotations, len(ys), len(xs))).ravel()
+
+        # Cheap bounding box rejection against every placed object
+        if len(state.objects) > 0:
+            candidate_bounds = np.concatenate([candidates.min(axis=1), candidates.max(axis=1)], axis=1)
+            object_bounds = state.objects.all_bounds()
+            maybe_overlapping = bounds_overlap(candidate_bounds, object_bounds) & feasible[:, None]
+            # Exact tests only where the bounding boxes overlap: one batched separating
+            # axis test for the convex pairs, and shapely for the others
+            pairs_n, pairs_m = np.nonzero(maybe_overlapping)
+            objects_convex = state.objects.convex(pairs_m) & is_convex(points)
+            unique_m, inverse = np.unique(pairs_m, return_inverse=True)
+            rings = state.objects.padded_vertices(unique_m)
+            convex_pairs = np.flatnonzero(objects_convex)
+            for chunk in range(0, len(convex_pairs), 4096):
+                pairs = convex_pairs[chunk:chunk + 4096]
+                overlapping = convex_overlap_pairs(candidates[pairs_n[pairs]], rings[inverse[pairs]])
+                feasible[pairs_n[pairs[overlapping]]] = False
+            for pair in np.flatnonzero(~objects_convex):
+                if feasible[pairs_n[pair]] and polygons_overlap(candidates[pairs_n[pair]], rings[inverse[pair]]):
+                    feasible[pairs_n[pair]] = False
+
+        rewards = feasible.reshape(num_rotations, len(ys), len(xs)).astype(float)
+        if display:
+            import matplotlib.pyplot as plt
+            for i in range(num_rotations):
+                plt.imshow(rewards[i], cmap='hot', interpolation='nearest')
+                plt.show()
+        return rewards
+
+    def generate_fft(self, state, num_rotations, resolution=DEFAULT_RESOLUTION, display=False):
+        """Generates an approximate heat map of feasible placements for every
+        translation of the next object on a sub-unit grid, with one FFT cross
+        correlation per rotation instead of one geometry test per candidate:
+        1) Rasterize the blocked space: the occupied cells of the state's
+           occupancy grid, and everything outside the bin
+        2) For each rotation, rasterize the rotated next object into a footprint
+           kernel (the cells whose centers it contains)
+        3) Cross correlate the blocked space with the kernel: the value for a
+           translation is the number of blocked cells the object covers there,
+           and the placement is feasible where it is 0
+
+        Feasibility is decided on cell centers, so this is an approximation which
+        becomes exact as the resolution gets finer. Use generate_batch for exact
+        results on the integer grid.
+
+        Parameters
+        ----------
+        state           : State
+            Starting state
+        num_rotations   : int
+            Number of rotations of the target object to consider
+        resolution      : float, optional
+            Side length of the cells, and step between translations,
+            DEFAULT_RESOLUTION by default
+        display         : bool, optional
+            Default False, flag for whether to display each rotation's heatmap
+
+        Returns
+        -------
+        numpy array (num_rotations, rows, cols)
+            1.0 where the next object, rotated and moved so that the origin of
+            its coordinates is at the corner (minx + col * resolution,
+            miny + row * resolution) of cell [row][col] of the occupancy grid, is
+            likely to lie inside the bin without overlapping any placed object,
+            and 0.0 otherwise. With a resolution of 1, indexed like
+            generate_batch.
+
+        """
+        grid = state.occupancy(resolution)
+        rows_count, cols_count = grid.mask.shape
+        points = state.next_object.vertices()
+        current_pos = state.next_object.get_transform()[:2,2]
+        thetas = np.arange(num_rotations) * (2*np.pi / num_rotations)
+        transforms = grid_transforms(thetas, [grid.origin[0] - current_pos[0]], [grid.origin[1] - current_pos[1]])
+        candidates = transform_points(points, transforms.reshape(-1, 3, 3))
+
+        # Blocked space, with a margin of blocked cells wider than any footprint
+        # around the bin so that the correlation never wraps around
+        radius = np.max(np.linalg.norm(candidates - grid.origin, axis=2))
+        margin = int(np.ceil(radius / resolution)) + 2
+        blocked = np.ones((rows_count + 2*margin, cols_count + 2*margin))
+        blocked[margin:margin + rows_count, margin:margin + cols_count] = grid.mask
+        blocked_fft = np.fft.rfft2(blocked)
+
+        rewards = np.zeros((num_rotations, rows_count, cols_count))
+        for r in range(num_rotations):
+            rows, cols = grid.footprint(candidates[r])
+            if (len(rows) == 0):
+                # Objects smaller than a cell still cover the cell of a vertex
+                cells = np.floor((candidates[r, :1] - grid.origin) / resolution).astype(int)
+                rows, cols = cells[:, 1], cells[:, 0]
+            kernel = np.zeros(blocked.shape)
+            kernel[rows - rows.min(), cols - cols.min()] = 1
+            # overlap[u, v] = sum over the kernel's cells (a, b) of blocked[u + a, v + b]
+            overlap = np.fft.irfft2(blocked_fft * np.conj(np.fft.rfft2(kernel)), blocked.shape)
+            u, v = margin + rows.min(), margin + cols.min()
+            rewards[r] = overlap[u:u + rows_count, v:v + cols_count] < 0.5
+
+        if display:
+            import matplotlib.pyplot as plt
+            for i in range(num_rotations):
+                plt.imshow(rewards[i], cmap='hot', interpolation='nearest', origin='lower')
+                plt.show()
+        return rewards
@@ -1,4 +1,5 @@
 from utils import *
+from matplotlib import pyplot
 
 def createEnvFromUserInput(bin_size):
     """Given a bin size, create an environment.
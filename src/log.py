@@ -0,0 +1,128 @@
+import json
+import logging
+import numpy as np
+
+# Every module logs to a child of this logger. It has no handler other than a
+# NullHandler, so nothing is printed (or even formatted) unless an application
+# configures logging, ie. with configure_logging.
+LOGGER_NAME = "bin_placing"
+logging.getLogger(LOGGER_NAME).addHandler(logging.NullHandler())
+
+def get_logger(name=None):
+    """Returns the logger of a module of this project. Messages should be passed
+    as a format string and arguments (ie. logger.debug("points = %s", points)) so
+    that they are only formatted if they are actually emitted.
+
+    Parameters
+    ----------
+    name    : str, optional
+        Name of the module (ie. __name__), the project's root logger (None) by default
+
+    Returns
+    -------
+    logging.Logger
+        The logger named "bin_placing.<name>"
+
+    """
+    if name is None:
+        return logging.getLogger(LOGGER_NAME)
+    return logging.getLogger(LOGGER_NAME + "." + name)
+
+def configure_logging(level=logging.INFO, stream=None):
+    """Makes the project's loggers print messages of at least a given level, ie.
+    for command line scripts with a verbose flag.
+
+    Parameters
+    ----------
+    level   : int, optional
+        Minimum level of the printed messages, logging.INFO by default
+    stream  : file, optional
+        Stream to print to, sys.stderr (None) by default
+
+    Returns
+    -------
+    logging.Logger
+        The project's root logger
+
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    return logger
+
+def _to_json(value):
+    """Converts the numpy values of an event to JSON serializable values.
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError("%r is not JSON serializable" % (value,))
+
+class EventLog:
+    """This class is a structured log of events (ie. one per step of a rollout,
+    with its action, reward and timings). Events are kept in memory as dicts and
+    written to a file in bulk, as one JSON object per line, so that logging an
+    event costs no formatting or I/O on the hot path.
+    An event log contains:
+    1) the path of the file it writes to, if any
+    2) the events that have not been written yet
+    3) the number of buffered events that triggers a write
+
+    """
+
+    def __init__(self, path=None, buffer_size=4096):
+        """Initializes an empty event log. The file is truncated.
+
+        Parameters
+        ----------
+        path        : str, optional
+            Path of the JSON lines file, None by default to keep every event in
+            memory (see self.events)
+        buffer_size : int, optional
+            Number of events buffered before they are written, 4096 by default
+
+        Returns
+        -------
+        EventLog
+            An instance of EventLog with the above parameters
+
+        """
+        self.path = path
+        self.buffer_size = buffer_size
+        self.events = []
+        if path is not None:
+            open(path, "w").close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    def record(self, event, **fields):
+        """Records an event.
+
+        Parameters
+        ----------
+        event   : str
+            Kind of event, ie. "step"
+        fields  : keyword arguments
+            JSON serializable values, or numpy arrays and scalars
+
+        """
+        fields["event"] = event
+        self.events.append(fields)
+        if (self.path is not None and len(self.events) >= self.buffer_size):
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered events to the file, if there is one.
+        """
+        if (self.path is None or len(self.events) == 0):
+            return
+        with open(self.path, "a") as f:
+            f.write("".join(json.dumps(e, default=_to_json) + "\n" for e in self.events))
+        self.events = []
@@ -0,0 +1,363 @@
+import copy
+import multiprocessing
+import time
+import weakref
+from heatmap import *
+from cache import *
+
+class _Node:
+    """A node of the search tree: a state, its feasible placements (tried in
+    order), the children expanded so far, and visit statistics.
+    """
+
+    __slots__ = ("state", "depth", "actions", "children", "visits", "value")
+
+    def __init__(self, state, depth):
+        self.state = state
+        self.depth = depth
+        self.actions = None     # feasible transforms, computed on first visit
+        self.children = []      # children[i] is the child of actions[i]
+        self.visits = 0
+        self.value = 0.0
+
+class MCTSPolicy(Policy):
+    """This is a policy that runs a Monte Carlo tree search over discretized
+    placements (integer positions x rotations) of the next object and of the
+    objects in the state's lookahead window (see State.lookahead). Each edge of the
+    tree is a Transition.try_transitioning preview from an O(1) state copy. The
+    value of a placement sequence is the area it covers and how compactly (see
+    value), so the search prefers placements which leave room for the following
+    objects.
+
+    The feasible placements of a state are screened with HeatMap.generate_fft,
+    checked exactly from the bottom left corner of the bin until max_actions are
+    found, and cached by state content (see State.digest). Each
+    decision stops after a budget of simulations or a time limit, whichever
+    comes first, and can be spread over worker processes (root parallelization:
+    independent searches whose root statistics are summed).
+
+    If the state has no arrival queue, the search looks depth objects ahead with
+    the random objects try_transitioning draws.
+
+    The worker processes are started on the first parallel decision and kept
+    until close is called, the policy is used as a context manager and exits, or
+    the policy is garbage collected.
+    """
+
+    def __init__(self, bin_length, bin_width, rng=None, num_rotations=4, max_actions=16, budget=64,
+                 time_limit=None, depth=3, exploration=0.5, rollout_width=3, processes=1, cache_size=4096):
+        """Initializes a tree search policy given bin dimensions and search limits.
+
+        Parameters
+        ----------
+        bin_length      : int
+            Bin length dimension (x)
+        bin_width       : int
+            Bin width dimension (y)
+        rng             : numpy.random.Generator, optional
+            Random number generator of the simulations, the default generator (None) by default
+        num_rotations   : int, optional
+            Number of rotations of each object, 4 by default
+        max_actions     : int, optional
+            Number of feasible placements considered per state, 16 by default
+        budget          : int, optional
+            Number of simulations per decision (per process), 64 by default
+        time_limit      : float, optional
+            Maximum time per decision in seconds, unlimited (None) by default
+        depth           : int, optional
+            Maximum number of objects placed along a simulation, 3 by default
+        exploration     : float, optional
+            Exploration constant of the UCT selection rule, 0.5 by default
+        rollout_width   : int, optional
+            Number of best placements that rollouts pick from at random, 3 by default
+        processes       : int, optional
+            Number of worker processes, 1 by default to search in this process
+        cache_size      : int, optional
+            Number of states whose feasible placements are remembered, 4096 by default
+
+        Returns
+        -------
+        MCTSPolicy
+            An instance of MCTSPolicy with the above parameters
+
+        """
+        super(MCTSPolicy, self).__init__(bin_length, bin_width, rng)
+        self.num_rotations = num_rotations
+        self.max_actions = max_actions
+        self.budget = budget
+        self.time_limit = time_limit
+        self.depth = depth
+        self.exploration = exploration
+        self.rollout_width = rollout_width
+        self.processes = processes
+        self.heatmap = HeatMap()
+        self.feasible_cache = LRUCache(cache_size)
+        # Headless transition previewing the placements of every search
+        self.transition = Transition(rng=rng)
+        self._pool = None
+        self._pool_finalizer = None
+
+    def __getstate__(self):
+        # Worker processes get a copy of the policy without the pool or the cache
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        state["_pool_finalizer"] = None
+        state["feasible_cache"] = LRUCache(self.feasible_cache.maxsize)
+        return state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Stops the worker processes, if any.
+        """
+        if self._pool_finalizer is not None:
+            self._pool_finalizer()
+        self._pool = None
+        self._pool_finalizer = None
+
+    def feasible_actions(self, state):
+        """Returns the feasible placements of a state's next object which are
+        considered by the search, from the cache when possible.
+
+        Parameters
+        ----------
+        state   : State
+            The state
+
+        Returns
+        -------
+        list
+            Up to max_actions transforms (numpy arrays (3,3)), bottom left first
+
+        """
+        key = state.digest()
+        actions = self.feasible_cache.get(key)
+        if actions is not None:
+            return actions
+        # Screen every placement on the raster, then check the likely feasible
+        # ones exactly, bottom left first, until there are enough of them
+        likely = self.heatmap.generate_fft(state, self.num_rotations, 1.0)
+        r, y, x = np.nonzero(likely)
+        grid = state.occupancy(1.0)
+        current_pos = state.next_object.get_transform()[:2,2]
+        points = state.next_object.vertices()
+        bin_ring = state.bin.vertices()
+        objects = state.objects
+        actions = []
+        for i in np.lexsort((r, x, y)):
+            transform = grid_transforms([r[i] * (2*np.pi / self.num_rotations)],
+                                        [grid.origin[0] + x[i] - current_pos[0]],
+                                        [grid.origin[1] + y[i] - current_pos[1]])[0, 0, 0]
+            ring = transform_points(points, transform[None])[0]
+            if not contained(ring, bin_ring):
+                continue
+            neighbors = state.query_indices(tuple(np.concatenate([ring.min(axis=0), ring.max(axis=0)])))
+            if (len(neighbors) > 0 and np.any(overlaps_many(ring, objects.padded_vertices(neighbors),
+                                                            objects.all_bounds(neighbors),
+                                                            objects.convex(neighbors)))):
+                continue
+            actions.append(transform)
+            if len(actions) >= self.max_actions:
+                break
+        self.feasible_cache.put(key, actions)
+        return actions
+
+    def _expandable(self, node):
+        """Computes the feasible placements of a node on its first visit, and
+        returns whether the node is not a leaf of the search.
+        """
+        if (node.depth >= self.depth or node.state.next_object is None):
+            return False
+        if node.actions is None:
+            node.actions = self.feasible_actions(node.state)
+        return len(node.actions) > 0
+
+    def _rollout(self, state, depth, rng, transition):
+        """Places objects at random among the best placements until the depth of
+        the search, and returns the area covered in the end, as a fraction of the
+        bin area.
+        """
+        while (depth < self.depth and state.next_object is not None):
+            actions = self.feasible_actions(state)
+            if len(actions) == 0:
+                break
+            transform = actions[rng.integers(min(self.rollout_width, len(actions)))]
+            state = transition.try_transitioning(state, Action(transform, state.next_object), add_to_sim=False)
+            depth += 1
+        return self.value(state)
+
+    def value(self, state):
+        """Returns the value of the state at the end of a simulation: the fraction
+        of the bin area covered by placed objects, plus half the fraction of the
+        area below the highest object that they cover, which prefers compact
+        placements among sequences that place the same objects.
+
+        Parameters
+        ----------
+        state   : State
+            The state
+
+        Returns
+        -------
+        float
+            The value, between 0 and 1.5
+
+        """
+        if len(state.objects) == 0:
+            return 0.0
+        miny, maxy = state.bin.bounds()[1], state.bin.bounds()[3]
+        height = (np.max(state.objects.all_bounds()[:, 3]) - miny) / (maxy - miny)
+        return state.fill_fraction() + 0.5 * state.fill_fraction() / max(height, 1e-9)
+
+    def search(self, state, rng=None, transition=None):
+        """Runs one search from a state, within the budget and time limit.
+
+        Parameters
+        ----------
+        state       : State
+            Root state of the search
+        rng         : numpy.random.Generator, optional
+            Random number generator of the simulations, the policy's generator by default
+        transition  : Transition, optional
+            Headless transition used to preview placements, the policy's transition
+            by default
+
+        Returns
+        -------
+        actions : list
+            The feasible placements of the root (transforms)
+        visits  : numpy array of int
+            Number of simulations through each placement
+        values  : numpy array
+            Sum of the simulation values through each placement
+
+        """
+        rng = get_rng(self.rng if rng is None else rng)
+        if transition is None:
+            transition = self.transition
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        root = _Node(state, 0)
+        if not self._expandable(root):
+            return [], np.zeros(0, dtype=int), np.zeros(0)
+
+        for simulation in range(self.budget):
+            if (deadline is not None and time.perf_counter() > deadline):
+                break
+            # Selection: descend through fully expanded nodes with UCT
+            node, path = root, [root]
+            while (self._expandable(node) and len(node.children) == len(node.actions)):
+                log_visits = np.log(node.visits)
+                node = max(node.children, key=lambda c: c.value / c.visits +
+                           self.exploration * np.sqrt(log_visits / c.visits))
+                path.append(node)
+            # Expansion: preview the next untried placement, bottom left first
+            if self._expandable(node):
+                transform = node.actions[len(node.children)]
+                child_state = transition.try_transitioning(node.state, Action(transform, node.state.next_object),
+                                                           add_to_sim=False)
+                node.children.append(_Node(child_state, node.depth + 1))
+                node = node.children[-1]
+                path.append(node)
+            # Simulation and backpropagation
+            value = self._rollout(node.state, node.depth, rng, transition)
+            for visited in path:
+                visited.visits += 1
+                visited.value += value
+
+        visits = np.zeros(len(root.actions), dtype=int)
+        values = np.zeros(len(root.actions))
+        for i, child in enumerate(root.children):
+            visits[i], values[i] = child.visits, child.value
+        return root.actions, visits, values
+
+    def get_action(self, state):
+        """Returns the most visited placement of the next object after searching
+        from the state. If the next object fits nowhere, it is placed at the
+        origin, unrotated.
+
+        Parameters
+        ----------
+        state       : State
+            Starting state
+
+        Returns
+        -------
+        action      : Action
+            An action to take from this state.
+
+        """
+        visible = _visible_arrivals(state)
+        if (self.processes is None or self.processes > 1):
+            actions, visits, values = self._parallel_search(state, visible)
+        else:
+            actions, visits, values = self.search(_restricted_state(state, visible))
+        if len(actions) == 0:
+            return Action(np.eye(3), state.next_object)
+        best = np.lexsort((-values, -visits))[0]
+        return Action(actions[best], state.next_object)
+
+    def _parallel_search(self, state, visible):
+        """Runs independent searches in the worker processes, with seeds drawn from
+        the policy's generator, and sums their root statistics.
+        """
+        if self._pool is None:
+            # Every worker keeps its own copy of the policy, and its cache, across
+            # decisions. The pool keeps its arguments, so it gets a copy too: neither
+            # the pool nor the finalizer refer to the policy, and the finalizer stops
+            # the workers when the policy is collected (or at exit) if close is not called
+            self._pool = multiprocessing.Pool(self.processes, _init_worker, (copy.copy(self),))
+            self._pool_finalizer = weakref.finalize(self, _close_pool, self._pool)
+        num_searches = self.processes or multiprocessing.cpu_count()
+        seeds = get_rng(self.rng).integers(2**63, size=num_searches)
+        # The arrival queue holds a lock and cannot be sent to other processes
+        snapshot = state.copy()
+        snapshot.arrivals = None
+        results = self._pool.map(_search_worker, [(snapshot, visible, seed) for seed in seeds])
+        actions = results[0][0]
+        visits = np.sum([r[1] for r in results], axis=0)
+        values = np.sum([r[2] for r in results], axis=0)
+        return actions, visits, values
+
+def _visible_arrivals(state):
+    """Returns the arrivals that a search from a state may know about: the next
+    object and the lookahead window, or None if the state has no arrival queue.
+    """
+    if state.arrivals is None:
+        return None
+    return [state.next_object] + state.lookahead()
+
+def _restricted_state(state, visible):
+    """Returns a copy of a state whose arrival queue only holds the visible
+    arrivals, so that the search never draws arrivals beyond the lookahead window.
+    """
+    restricted = state.copy()
+    if visible is not None:
+        restricted.arrivals = ArrivalQueue(visible, len(visible))
+        restricted.arrival_position = 0
+    return restricted
+
+def _close_pool(pool):
+    """Stops the worker processes of a pool.
+    """
+    pool.close()
+    pool.join()
+
+# The policy of a worker process, set when the process starts
+_worker_policy = None
+
+def _init_worker(policy):
+    global _worker_policy
+    _worker_policy = policy
+
+def _search_worker(args):
+    """Runs a search in a worker process (see MCTSPolicy._parallel_search).
+    """
+    state, visible, seed = args
+    rng = np.random.default_rng(seed)
+    # Every search previews random objects of its own, as a transition drawing from rng would
+    _worker_policy.transition.preview_rng = np.random.Generator(rng.bit_generator.jumped())
+    return _worker_policy.search(_restricted_state(state, visible), rng)
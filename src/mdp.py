@@ -1,9 +1,13 @@
 from utils import *
 from objects import *
-import math
+from object_list import *
+from occupancy import *
+from arrivals import *
 
 from shapely.geometry import Point
 
+_logger = get_logger(__name__)
+
 # def smoothListGaussian(list,degree=5):
 #      window=degree*2-1
 #      weight=np.array([1.0]*window)
@@ -34,22 +38,40 @@ class State:
     """This class is the state representation for the bin placing project.
     A bin placing state contains:
     1) a bin
-    2) a list of objects
+    2) a list of objects, with a spatial index over their bounding boxes
     3) an object which will be placed next
-    
+    4) the number of objects (from the start of the list) which Termination has
+       already validated
+    5) optionally, an ArrivalQueue of the objects arriving after the next object,
+       and the position of the next object in it
+    6) a memo of data derived from the objects (ie. a policy's row frontier or
+       an occupancy grid), which copies inherit and bring up to date incrementally
+
+    States are persistent: the bin, the placed objects and the next object are
+    shared between a state and its copies, and are never modified in place once
+    they are part of a state. The list of objects is an ObjectList, so appending
+    to a copy never changes the original. Memo entries are immutable as well, and
+    are replaced rather than updated.
+
     """
 
-    def __init__(self, bin, objects, next_object):
+    def __init__(self, bin, objects, next_object=None, arrivals=None, arrival_position=0):
         """Initializes a state, given the bin, list of objects, and next object.
 
         Parameters
         ----------
         bin       : Rectangle
             The object representation of the placement bin
-        objects   : list
+        objects   : list or ObjectList
             A list of PlacementObjects already placed in the bin
-        next_object  : PlacementObject
-            The next PlacementObject that will be placed in the bin
+        next_object  : PlacementObject, optional
+            The next PlacementObject that will be placed in the bin. By default
+            (None), the arrival at arrival_position
+        arrivals  : ArrivalQueue, optional
+            The queue the next objects are drawn from, None by default (the
+            Transition then generates them)
+        arrival_position : int, optional
+            Position of next_object in arrivals, 0 by default
 
         Returns
         -------
@@ -58,13 +80,161 @@ class State:
 
         """
         self.bin = bin
+        if not isinstance(objects, ObjectList):
+            objects = ObjectList(objects, max(bin.length, bin.width) / 8)
         self.objects = objects
+        self.arrivals = arrivals
+        self.arrival_position = arrival_position
+        if next_object is None and arrivals is not None:
+            next_object = arrivals.get(arrival_position)
         self.next_object = next_object
+        self.num_validated = 0
+        self.memo = {}
+
+    def lookahead(self, count=None):
+        """Returns the objects that will arrive after the next object, so that
+        policies can plan ahead.
+
+        Parameters
+        ----------
+        count   : int, optional
+            Number of objects, the lookahead window of the arrival queue by default
+
+        Returns
+        -------
+        list
+            Up to `count` PlacementObjects in order of arrival, or an empty list
+            if this state has no arrival queue
+
+        """
+        if self.arrivals is None:
+            return []
+        return self.arrivals.peek(self.arrival_position, count)
+
+    def advance_arrivals(self):
+        """Replaces the next object with the following arrival of the queue.
+        """
+        self.arrival_position += 1
+        self.next_object = self.arrivals.get(self.arrival_position)
+
+    def add_object(self, object):
+        """Adds a placed object to this state.
+
+        Parameters
+        ----------
+        object  : PlacementObject
+            An object placed in the bin
+
+        """
+        self.objects.append(object)
+
+    def query_indices(self, bounds):
+        """Returns the positions in the list of objects of the objects whose bounding
+        boxes overlap the input bounding box.
+
+        Parameters
+        ----------
+        bounds  : tuple
+            (minx, miny, maxx, maxy) bounding box to query, may use infinity
+
+        Returns
+        -------
+        list
+            Sorted positions of the nearby objects in self.objects
+
+        """
+        return self.objects.query_indices(bounds)
+
+    def query(self, bounds):
+        """Returns the objects whose bounding boxes overlap the input bounding box,
+        in the order in which they were placed.
+
+        Parameters
+        ----------
+        bounds  : tuple
+            (minx, miny, maxx, maxy) bounding box to query, may use infinity
+
+        Returns
+        -------
+        list
+            The nearby PlacementObjects
+
+        """
+        return [self.objects[i] for i in self.query_indices(bounds)]
+
+    def occupancy(self, resolution=DEFAULT_RESOLUTION):
+        """Returns a rasterized occupancy grid of the bin, with every placed object
+        burned in. The grid is built on first use and then updated incrementally
+        along the states copied from this one.
+
+        Parameters
+        ----------
+        resolution  : float, optional
+            Side length of the grid cells, DEFAULT_RESOLUTION by default
+
+        Returns
+        -------
+        OccupancyGrid
+            The occupancy grid of this state (see occupancy.OccupancyGrid)
+
+        """
+        return OccupancyGrid.of(self, resolution)
+
+    def placed_area(self, count=None):
+        """Returns the total area of the objects placed in the bin. O(1).
+
+        Parameters
+        ----------
+        count   : int, optional
+            Only count the first `count` placed objects (ie. num_validated), all
+            of them (None) by default
+
+        Returns
+        -------
+        float
+            The sum of the areas of the placed objects
+
+        """
+        return self.objects.placed_area(count)
+
+    def fill_fraction(self, count=None):
+        """Returns the fraction of the bin area covered by the objects placed in it. O(1).
+
+        Parameters
+        ----------
+        count   : int, optional
+            Only count the first `count` placed objects (ie. num_validated), all
+            of them (None) by default
+
+        Returns
+        -------
+        float
+            The placed area divided by the area of the bin
+
+        """
+        return self.objects.placed_area(count) / self.bin.area
+
+    def digest(self):
+        """Returns a hash of the content of this state: its bin, placed objects and
+        next object. Unlike the state itself, the digest can key caches, since
+        copies of a state and states reached by the same actions have equal digests.
+
+        Returns
+        -------
+        bytes
+            A 16 byte BLAKE2 digest
+
+        """
+        h = hashlib.blake2b(self.bin.digest(), digest_size=16)
+        h.update(self.objects.digest())
+        if self.next_object is not None:
+            h.update(self.next_object.digest())
+        return h.digest()
 
     def copy(self):
-        """Creates and returns a copy of this state. The bin and next_object are
-        replicated, but the list of objects is a shallow copy (a new list, but the
-        same objects).
+        """Creates and returns a copy of this state in O(1). The bin, next_object
+        and placed objects are shared with this state rather than replicated, and
+        appending objects to the copy does not change this state.
 
         Returns
         -------
@@ -72,11 +242,15 @@ class State:
             A copy of this instance of State
 
         """
-        bin_copy = self.bin.copy()
-        obj_copy = [o for o in self.objects]
-        next_obj_copy = self.next_object.copy()
-        # new_state = State(self.bin, self.objects, self.next_object)
-        new_state = State(bin_copy, obj_copy, next_obj_copy)
+        profile_count("state_copies")
+        new_state = State.__new__(State)
+        new_state.bin = self.bin
+        new_state.objects = self.objects.copy()
+        new_state.next_object = self.next_object
+        new_state.num_validated = self.num_validated
+        new_state.arrivals = self.arrivals
+        new_state.arrival_position = self.arrival_position
+        new_state.memo = dict(self.memo)
         return new_state
 
 class Action:
@@ -114,10 +288,11 @@ class Policy:
     A bin placing policy contains:
     1) a bin length
     2) a bin width
+    3) a random number generator for policies that make random choices
 
     """
 
-    def __init__(self, bin_length, bin_width):
+    def __init__(self, bin_length, bin_width, rng=None):
         """Initializes a policy given bin dimensions. This is a parent class for
         actual policies, and should not be used in practice. The get_action method
         for this parent class returns the identity transform on the input state's
@@ -129,6 +304,8 @@ class Policy:
             Bin length dimension (x)
         bin_width   : int
             Bin width dimension (y)
+        rng         : numpy.random.Generator, optional
+            Random number generator, the default generator (None) by default
 
         Returns
         -------
@@ -138,6 +315,7 @@ class Policy:
         """
         self.bin_length = bin_length
         self.bin_width = bin_width
+        self.rng = rng
 
     def get_action(self, state):
         """Returns an action given a state by executing the policy. Since this is
@@ -192,20 +370,42 @@ class Reward:
 class Transition:
     """This is a representation of transitions for the bin placing project.
     A bin placing transition contains:
-    1) a figure for the environment
-    2) axes for the bin
+    1) a figure for the environment (None when running headless)
+    2) axes for the bin (None when running headless)
+    3) an optional recorder which keeps the placements for rendering later
+    4) a stream of pre-generated random objects, from which the next objects are
+       drawn for states without an arrival queue
+    5) a separate random number generator for the objects drawn by previews (see
+       try_transitioning), so that previews never change the next objects
 
     """
 
-    def __init__(self, fig, ax):
+    def __init__(self, fig=None, ax=None, recorder=None, rng=None, object_stream=None, preview_rng=None):
         """Initializes a transition given plotting environment parameters (matplotlib figures).
+        If no figure and axes are given, the transition is headless: nothing is
+        ever plotted, and matplotlib is never imported.
 
         Parameters
         ----------
-        fig : matplotlib.pyplot.Figure
-            Figure used to display the bin and objects
-        ax  : an matplotlib.axes.SubplotBase subclass of Axes (or a subclass of Axes)
-            The axes of the subplot corresponding to the bin
+        fig : matplotlib.pyplot.Figure, optional
+            Figure used to display the bin and objects, None by default
+        ax  : an matplotlib.axes.SubplotBase subclass of Axes (or a subclass of Axes), optional
+            The axes of the subplot corresponding to the bin, None by default
+        recorder : EpisodeRecorder, optional
+            Records every executed placement so the episode can be rendered
+            after it has finished, None by default
+        rng : numpy.random.Generator, optional
+            Random number generator for the next objects, the default generator (None) by default
+        object_stream : ObjectStream, optional
+            Stream of the next objects, by default an ObjectStream drawing from rng
+        preview_rng : numpy.random.Generator, optional
+            Random number generator for the next objects of previews, by default a
+            generator jumped far ahead of rng's stream (rng itself is not drawn
+            from), or the default generator if rng is None
+
+        The colors of plotted objects are drawn from plot_rng, a generator jumped
+        further ahead of rng's stream (or the default generator if rng is None),
+        so that plotting does not change the episode.
 
         Returns
         -------
@@ -215,6 +415,26 @@ class Transition:
         """
         self.fig = fig
         self.ax = ax
+        self.recorder = recorder
+        self.rng = rng
+        if (preview_rng is None and rng is not None):
+            preview_rng = np.random.Generator(rng.bit_generator.jumped())
+        self.preview_rng = preview_rng
+        self.plot_rng = None if rng is None else np.random.Generator(rng.bit_generator.jumped(2))
+        if object_stream is None:
+            object_stream = ObjectStream(rng)
+        self.object_stream = object_stream
+
+    def is_headless(self):
+        """Returns whether this transition runs without a plotting environment.
+
+        Returns
+        -------
+        bool
+            True if there are no axes to plot placed objects on
+
+        """
+        return self.ax is None
 
     def try_transitioning(self, state, action, add_to_sim=True):
         """Generates a copy of the action's next_object to be placed, executes
@@ -230,7 +450,8 @@ class Transition:
         action      : Action
             Action taken from the state
         add_to_sim  : bool, optional
-            Default True, flag for whether to add the newly placed object to the simulation (plotted figure)
+            Default True, flag for whether to add the newly placed object to the simulation
+            (plotted figure). Ignored by headless transitions.
 
         Returns
         -------
@@ -241,14 +462,17 @@ class Transition:
         next_state = state.copy()
         next_object = action.next_object.copy()
         next_object.apply_transform(action.transform)
-        if (add_to_sim):
-            add_object(self.fig, self.ax, next_object)
-        next_state.objects.append(next_object)
+        if (add_to_sim and not self.is_headless()):
+            add_object(self.fig, self.ax, next_object, self.plot_rng)
+        next_state.add_object(next_object)
         # Pick a new next object
+        if (next_state.arrivals is not None):
+            next_state.advance_arrivals()
+            return next_state
         # next_state.next_object = Square(5, np.eye(3))
-        next_state.next_object = Rectangle.get_random(2, 10)
+        next_state.next_object = Rectangle.get_random(2, 10, self.preview_rng)
         while (next_state.next_object.polygon.is_valid == False):
-            next_state.next_object = Rectangle.get_random(2, 10)
+            next_state.next_object = Rectangle.get_random(2, 10, self.preview_rng)
         return next_state
 
     def execute_action(self, state, action, add_to_sim=True):
@@ -262,7 +486,8 @@ class Transition:
         action      : Action
             Action taken from the state
         add_to_sim  : bool, optional
-            Default True, flag for whether to add the newly placed object to the simulation (plotted figure)
+            Default True, flag for whether to add the newly placed object to the simulation
+            (plotted figure). Ignored by headless transitions.
 
         Returns
         -------
@@ -271,33 +496,48 @@ class Transition:
 
         """
         next_state = state.copy()
-        action.next_object.apply_transform(action.transform)
-        if (add_to_sim):
-            add_object(self.fig, self.ax, action.next_object)
-            # add_object(self.fig, self.ax, action.next_object.bounding_box())
-
-        next_state.objects.append(action.next_object)
-        # Pick a new next object
+        # Place a copy, since action.next_object may be shared with other states
+        placed_object = action.next_object.copy()
+        placed_object.apply_transform(action.transform)
+        if (add_to_sim and not self.is_headless()):
+            with profile_stage("plotting"):
+                add_object(self.fig, self.ax, placed_object, self.plot_rng)
+            # add_object(self.fig, self.ax, placed_object.bounding_box())
+        if (self.recorder is not None):
+            self.recorder.record(placed_object)
+
+        next_state.add_object(placed_object)
+        # Pick a new next object. Objects from the stream are always valid
+        if (next_state.arrivals is not None):
+            next_state.advance_arrivals()
+            return next_state
         # next_state.next_object = Square(5, np.eye(3))
-        next_state.next_object = PlacementObject.get_random()#Rectangle.get_random(2, 10) #
-        while (next_state.next_object.polygon.is_valid == False):
-            next_state.next_object = PlacementObject.get_random() #Rectangle.get_random(2, 10) #
+        next_state.next_object = next(self.object_stream)
         return next_state
 
 class Termination:
     """This is a representation of termination states for the bin placing project.
     A bin placing termination contains only a function done() which takes in a state
-    and decides whether we are finished with the placement task.
+    and decides whether we are finished with the placement task: when a placed
+    object sticks out of the bin or overlaps another one, or when there is no next
+    object to place (ie. a finite arrival queue ran out).
+
+    The check is incremental: each state remembers how many of its objects have
+    already been validated (see State.num_validated), and only objects placed
+    since then are tested against the bin and their neighbors.
 
     """
 
-    def done(self, state):
+    def done(self, state, revalidate=False):
         """Decides whether the input state is a termination state.
 
         Parameters
         ----------
         state       : State
             Current state of the environment
+        revalidate  : bool, optional
+            Default False, flag for whether to test every object again instead of
+            only the objects placed since the last validation
 
         Returns
         -------
@@ -305,19 +545,32 @@ class Termination:
             True if done with the placement task, False otherwise
 
         """
-        # Go through the objects pairwise and return True if any overlap
-        # Also return True if any object is outside the bin
-        for objA in state.objects:
-            bin_contained = intersecting(objA, state.bin)
-            if (not math.isclose(bin_contained - objA.polygon.area, 0, abs_tol=0.0001)):
-            # if (bin_contained < objA.polygon.area):
-                print("Bin contained = " + str(bin_contained) + " < polygon area = " + str(objA.polygon.area))
+        start = state.num_validated
+        if (revalidate or start > len(state.objects)):
+            start = 0
+        # Go through the new objects and return True if any overlaps another
+        # object. Also return True if any new object is outside the bin
+        objects = state.objects
+        bin_ring = state.bin.vertices()
+        for i in range(start, len(objects)):
+            ringA = objects.vertices(i)
+            if (not contained(ringA, bin_ring)):
+                _logger.info("Object %s is not contained in the bin", ringA)
+                return True
+            # Only objects with overlapping bounding boxes can intersect objA.
+            # Pairs of objects placed after objA are checked when we reach them
+            neighbors = [j for j in state.query_indices(objects.bounds(i)) if j < i]
+            if (len(neighbors) == 0):
+                continue
+            hits = overlaps_many(ringA, objects.padded_vertices(neighbors), objects.all_bounds(neighbors),
+                                 objects.convex(neighbors), objects.convex([i])[0])
+            if (np.any(hits)):
+                _logger.info("Object %s intersects %s", ringA, objects.vertices(neighbors[np.argmax(hits)]))
                 return True
-            for objB in [i for i in state.objects if i != objA]:
-                if (not math.isclose(intersecting(objA, objB), 0, abs_tol=0.0001)):
-                # if intersecting(objA, objB) > 0:
-                    print("Object " + str(np.array(objA.polygon.exterior.coords)) + " intersects " + str(np.array(objB.polygon.exterior.coords)))
-                    return True
+        state.num_validated = len(state.objects)
+        if (state.next_object is None):
+            _logger.info("No objects left to place")
+            return True
         return False
 
 class Value:
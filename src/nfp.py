@@ -0,0 +1,331 @@
+import hashlib
+from shapely.affinity import translate
+from shapely.geometry import box
+from shapely.ops import unary_union
+from collision import *
+from cache import *
+
+def convex_hull(points):
+    """Returns the convex hull of a set of points (Andrew's monotone chain).
+
+    Parameters
+    ----------
+    points  : numpy array (N,2)
+        The points
+
+    Returns
+    -------
+    numpy array (H,2)
+        Closed, counter clockwise exterior ring of the hull, without collinear
+        points
+
+    """
+    points = np.unique(np.asarray(points, dtype=float), axis=0)
+    if len(points) < 3:
+        return np.concatenate([points, points[:1]])
+
+    def half(points):
+        chain = []
+        for p in points:
+            while (len(chain) >= 2 and (chain[-1][0] - chain[-2][0]) * (p[1] - chain[-2][1]) -
+                   (chain[-1][1] - chain[-2][1]) * (p[0] - chain[-2][0]) <= 1e-12):
+                chain.pop()
+            chain.append(p)
+        return chain
+
+    lower, upper = half(points), half(points[::-1])
+    return np.array(lower[:-1] + upper[:-1] + lower[:1])
+
+def triangulate(ring, tol=1e-9):
+    """Splits a simple polygon into triangles by ear clipping.
+
+    Parameters
+    ----------
+    ring    : numpy array (V,2)
+        Closed exterior ring of the polygon. Repeated points are allowed.
+    tol     : float, optional
+        Tolerance on the cross products of the triangles
+
+    Returns
+    -------
+    list
+        Closed rings (numpy arrays (4,2)) of the triangles, counter clockwise. If
+        the polygon is not simple and no ear can be found, the convex hull of the
+        remaining points is returned in place of their triangles.
+
+    """
+    ring = np.asarray(ring, dtype=float)[:-1]
+    ring = ring[np.any(np.abs(ring - np.roll(ring, 1, axis=0)) > tol, axis=1)]
+    x, y = ring[:, 0], ring[:, 1]
+    if (np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y) < 0):
+        ring = ring[::-1]
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    remaining = list(range(len(ring)))
+    triangles = []
+    while (len(remaining) > 3):
+        for k in range(len(remaining)):
+            i, j, l = remaining[k - 1], remaining[k], remaining[(k + 1) % len(remaining)]
+            a, b, c = ring[i], ring[j], ring[l]
+            if (cross(a, b, c) <= tol):
+                # reflex or collinear vertex
+                continue
+            others = [ring[m] for m in remaining if m not in (i, j, l)]
+            if any(cross(a, b, p) >= -tol and cross(b, c, p) >= -tol and cross(c, a, p) >= -tol for p in others):
+                continue
+            triangles.append(np.array([a, b, c, a]))
+            del remaining[k]
+            break
+        else:
+            triangles.append(convex_hull(ring[remaining]))
+            return triangles
+    if (len(remaining) == 3 and abs(cross(*ring[remaining])) > tol):
+        triangles.append(np.array([ring[remaining[0]], ring[remaining[1]], ring[remaining[2]], ring[remaining[0]]]))
+    return triangles
+
+def _from_lowest(ring, tol=1e-12):
+    """Returns the distinct points of a convex ring, counter clockwise from its
+    lowest (then leftmost) point, closed.
+    """
+    ring = np.asarray(ring, dtype=float)
+    ring = ring[1:][np.any(np.abs(np.diff(ring, axis=0)) > tol, axis=1)]
+    x, y = ring[:, 0], ring[:, 1]
+    if (np.sum(x[:-1] * y[1:] - x[1:] * y[:-1]) + x[-1] * y[0] - x[0] * y[-1] < 0):
+        ring = ring[::-1]
+    lowest = np.lexsort((ring[:, 0], ring[:, 1]))[0]
+    return np.concatenate([ring[lowest:], ring[:lowest + 1]])
+
+def minkowski_sum(ringA, ringB):
+    """Returns the Minkowski sum of two convex polygons, by merging their edges in
+    order of angle, in O(Va + Vb) array operations.
+
+    Parameters
+    ----------
+    ringA   : numpy array (Va,2)
+        Closed exterior ring of the first polygon
+    ringB   : numpy array (Vb,2)
+        Closed exterior ring of the second polygon
+
+    Returns
+    -------
+    numpy array (H,2)
+        Closed, counter clockwise exterior ring of the sum
+
+    """
+    return _merge_edges(_from_lowest(ringA), _from_lowest(ringB))
+
+def _merge_edges(ringA, ringB):
+    """Returns the Minkowski sum of two convex rings given by _from_lowest.
+    """
+    edges = np.concatenate([np.diff(ringA, axis=0), np.diff(ringB, axis=0)])
+    # Edges from the lowest point turn counter clockwise from angle 0 to 2 pi
+    angles = np.arctan2(edges[:, 1], edges[:, 0])
+    angles = np.where(angles < -1e-12, angles + 2*np.pi, np.maximum(angles, 0))
+    edges = edges[np.argsort(angles, kind="stable")]
+    ring = ringA[0] + ringB[0] + np.concatenate([[[0, 0]], np.cumsum(edges, axis=0)])
+    ring[-1] = ring[0]      # without the rounding error of the sum
+    return ring
+
+def shape_key(ring, decimals=6):
+    """Returns a key identifying a polygon's shape and rotation up to translation:
+    a digest of its ring relative to the ring's first point.
+
+    Parameters
+    ----------
+    ring        : numpy array (V,2)
+        Closed exterior ring of the polygon
+    decimals    : int, optional
+        Number of decimals the ring is rounded to, so that float noise does not
+        change the key, 6 by default
+
+    Returns
+    -------
+    bytes
+        A 16 byte digest
+
+    """
+    ring = np.asarray(ring, dtype=float)
+    relative = np.round(ring - ring[0], decimals) + 0.0    # + 0.0 turns -0.0 into 0.0
+    return hashlib.blake2b(relative.tobytes(), digest_size=16).digest()
+
+def bottom_left_point(region, tol=0.0001):
+    """Returns the lowest vertex of a region, leftmost among the lowest.
+
+    Parameters
+    ----------
+    region  : shapely geometry
+        A Polygon, MultiPolygon or GeometryCollection
+    tol     : float, optional
+        Vertices this close to the lowest y are treated as equally low
+
+    Returns
+    -------
+    numpy array (2,)
+        The vertex, or None if the region is empty
+
+    """
+    if (region is None or region.is_empty):
+        return None
+    rings = []
+    for part in getattr(region, "geoms", [region]):
+        if isinstance(part, Polygon):
+            rings.append(np.array(part.exterior.coords))
+            rings.extend(np.array(interior.coords) for interior in part.interiors)
+    if len(rings) == 0:
+        return None
+    points = np.concatenate(rings)
+    lowest = points[points[:, 1] <= points[:, 1].min() + tol]
+    return lowest[np.argmin(lowest[:, 0])]
+
+class NoFitPolygons:
+    """This class computes and caches no-fit polygons (NFPs) for exact placement of
+    irregular objects. The NFP of a placed object A and a moving object B is the
+    Minkowski sum of A and -B: the set of positions of B's reference point (the
+    origin of B's coordinates) where B overlaps A. B touches A on its boundary,
+    and is clear of A outside of it. The inner-fit polygon (IFP) of the bin is the
+    set of positions where B is inside the bin. The feasible positions of B are
+    then the IFP minus the NFPs of the placed objects, one polygon.
+
+    NFPs are built from convex parts (see convex_parts), as the union of the
+    Minkowski sums of every pair of parts. An NFP only depends on the shapes
+    and rotations of A and B up to translation, so it is cached by the pair of
+    their shape keys (see shape_key), and objects of the same shape reuse it.
+    A no-fit polygon engine contains:
+    1) an LRU cache of the convex parts of shapes
+    2) an LRU cache of the NFPs of pairs of shapes
+
+    """
+
+    def __init__(self, cache_size=4096):
+        """Initializes an engine with empty caches.
+
+        Parameters
+        ----------
+        cache_size  : int, optional
+            Number of shapes, and of pairs of shapes, whose convex parts and NFPs
+            are remembered, 4096 by default
+
+        Returns
+        -------
+        NoFitPolygons
+            An instance of NoFitPolygons with the above parameters
+
+        """
+        self.parts_cache = LRUCache(cache_size)
+        self.nfp_cache = LRUCache(cache_size)
+
+    def convex_parts(self, ring, key=None):
+        """Returns convex parts whose union is a polygon: the polygon itself if it
+        is convex, its triangles otherwise (see triangulate). Parts are relative
+        to the ring's first point.
+
+        Parameters
+        ----------
+        ring    : numpy array (V,2)
+            Closed exterior ring of the polygon
+        key     : bytes, optional
+            The shape key of the ring, computed with shape_key by default
+
+        Returns
+        -------
+        list
+            Closed, counter clockwise rings (numpy arrays) of the convex parts,
+            from their lowest points
+
+        """
+        key = shape_key(ring) if key is None else key
+        parts = self.parts_cache.get(key)
+        if parts is None:
+            ring = np.asarray(ring, dtype=float) - ring[0]
+            parts = [_from_lowest(part) for part in ([ring] if is_convex(ring) else triangulate(ring))]
+            self.parts_cache.put(key, parts)
+        return parts
+
+    def no_fit_polygon(self, ringA, ringB):
+        """Returns the NFP of a placed polygon and a moving polygon.
+
+        Parameters
+        ----------
+        ringA   : numpy array (Va,2)
+            Closed exterior ring of the placed polygon, in world space coordinates
+        ringB   : numpy array (Vb,2)
+            Closed exterior ring of the moving polygon, relative to its reference
+            point
+
+        Returns
+        -------
+        shapely geometry
+            The positions of B's reference point where B overlaps A (interior) or
+            touches it (boundary)
+
+        """
+        ringA, ringB = np.asarray(ringA, dtype=float), np.asarray(ringB, dtype=float)
+        keyA, keyB = shape_key(ringA), shape_key(ringB)
+        nfp = self.nfp_cache.get((keyA, keyB))
+        if nfp is None:
+            reflected = [_from_lowest(-partB) for partB in self.convex_parts(ringB, keyB)]
+            sums = [_merge_edges(partA, partB) for partA in self.convex_parts(ringA, keyA) for partB in reflected]
+            nfp = unary_union([Polygon(ring) for ring in sums])
+            self.nfp_cache.put((keyA, keyB), nfp)
+        offset = ringA[0] - ringB[0]
+        return translate(nfp, offset[0], offset[1])
+
+    def inner_fit_polygon(self, bin, ringB):
+        """Returns the IFP of an axis aligned rectangular bin (ie. a Rectangle) and a
+        moving polygon.
+
+        Parameters
+        ----------
+        bin     : PlacementObject
+            The bin
+        ringB   : numpy array (Vb,2)
+            Closed exterior ring of the moving polygon, relative to its reference
+            point
+
+        Returns
+        -------
+        shapely geometry
+            The positions of B's reference point where B is inside the bin: a
+            rectangle, or a degenerate (or empty) geometry if B barely (or does not)
+            fit
+
+        """
+        minx, miny, maxx, maxy = bin.bounds()
+        low, high = np.min(ringB, axis=0), np.max(ringB, axis=0)
+        left, bottom, right, top = minx - low[0], miny - low[1], maxx - high[0], maxy - high[1]
+        if (right < left or top < bottom):
+            return Polygon()
+        return box(left, bottom, right, top)
+
+    def feasible_region(self, state, ringB):
+        """Returns the positions where a moving polygon can be placed in a state: the
+        IFP of the state's bin minus the NFPs of the placed objects.
+
+        Parameters
+        ----------
+        state   : State
+            The state
+        ringB   : numpy array (Vb,2)
+            Closed exterior ring of the moving polygon, relative to its reference
+            point
+
+        Returns
+        -------
+        shapely geometry
+            The feasible positions of B's reference point. Positions on the boundary
+            of the region place B in contact with the bin or placed objects.
+
+        """
+        region = self.inner_fit_polygon(state.bin, ringB)
+        if (region.is_empty or len(state.objects) == 0):
+            return region
+        # Only the objects which reach the IFP grown by B's extent can matter
+        minx, miny, maxx, maxy = region.bounds
+        low, high = np.min(ringB, axis=0), np.max(ringB, axis=0)
+        nearby = state.query_indices((minx + low[0], miny + low[1], maxx + high[0], maxy + high[1]))
+        if len(nearby) == 0:
+            return region
+        nfps = unary_union([self.no_fit_polygon(state.objects.vertices(i), ringB) for i in nearby])
+        return region.difference(nfps)
@@ -0,0 +1,72 @@
+from nfp import *
+from mdp import *
+
+class NFPPolicy(Policy):
+    """This is a bottom left fill policy for irregular objects: it places the next
+    object at the lowest, then leftmost, vertex of its feasible region (see
+    NoFitPolygons.feasible_region), over num_rotations rotations, keeping the
+    rotation whose placed object has the lowest top. The object then touches the
+    bin or placed objects without overlapping them, so objects pack by their exact
+    shapes instead of their bounding boxes. No-fit polygons are cached across
+    actions and episodes by the policy's NoFitPolygons.
+    """
+
+    def __init__(self, bin_length, bin_width, rng=None, num_rotations=4, cache_size=4096):
+        """Initializes a no-fit polygon policy given bin dimensions.
+
+        Parameters
+        ----------
+        bin_length      : int
+            Bin length dimension (x)
+        bin_width       : int
+            Bin width dimension (y)
+        rng             : numpy.random.Generator, optional
+            Random number generator, unused since the policy is deterministic
+        num_rotations   : int, optional
+            Number of rotations of the next object which are tried, evenly spaced, 4 by default
+        cache_size      : int, optional
+            Size of the caches of the NoFitPolygons engine, 4096 by default
+
+        Returns
+        -------
+        NFPPolicy
+            An instance of NFPPolicy with the above parameters
+
+        """
+        super(NFPPolicy, self).__init__(bin_length, bin_width, rng)
+        self.num_rotations = num_rotations
+        self.nfps = NoFitPolygons(cache_size)
+
+    def get_action(self, state):
+        """Returns the bottom left placement of the next object over all rotations.
+        If the next object fits nowhere, it is placed at the origin, unrotated.
+
+        Parameters
+        ----------
+        state       : State
+            Starting state
+
+        Returns
+        -------
+        action      : Action
+            An action to take from this state.
+
+        """
+        points = state.next_object.vertices()
+        best, best_top = None, np.inf
+        for k in range(self.num_rotations):
+            theta = k * 2*np.pi / self.num_rotations
+            rotation = np.array([[np.cos(theta), -np.sin(theta), 0],
+                                 [np.sin(theta), np.cos(theta), 0],
+                                 [0, 0, 1]])
+            ring = transform_points(points, rotation[None])[0]
+            spot = bottom_left_point(self.nfps.feasible_region(state, ring))
+            if (spot is None):
+                continue
+            top = spot[1] + np.max(ring[:, 1])
+            if (top < best_top - 0.0001):
+                rotation[:2, 2] = spot
+                best, best_top = rotation, top
+        if (best is None):
+            return Action(np.eye(3), state.next_object)
+        return Action(best, state.next_object)
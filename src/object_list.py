@@ -0,0 +1,286 @@
+from spatial_index import *
+from object_store import *
+
+class _Backing:
+    """Storage shared by several ObjectLists: an append-only ObjectStore of objects
+    and a spatial index over their bounding boxes, which is filled in lazily. The
+    index is made of one GridIndex per chunk of the store, so that branches can
+    share the indexes of the chunks they share (see prefix).
+    """
+
+    def __init__(self, store, cell_size, indexes=()):
+        self.store = store
+        self.cell_size = cell_size
+        self.indexes = list(indexes)
+        self.indexed = sum(len(index) for index in self.indexes)
+
+    def sync_index(self, length):
+        """Inserts the bounding boxes of the first `length` objects that are not
+        indexed yet.
+        """
+        for i in range(self.indexed, length):
+            chunk = i // CHUNK_SIZE
+            if chunk == len(self.indexes):
+                self.indexes.append(GridIndex(self.cell_size))
+            self.indexes[chunk].insert(self.store.bounds(i))
+        self.indexed = max(self.indexed, length)
+
+    def query(self, bounds, length):
+        """Returns the sorted positions of the first `length` objects whose bounding
+        boxes overlap the input bounding box.
+        """
+        self.sync_index(length)
+        result = []
+        for chunk, index in enumerate(self.indexes[:-(-length // CHUNK_SIZE)]):
+            start = chunk * CHUNK_SIZE
+            result.extend(start + i for i in index.query(bounds) if start + i < length)
+        return result
+
+    def prefix(self, length):
+        """Returns a new backing with the first `length` objects, for a branch. It
+        shares the store's full chunks and their indexes, and copies the rest of
+        the last chunk (see ObjectStore.prefix and GridIndex.copy).
+        """
+        self.sync_index(length)
+        full, partial = divmod(length, CHUNK_SIZE)
+        indexes = self.indexes[:full]
+        if partial > 0:
+            indexes.append(self.indexes[full].copy(partial))
+        return _Backing(self.store.prefix(length), self.cell_size, indexes)
+
+
+class ObjectList:
+    """This class is a persistent list of placed objects with structural sharing.
+    An ObjectList is a view of the first `length` items of an append-only backing
+    list, and copies of it share that backing list. Because items are never removed
+    or replaced, every prefix of the backing list stays valid, so:
+    1) copying an ObjectList is O(1) and copies no objects
+    2) appending to the longest view of a backing list appends in place, O(1)
+    3) appending to a shorter view (ie. a branch from an earlier state) starts a
+       new backing list first, so other views never change. The new backing list
+       shares all but the last, partially filled chunk of the old one (see
+       ObjectStore.prefix), so branching is O(1) in the number of objects
+
+    The backing list is an ObjectStore, so placed objects are kept as compact arrays
+    and indexing or iterating yields PlacementObject views created on demand. It
+    also carries a spatial index over the objects' bounding boxes, which is shared
+    by all views and only covers the objects that were queried for. Branches share
+    the index of the objects they share in the same way.
+    """
+
+    def __init__(self, objects=(), cell_size=1.0):
+        """Initializes an ObjectList, given its objects and the cell size of its
+        spatial index.
+
+        Parameters
+        ----------
+        objects     : iterable, optional
+            PlacementObjects already placed in the bin, empty by default
+        cell_size   : float, optional
+            Side length of the grid cells of the spatial index, 1.0 by default
+
+        Returns
+        -------
+        ObjectList
+            An instance of ObjectList with the above parameters
+
+        """
+        store = ObjectStore()
+        for object in objects:
+            store.append(object)
+        self._backing = _Backing(store, cell_size)
+        self._length = len(store)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        store = self._backing.store
+        for i in range(self._length):
+            yield store.view(i)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self._backing.store.view(i) for i in range(*key.indices(self._length))]
+        if key < 0:
+            key += self._length
+        if key < 0 or key >= self._length:
+            raise IndexError("ObjectList index out of range")
+        return self._backing.store.view(key)
+
+    def __repr__(self):
+        return repr(list(self))
+
+    def append(self, object):
+        """Appends a placed object to this list without changing any of its copies.
+
+        Parameters
+        ----------
+        object  : PlacementObject
+            An object placed in the bin
+
+        """
+        backing = self._backing
+        if self._length != len(backing.store):
+            # Another view already appended past our end: branch off
+            backing = backing.prefix(self._length)
+            self._backing = backing
+        backing.store.append(object)
+        self._length += 1
+
+    def copy(self):
+        """Returns a copy of this list which shares all of its storage. O(1).
+
+        Returns
+        -------
+        ObjectList
+            A copy of this instance of ObjectList
+
+        """
+        copy = ObjectList.__new__(ObjectList)
+        copy._backing = self._backing
+        copy._length = self._length
+        return copy
+
+    def query_indices(self, bounds):
+        """Returns the positions of the objects whose bounding boxes overlap the
+        input bounding box.
+
+        Parameters
+        ----------
+        bounds  : tuple
+            (minx, miny, maxx, maxy) bounding box to query, may use infinity
+
+        Returns
+        -------
+        list
+            Sorted positions of the nearby objects in this list
+
+        """
+        return self._backing.query(bounds, self._length)
+
+    def bounds(self, i):
+        """Returns the precomputed axis aligned bounding box of the i-th object.
+
+        Parameters
+        ----------
+        i   : int
+            Position of the object in this list
+
+        Returns
+        -------
+        numpy array (4,)
+            (minx, miny, maxx, maxy) of the object
+
+        """
+        return self._backing.store.bounds(i)
+
+    def all_bounds(self, indices=None):
+        """Returns the precomputed bounding boxes of all objects in this list, or of
+        some of them.
+
+        Parameters
+        ----------
+        indices : list, optional
+            Positions of the objects in this list, all of them (None) by default
+
+        Returns
+        -------
+        numpy array (N,4)
+            Rows of (minx, miny, maxx, maxy), one per object
+
+        """
+        return self._backing.store.column("aabbs", self._length, indices)
+
+    def areas(self):
+        """Returns the precomputed areas of all objects in this list.
+
+        Returns
+        -------
+        numpy array (N,)
+            The area of each object
+
+        """
+        return self._backing.store.column("areas", self._length)
+
+    def placed_area(self, count=None):
+        """Returns the total area of the objects in this list, from running totals
+        kept as objects are appended. O(1).
+
+        Parameters
+        ----------
+        count   : int, optional
+            Only count the first `count` objects, all of them (None) by default
+
+        Returns
+        -------
+        float
+            The sum of the areas of the objects
+
+        """
+        if count is None or count > self._length:
+            count = self._length
+        return self._backing.store.placed_area(count)
+
+    def vertices(self, i):
+        """Returns the world space points of the i-th object, without creating a
+        PlacementObject.
+
+        Parameters
+        ----------
+        i   : int
+            Position of the object in this list
+
+        Returns
+        -------
+        numpy array (V,2)
+            The transformed points of the object's exterior ring
+
+        """
+        return self._backing.store.vertices(i)
+
+    def padded_vertices(self, indices):
+        """Returns the world space points of several objects as one padded array (see
+        ObjectStore.padded_vertices).
+
+        Parameters
+        ----------
+        indices : list
+            Positions of the objects in this list
+
+        Returns
+        -------
+        numpy array (M,V,2)
+            The closed, padded exterior ring of each object
+
+        """
+        return self._backing.store.padded_vertices(indices)
+
+    def digest(self):
+        """Returns the content digest of the objects in this list (see
+        ObjectStore.digest). O(1).
+
+        Returns
+        -------
+        bytes
+            A digest which is equal for lists of identical objects
+
+        """
+        return self._backing.store.digest(self._length)
+
+    def convex(self, indices=None):
+        """Returns whether each object in this list is convex, or each of some of
+        them.
+
+        Parameters
+        ----------
+        indices : list, optional
+            Positions of the objects in this list, all of them (None) by default
+
+        Returns
+        -------
+        numpy array (N,) of bool
+            True for the convex objects
+
+        """
+        return self._backing.store.column("convex", self._length, indices)
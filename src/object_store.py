@@ -0,0 +1,341 @@
+from collision import *
+
+# Number of objects per chunk of an ObjectStore
+CHUNK_SIZE = 32
+
+# Attributes of a PlacementObject that the store keeps in its arrays, or that a
+# view rebuilds (see PlacementObject._init_points). Any other attribute (ie. a
+# Rectangle's length and width) is stored with the object's class.
+_VIEW_ATTRIBUTES = frozenset(["points", "type", "transform", "rotation", "translation", "_vertices", "_polygon"])
+
+class _Chunk:
+    """Up to CHUNK_SIZE consecutive objects of an ObjectStore, as arrays (see
+    ObjectStore). Rows are never modified once written, and a chunk is only
+    appended to by the one store that created it.
+    """
+
+    def __init__(self, vertex_capacity=64):
+        self.count = 0
+        self.num_points = 0
+        self.points = np.empty((max(vertex_capacity, 1), 2))
+        self.offsets = np.zeros(CHUNK_SIZE + 1, dtype=np.intp)
+        self.transforms = np.empty((CHUNK_SIZE, 3, 3))
+        self.aabbs = np.empty((CHUNK_SIZE, 4))
+        self.areas = np.empty(CHUNK_SIZE)
+        self.cumulative_areas = np.empty(CHUNK_SIZE)
+        self.convex = np.empty(CHUNK_SIZE, dtype=bool)
+        self.types = []
+        self.classes = []
+        self.digests = []
+
+    def prefix(self, count):
+        """Returns a new chunk with the first `count` rows of this one.
+        """
+        num_points = int(self.offsets[count])
+        chunk = _Chunk(max(num_points, 64))
+        chunk.points[:num_points] = self.points[:num_points]
+        for name in ("offsets", "transforms", "aabbs", "areas", "cumulative_areas", "convex"):
+            getattr(chunk, name)[:count + (name == "offsets")] = getattr(self, name)[:count + (name == "offsets")]
+        chunk.types = self.types[:count]
+        chunk.classes = self.classes[:count]
+        chunk.digests = self.digests[:count]
+        chunk.count = count
+        chunk.num_points = num_points
+        return chunk
+
+class ObjectStore:
+    """This class is a compact, append-only struct-of-arrays store for the objects
+    placed in a bin. Instead of one Python PlacementObject per placed object, it
+    keeps, in chunks of CHUNK_SIZE consecutive objects:
+    1) one contiguous float array with the original (un-transformed) points of
+       every object, and the offset at which each object's points start
+    2) one array of 3x3 transforms, one per object
+    3) precomputed world space axis aligned bounding boxes and areas, running
+       totals of the areas, and whether each object is convex
+    4) the type string of every object, and its class with any attributes of
+       the class (ie. a Rectangle's length and width)
+    5) a chain of content digests: the digest of an object combined with the
+       digest of all objects before it, so any prefix of the store can be hashed
+       in O(1)
+
+    PlacementObjects are only created on demand, as views of these arrays (see view).
+    Rows are never modified once appended, and full chunks are never modified at
+    all, so views stay valid and prefixes of a store share its full chunks (see
+    prefix).
+    """
+
+    def __init__(self):
+        """Initializes an empty store. Chunks are added as objects are appended.
+
+        Returns
+        -------
+        ObjectStore
+            An instance of ObjectStore with no objects
+
+        """
+        self.count = 0
+        self.chunks = []
+
+    def __len__(self):
+        return self.count
+
+    def _locate(self, i):
+        """Returns the chunk of the i-th object and the object's row in it.
+        """
+        return self.chunks[i // CHUNK_SIZE], i % CHUNK_SIZE
+
+    def append(self, object):
+        """Appends a placed object to the store, copying its points and transform
+        into the arrays and computing its bounding box and area.
+
+        Parameters
+        ----------
+        object  : PlacementObject
+            An object placed in the bin
+
+        Returns
+        -------
+        int
+            The position of the new object in the store
+
+        """
+        i = self.count
+        if (i % CHUNK_SIZE == 0):
+            self.chunks.append(_Chunk())
+        chunk, row = self._locate(i)
+        points = object.points
+        n = len(points)
+        if (chunk.num_points + n > len(chunk.points)):
+            grown = np.empty((max(chunk.num_points + n, 2 * len(chunk.points)), 2))
+            grown[:chunk.num_points] = chunk.points[:chunk.num_points]
+            chunk.points = grown
+        chunk.points[chunk.num_points:chunk.num_points + n] = points
+        chunk.num_points += n
+        chunk.offsets[row + 1] = chunk.num_points
+        chunk.transforms[row] = object.transform
+        chunk.aabbs[row] = object.bounds()
+        vertices = object.vertices()
+        x, y = vertices[:, 0], vertices[:, 1]
+        chunk.areas[row] = abs(np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1])) / 2
+        chunk.cumulative_areas[row] = self.placed_area(i) + chunk.areas[row]
+        chunk.convex[row] = is_convex(points)
+        chunk.types.append(object.type)
+        extras = {name: value for name, value in object.__dict__.items() if name not in _VIEW_ATTRIBUTES}
+        chunk.classes.append((object.__class__, extras or None))
+        chunk.digests.append(hashlib.blake2b(self.digest(i) + object.digest(), digest_size=16).digest())
+        chunk.count += 1
+        self.count += 1
+        return i
+
+    def digest(self, count):
+        """Returns the content digest of the first `count` objects of the store.
+
+        Parameters
+        ----------
+        count   : int
+            Number of objects
+
+        Returns
+        -------
+        bytes
+            A digest which is equal for stores with identical first `count` objects
+
+        """
+        if count == 0:
+            return b""
+        chunk, row = self._locate(count - 1)
+        return chunk.digests[row]
+
+    def placed_area(self, count):
+        """Returns the total area of the first `count` objects of the store. O(1).
+
+        Parameters
+        ----------
+        count   : int
+            Number of objects
+
+        Returns
+        -------
+        float
+            The sum of the areas of the objects
+
+        """
+        if count == 0:
+            return 0.0
+        chunk, row = self._locate(count - 1)
+        return float(chunk.cumulative_areas[row])
+
+    def bounds(self, i):
+        """Returns the precomputed bounding box of the i-th object.
+
+        Parameters
+        ----------
+        i   : int
+            Position of the object in the store
+
+        Returns
+        -------
+        numpy array (4,)
+            (minx, miny, maxx, maxy) of the object
+
+        """
+        chunk, row = self._locate(i)
+        return chunk.aabbs[row]
+
+    def column(self, name, count, indices=None):
+        """Returns a per-object array (aabbs, areas or convex) for the first
+        `count` objects, or for some of them.
+
+        Parameters
+        ----------
+        name    : str
+            "aabbs", "areas" or "convex"
+        count   : int
+            Number of objects
+        indices : numpy array (M,) of int, optional
+            Positions of the objects, all of the first `count` (None) by default
+
+        Returns
+        -------
+        numpy array
+            The rows of the objects, in order. With a single chunk, and no indices,
+            this is a view of the store's array.
+
+        """
+        if indices is None:
+            parts = [getattr(chunk, name)[:min(CHUNK_SIZE, count - k * CHUNK_SIZE)]
+                     for k, chunk in enumerate(self.chunks[:-(-count // CHUNK_SIZE)])]
+            if len(parts) == 1:
+                return parts[0]
+            if len(parts) == 0:
+                return getattr(_Chunk(1), name)[:0]
+            return np.concatenate(parts)
+        indices = np.asarray(indices, dtype=np.intp)
+        if (len(self.chunks) == 1):
+            return getattr(self.chunks[0], name)[indices]
+        chunks, rows = np.divmod(indices, CHUNK_SIZE)
+        first = getattr(self.chunks[0], name)
+        result = np.empty((len(indices),) + first.shape[1:], dtype=first.dtype)
+        for k in np.unique(chunks):
+            selected = chunks == k
+            result[selected] = getattr(self.chunks[k], name)[rows[selected]]
+        return result
+
+    def original_points(self, i):
+        """Returns the original, un-transformed points of the i-th object.
+
+        Parameters
+        ----------
+        i   : int
+            Position of the object in the store
+
+        Returns
+        -------
+        numpy array (V,2)
+            A view of the object's points in the store
+
+        """
+        chunk, row = self._locate(i)
+        return chunk.points[chunk.offsets[row]:chunk.offsets[row + 1]]
+
+    def vertices(self, i):
+        """Returns the world space points of the i-th object.
+
+        Parameters
+        ----------
+        i   : int
+            Position of the object in the store
+
+        Returns
+        -------
+        numpy array (V,2)
+            The object's points transformed by its transform
+
+        """
+        chunk, row = self._locate(i)
+        transform = chunk.transforms[row]
+        return np.matmul(chunk.points[chunk.offsets[row]:chunk.offsets[row + 1]], transform[:2,:2].T) + transform[:2,2]
+
+    def padded_vertices(self, indices):
+        """Returns the world space points of several objects as one padded array,
+        gathered and transformed in one batched pass per chunk.
+
+        Parameters
+        ----------
+        indices : numpy array (M,) of int
+            Positions of the objects in the store
+
+        Returns
+        -------
+        numpy array (M,V,2)
+            The closed exterior ring of each object, padded by repeating its
+            last point, where V is the largest number of points of the objects
+
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        chunks, rows = np.divmod(indices, CHUNK_SIZE)
+        counts = np.empty(len(indices), dtype=np.intp)
+        for k in np.unique(chunks):
+            selected = chunks == k
+            offsets = self.chunks[k].offsets
+            counts[selected] = offsets[rows[selected] + 1] - offsets[rows[selected]]
+        width = int(counts.max()) if len(indices) > 0 else 0
+        result = np.empty((len(indices), width, 2))
+        for k in np.unique(chunks):
+            selected = chunks == k
+            chunk = self.chunks[k]
+            starts = chunk.offsets[rows[selected]]
+            gather = starts[:, None] + np.minimum(np.arange(width)[None, :], counts[selected][:, None] - 1)
+            transforms = chunk.transforms[rows[selected]]
+            result[selected] = (np.einsum('mij,mvj->mvi', transforms[:, :2, :2], chunk.points[gather]) +
+                                transforms[:, None, :2, 2])
+        return result
+
+    def view(self, i):
+        """Returns a PlacementObject for the i-th object, of the class it was
+        appended with (ie. a Rectangle) and with the same attributes. It shares the
+        store's points and transform, and builds its polygon lazily.
+
+        Parameters
+        ----------
+        i   : int
+            Position of the object in the store
+
+        Returns
+        -------
+        PlacementObject
+            A placement object equivalent to the one appended at position i
+
+        """
+        chunk, row = self._locate(i)
+        cls, extras = chunk.classes[row]
+        obj = cls.__new__(cls)
+        if extras is not None:
+            obj.__dict__.update(extras)
+        obj._init_points(chunk.points[chunk.offsets[row]:chunk.offsets[row + 1]], chunk.transforms[row], chunk.types[row])
+        return obj
+
+    def prefix(self, count):
+        """Returns a new store containing only the first `count` objects of this one.
+        The new store shares this store's full chunks, and only copies the rows of
+        a partially used chunk, so this is O(CHUNK_SIZE) whatever the number of
+        objects. Appending to either store never changes the other.
+
+        Parameters
+        ----------
+        count   : int
+            Number of objects to keep
+
+        Returns
+        -------
+        ObjectStore
+            A new instance of ObjectStore
+
+        """
+        store = ObjectStore()
+        full, partial = divmod(count, CHUNK_SIZE)
+        store.chunks = self.chunks[:full]
+        if partial > 0:
+            store.chunks.append(self.chunks[full].prefix(partial))
+        store.count = count
+        return store
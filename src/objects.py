@@ -1,11 +1,15 @@
 # from utils import *
-from matplotlib import pyplot
 from shapely.geometry import Polygon
 from shapely.geometry import Point
-from descartes.patch import PolygonPatch
+import hashlib
 import math
 import random
 import numpy as np
+from random_state import *
+from log import *
+from profiling import *
+
+_logger = get_logger(__name__)
 
 
 class BagOfPoints:
@@ -30,7 +34,7 @@ class BagOfPoints:
         self.list_of_points = list(list_of_points)
 
     @staticmethod
-    def generate_random(number, bound):
+    def generate_random(number, bound, rng=None):
         """Generates a random BagOfPoints given a number of points and a size length
         for a bounding square within which to generate the points.
 
@@ -40,6 +44,8 @@ class BagOfPoints:
             Number of points
         bound   : int
             Side length for a bounding square within which to generate points
+        rng     : numpy.random.Generator, optional
+            Random number generator, the default generator (None) by default
 
         Returns
         -------
@@ -51,9 +57,10 @@ class BagOfPoints:
         bounding_square = Square(bound, np.eye(3))
         minx, miny = -bound, -bound
         maxx, maxy = bound, bound
+        rng = get_rng(rng)
         counter = 0
         while counter < number:
-            pnt = (np.random.randint(minx, maxx), np.random.randint(miny, maxy))
+            pnt = (rng.integers(minx, maxx), rng.integers(miny, maxy))
             if bounding_square.get_polygon().contains(Point(pnt)):
                 list_of_pts.append(pnt)
                 counter += 1
@@ -66,6 +73,11 @@ class PlacementObject:
     A placement object has, at minimum, a polygon, transform, and a type.
     The polygon is already transformed to be in the orientation specified by the
     transform from origin (0,0) in world space coordinates.
+
+    Internally, a placement object only stores its original, un-transformed points
+    and the accumulated transform. The transformed vertices and the shapely polygon
+    are built lazily, the first time a caller asks for them, and are cached until
+    the transform changes.
     """
 
     def __init__(self, polygon, transform=np.eye(3), type="square"):
@@ -86,16 +98,38 @@ class PlacementObject:
             An instance of PlacementObject with the above parameters
 
         """
-        self.polygon = polygon
-        self.points = np.array(self.polygon.exterior.coords) # original, un-transformed points
-        self.transform = transform
-        self.rotation = transform[:2,:2]
-        self.translation = transform[:2,2]
+        self._init_points(np.array(polygon.exterior.coords), transform, type)
+        if np.array_equal(transform, np.eye(3)):
+            # The input polygon is already in place, so it does not need rebuilding
+            self._polygon = polygon
+
+    def _init_points(self, points, transform, type):
+        """Initializes the stored points, transform and type of this PlacementObject
+        without building any shapely geometry.
+
+        Parameters
+        ----------
+        points      : numpy array (V,2)
+            The original, un-transformed points of the polygon's exterior ring
+        transform   : numpy array
+            A 3x3 homogeneous coordinates transformation matrix
+        type        : str
+            The type of polygon
+
+        """
+        self.points = points # original, un-transformed points
         self.type = type
-        # Apply the transform without changing the self.points
-        ext = np.matmul(self.rotation, self.points.T).T
-        ext += self.translation
-        self.polygon = Polygon(ext)
+        self.set_transform(transform)
+
+    @property
+    def polygon(self):
+        """The shapely Polygon of this PlacementObject in world space coordinates,
+        built from the transformed points the first time it is needed.
+        """
+        if self._polygon is None:
+            profile_count("polygon_constructions")
+            self._polygon = Polygon(self.vertices())
+        return self._polygon
 
     def get_polygon(self):
         """Getter method for this PlacementObject's polygon.
@@ -131,21 +165,21 @@ class PlacementObject:
         return self.transform
 
     def set_transform(self, transform):
-        """Setter method for this PlacementObject's tranform.  Only use this if
-        you want to set the transform but NOT apply it. Called by apply_transform
-        to update stored transform to the one just applied.
+        """Setter method for this PlacementObject's tranform, which maps the original
+        points to world space. Called by apply_transform to update stored transform
+        to the one just applied. Clears the cached vertices and polygon.
         """
         self.transform = transform
         self.rotation = transform[:2,:2]
         self.translation = transform[:2,2]
+        self._vertices = None
+        self._polygon = None
 
     def apply_transform(self, transform):
-        """Applies the input transform to the polygon:
-        1) Retrieves the currently transformed points of this polygon
-        2) Apply the transform to those points
-        3) Generate a new shapely Polygon with those points
-        4) Reset self.polygon and call set_transform to update self's transform parameters
-        5) DO NOT update self.points (these should remain the untransformed points of the original polygon)
+        """Applies the input transform to the polygon by composing it with the stored
+        transform (a single 3x3 matrix multiplication). The transformed points and
+        polygon are only rebuilt when they are next needed. self.points is not
+        updated (these remain the untransformed points of the original polygon).
 
         Parameters
         ----------
@@ -153,17 +187,53 @@ class PlacementObject:
             A 3x3 homogeneous coordinates transformation matrix
 
         """
-        # This lets you apply a new transform to the polygon
-        rotation = transform[:2,:2]
-        translation = transform[:2,2]
-        # Retrieve the currently transformed points and apply transform to them
-        points = np.array(self.polygon.exterior.coords)
-        points = np.matmul(rotation, points.T).T
-        points += translation
-        self.polygon = Polygon(points)
-        # Remember to update the stored transform. DO NOT update self.points
-        new_transform = np.matmul(transform, self.transform)
-        self.set_transform(new_transform)
+        self.set_transform(np.matmul(transform, self.transform))
+
+    def vertices(self):
+        """Returns the transformed points of this PlacementObject's exterior ring,
+        without building a shapely polygon.
+
+        Returns
+        -------
+        numpy array (V,2)
+            The points of self.points transformed by self.transform
+
+        """
+        if self._vertices is None:
+            self._vertices = np.matmul(self.points, self.rotation.T) + self.translation
+        return self._vertices
+
+    def bounds(self):
+        """Returns the bounds of the axis aligned bounding box of this PlacementObject,
+        without building a shapely polygon.
+
+        Returns
+        -------
+        tuple
+            (minx, miny, maxx, maxy) of the transformed points
+
+        """
+        vertices = self.vertices()
+        minx, miny = np.min(vertices, axis=0)
+        maxx, maxy = np.max(vertices, axis=0)
+        return (minx, miny, maxx, maxy)
+
+    def digest(self):
+        """Returns a hash of the content of this PlacementObject: its original
+        points, transform and type. Objects with identical content (ie. copies,
+        or the same object placed by the same action twice) have equal digests.
+
+        Returns
+        -------
+        bytes
+            A 16 byte BLAKE2 digest
+
+        """
+        h = hashlib.blake2b(digest_size=16)
+        h.update(np.ascontiguousarray(self.points, dtype=float).tobytes())
+        h.update(np.ascontiguousarray(self.transform, dtype=float).tobytes())
+        h.update(self.type.encode())
+        return h.digest()
 
     def bounding_box(self):
         """Returns the axis aligned bounding box of this PlacementObject.
@@ -175,16 +245,12 @@ class PlacementObject:
             aligned bounding box of self's polygon.
 
         """
-        points = np.array(self.polygon.exterior.coords)
-        biggest_x = np.max(points, axis=0)[0]   # biggest x among the points of this object
-        biggest_y = np.max(points, axis=0)[1]   # biggest x among the points of this object
-        smallest_x = np.min(points, axis=0)[0]  # smallest y seen among points of this object
-        smallest_y = np.min(points, axis=0)[1]  # smallest y seen among points of this object
+        smallest_x, smallest_y, biggest_x, biggest_y = self.bounds()
         length = biggest_x - smallest_x
         width = biggest_y - smallest_y
-        bounds = [(smallest_x, smallest_y),(smallest_x, biggest_y),(biggest_x, biggest_y),(biggest_x, smallest_y)]
-        poly = Polygon(bounds)
-        obj = PlacementObject(poly)
+        bounds = [(smallest_x, smallest_y),(smallest_x, biggest_y),(biggest_x, biggest_y),(biggest_x, smallest_y),(smallest_x, smallest_y)]
+        obj = PlacementObject.__new__(PlacementObject)
+        obj._init_points(np.array(bounds), np.eye(3), "square")
         obj.length = length
         obj.width = width
         return obj
@@ -204,30 +270,41 @@ class PlacementObject:
         return obj
 
     def copy(self):
-        """Returns a shallow copy of this PlacementObject.
+        """Returns a shallow copy of this PlacementObject. The copy shares the
+        original points and any cached geometry with self, so no geometry is
+        built or copied.
 
         Returns
         -------
         PlacementObject
-            An instance of PlacementObject with the same parameters as self.
+            An instance of PlacementObject (of the same class as self) with the
+            same parameters as self.
 
         """
-        return PlacementObject(self.polygon, self.transform, self.type)
+        obj = self.__class__.__new__(self.__class__)
+        obj.__dict__.update(self.__dict__)
+        return obj
 
     @staticmethod
-    def get_random():
+    def get_random(rng=None):
         """Returns a random PlacementObject generated from a random BagOfPoints.
 
+        Parameters
+        ----------
+        rng : numpy.random.Generator, optional
+            Random number generator, the default generator (None) by default
+
         Returns
         -------
         PlacementObject
             An instance of PlacementObject generated with 3-8 vertices, bounded by a 2-10 side length square
 
         """
-        number_of_vertices = np.random.randint(3, 8)
-        size_bound = np.random.randint(2, 10)
-        bop = BagOfPoints.generate_random(number_of_vertices, size_bound)
-        print("Random polygon has points = " + str(bop.list_of_points) + "\n")
+        rng = get_rng(rng)
+        number_of_vertices = rng.integers(3, 8)
+        size_bound = rng.integers(2, 10)
+        bop = BagOfPoints.generate_random(number_of_vertices, size_bound, rng)
+        _logger.debug("Random polygon has points = %s", bop.list_of_points)
         # Get the minimum area bounding box for this object and return it
         # shape = AbstractShape(bop.list_of_points, np.eye(3))
         base_polygon = Polygon(bop.list_of_points)
@@ -264,11 +341,10 @@ class Square(PlacementObject):
         bottom_right = (side_length/2, -side_length/2)
         ext = np.array([bottom_left, top_left, top_right, bottom_right, bottom_left])
 
-        polygon = Polygon(ext)
-        super(Square, self).__init__(polygon, transform, "square")
+        self._init_points(ext, transform, "square")
 
     @staticmethod
-    def get_random(min_side_length, max_side_length):
+    def get_random(min_side_length, max_side_length, rng=None):
         """Returns a random Square object with side length between the passed in
         minimum and maximum.
 
@@ -278,6 +354,8 @@ class Square(PlacementObject):
             Minimum side length of random square
         max_side_length : int
             Maximum side length of random square
+        rng             : numpy.random.Generator, optional
+            Random number generator, the default generator (None) by default
 
         Returns
         -------
@@ -288,7 +366,7 @@ class Square(PlacementObject):
         """
         # Generates a random square with min and max side lengths specified
         # Make it not and not translated from (0,0)
-        s = np.random.randint(min_side_length, max_side_length)
+        s = get_rng(rng).integers(min_side_length, max_side_length)
         # theta = np.random.uniform(0, 2*np.pi)
         # transform = np.array([[np.cos(theta), -np.sin(theta), 0],
         #                       [np.sin(theta), np.cos(theta), 0],
@@ -320,18 +398,16 @@ class Rectangle(PlacementObject):
         self.length = length
         self.width = width
         self.area = length * width
-        self.transform = transform
         bottom_left = (-length/2, -width/2)
         top_left = (-length/2, width/2)
         top_right = (length/2, width/2)
         bottom_right = (length/2, -width/2)
-        ext = [bottom_left, top_left, top_right, bottom_right, bottom_left]
+        ext = np.array([bottom_left, top_left, top_right, bottom_right, bottom_left])
 
-        polygon = Polygon(ext)
-        super(Rectangle, self).__init__(polygon, transform, "rectangle")
+        self._init_points(ext, transform, "rectangle")
 
     @staticmethod
-    def get_random(min_side_length, max_side_length):
+    def get_random(min_side_length, max_side_length, rng=None):
         """Returns a random Rectangle object with length and width between the
         passed in minimum and maximum side lengths.
 
@@ -341,6 +417,8 @@ class Rectangle(PlacementObject):
             Minimum side length (or width) of a random rectangle
         max_side_length : int
             Maximum side length (or width) of a random rectangle
+        rng             : numpy.random.Generator, optional
+            Random number generator, the default generator (None) by default
 
         Returns
         -------
@@ -351,25 +429,15 @@ class Rectangle(PlacementObject):
         """
         # Generates a random rectangle with min and max side lengths specified
         # Make it randomly rotated but not translated from (0,0)
-        l = np.random.randint(min_side_length, max_side_length)
-        w = np.random.randint(min_side_length, max_side_length)
+        rng = get_rng(rng)
+        l = rng.integers(min_side_length, max_side_length)
+        w = rng.integers(min_side_length, max_side_length)
         # theta = np.random.uniform(0, 2*np.pi)
         # transform = np.array([[np.cos(theta), -np.sin(theta), 0],
         #                       [np.sin(theta), np.cos(theta), 0],
         #                       [0, 0, 1]])
         return Rectangle(l, w, np.eye(3))
 
-    def copy(self):
-        """Returns a shallow copy of this rectangle.
-
-        Returns
-        -------
-        Rectangle
-            An instance of Rectangle with the same parameters as self.
-
-        """
-        return Rectangle(self.length, self.width, self.transform)
-
 class AbstractShape(PlacementObject):
     """This is a representation of an abstractly shaped PlacementObject.
     """
@@ -0,0 +1,186 @@
+from collision import *
+
+# Side length of the cells of State.occupancy grids, in bin units
+DEFAULT_RESOLUTION = 0.25
+
+# Number of rows of the tiles that grids copy on write
+TILE_ROWS = 8
+
+class OccupancyGrid:
+    """This class is a rasterized occupancy map of a bin: a grid of square cells
+    over the bin's bounding box, where a cell is occupied if its center lies inside
+    a placed object. Two polygons which contain the same cell center overlap, so a
+    candidate placement whose footprint (the cells whose centers it contains)
+    touches an occupied cell can be rejected with array indexing alone, before any
+    exact geometry. The converse does not hold: a free footprint still needs an
+    exact check, since thin overlaps can fall between cell centers.
+    An occupancy grid contains:
+    1) the resolution (cell side length) and the origin of the grid, at the
+       lower left corner of the bin
+    2) a uint8 mask, 1 for the occupied cells, indexed [row (y)][column (x)],
+       stored as tiles of TILE_ROWS rows
+    3) the number of objects (from the start of a state's list) burned into it
+
+    Grids are immutable once built (see OccupancyGrid.of), so a state and its
+    copies can share them through the state's memo, and a grid shares the tiles
+    that its newer objects do not touch with the grid it was built from.
+
+    """
+
+    def __init__(self, bin, resolution=DEFAULT_RESOLUTION):
+        """Initializes an empty grid covering a bin.
+
+        Parameters
+        ----------
+        bin         : PlacementObject
+            The bin
+        resolution  : float, optional
+            Side length of the cells, DEFAULT_RESOLUTION by default
+
+        Returns
+        -------
+        OccupancyGrid
+            An instance of OccupancyGrid with no occupied cells
+
+        """
+        minx, miny, maxx, maxy = bin.bounds()
+        self.resolution = resolution
+        self.origin = np.array([minx, miny])
+        self.shape = (int(np.ceil((maxy - miny) / resolution - 1e-9)), int(np.ceil((maxx - minx) / resolution - 1e-9)))
+        self.tiles = [np.zeros((min(TILE_ROWS, self.shape[0] - row), self.shape[1]), dtype=np.uint8)
+                      for row in range(0, self.shape[0], TILE_ROWS)]
+        self.count = 0
+        self._mask = None
+
+    @staticmethod
+    def of(state, resolution=DEFAULT_RESOLUTION):
+        """Returns the occupancy grid of a state, burning in the objects placed
+        since the grid in the state's memo (inherited from the state it was copied
+        from) and storing the result back in the memo. Only the tiles which the
+        new objects touch are copied.
+
+        Parameters
+        ----------
+        state       : State
+            The state
+        resolution  : float, optional
+            Side length of the cells, DEFAULT_RESOLUTION by default
+
+        Returns
+        -------
+        OccupancyGrid
+            The grid with every object of the state burned in
+
+        """
+        key = ("occupancy", resolution)
+        grid = state.memo.get(key)
+        if grid is None or grid.count > len(state.objects):
+            grid = OccupancyGrid(state.bin, resolution)
+        if grid.count < len(state.objects):
+            new_grid = OccupancyGrid.__new__(OccupancyGrid)
+            new_grid.resolution = grid.resolution
+            new_grid.origin = grid.origin
+            new_grid.shape = grid.shape
+            new_grid.tiles = list(grid.tiles)
+            new_grid._mask = None
+            copied = set()
+            for i in range(grid.count, len(state.objects)):
+                new_grid._burn(state.objects.vertices(i), copied)
+            new_grid.count = len(state.objects)
+            grid = new_grid
+        state.memo[key] = grid
+        return grid
+
+    @property
+    def mask(self):
+        """The uint8 mask of the whole grid, 1 for the occupied cells, indexed
+        [row (y)][column (x)]. It is assembled from the tiles on first access.
+        """
+        if self._mask is None:
+            self._mask = np.concatenate(self.tiles)
+        return self._mask
+
+    def footprint(self, vertices):
+        """Returns the cells whose centers lie inside a polygon. Cells may lie
+        outside the grid (ie. negative indices) if the polygon is not in the bin.
+
+        Parameters
+        ----------
+        vertices    : numpy array (V,2)
+            Closed exterior ring of the polygon, in world space coordinates
+
+        Returns
+        -------
+        rows    : numpy array (K,) of int
+            Row (y) indices of the cells
+        cols    : numpy array (K,) of int
+            Column (x) indices of the cells
+
+        """
+        vertices = np.asarray(vertices, dtype=float)
+        # Cells whose centers are inside the polygon's bounding box
+        low = np.ceil((vertices.min(axis=0) - self.origin) / self.resolution - 0.5).astype(int)
+        high = np.floor((vertices.max(axis=0) - self.origin) / self.resolution - 0.5).astype(int)
+        cols, rows = np.meshgrid(np.arange(low[0], high[0] + 1), np.arange(low[1], high[1] + 1))
+        cols, rows = cols.ravel(), rows.ravel()
+        centers = self.origin + (np.stack([cols, rows], axis=1) + 0.5) * self.resolution
+        inside = points_in_polygon(centers, vertices)
+        return rows[inside], cols[inside]
+
+    def _burn(self, vertices, copied):
+        """Marks the cells of a polygon's footprint as occupied, in place, copying
+        the tiles it touches first unless they are in copied (the tiles that this
+        grid already owns), and adding them to it.
+        """
+        rows, cols = self._clip(*self.footprint(vertices))
+        tiles = rows // TILE_ROWS
+        for tile in np.unique(tiles):
+            if tile not in copied:
+                self.tiles[tile] = self.tiles[tile].copy()
+                copied.add(tile)
+            cells = tiles == tile
+            self.tiles[tile][rows[cells] - tile * TILE_ROWS, cols[cells]] = 1
+
+    def _clip(self, rows, cols):
+        """Drops the cells which lie outside the grid.
+        """
+        inside = (rows >= 0) & (rows < self.shape[0]) & (cols >= 0) & (cols < self.shape[1])
+        return rows[inside], cols[inside]
+
+    def is_free(self, vertices):
+        """Checks whether a polygon's footprint avoids every occupied cell. This
+        does not check that the polygon is inside the bin.
+
+        Parameters
+        ----------
+        vertices    : numpy array (V,2)
+            Closed exterior ring of the polygon, in world space coordinates
+
+        Returns
+        -------
+        bool
+            False if the polygon certainly overlaps a placed object, True if it
+            may not (an exact check is still needed)
+
+        """
+        rows, cols = self._clip(*self.footprint(vertices))
+        if self._mask is not None:
+            return not np.any(self._mask[rows, cols])
+        tiles = rows // TILE_ROWS
+        for tile in np.unique(tiles):
+            cells = tiles == tile
+            if np.any(self.tiles[tile][rows[cells] - tile * TILE_ROWS, cols[cells]]):
+                return False
+        return True
+
+    def occupied_fraction(self):
+        """Returns the fraction of cells which are occupied, an estimate of the
+        fraction of the bin covered by placed objects.
+
+        Returns
+        -------
+        float
+            The number of occupied cells divided by the number of cells
+
+        """
+        return float(sum(np.count_nonzero(tile) for tile in self.tiles)) / (self.shape[0] * self.shape[1])
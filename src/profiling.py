@@ -0,0 +1,299 @@
+import json
+import time
+from contextlib import contextmanager
+import numpy as np
+
+# Profiler receiving the measurements of the instrumented code, if any
+_active_profiler = None
+
+class Histogram:
+    """This class is a fixed size histogram of durations, with logarithmic buckets
+    from 1 microsecond to about 17 minutes (each bucket twice as wide as the
+    previous one), so that it uses constant memory however long a run is.
+    A histogram contains:
+    1) the number of durations in every bucket
+    2) the number, total, minimum and maximum of the durations
+
+    """
+
+    NUM_BUCKETS = 31
+    SMALLEST = 1e-6
+
+    def __init__(self):
+        """Initializes an empty histogram.
+
+        Returns
+        -------
+        Histogram
+            An instance of Histogram with no durations
+
+        """
+        self.buckets = np.zeros(Histogram.NUM_BUCKETS, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def add(self, seconds):
+        """Adds a duration to the histogram.
+
+        Parameters
+        ----------
+        seconds : float
+            The duration
+
+        """
+        bucket = 0 if seconds <= Histogram.SMALLEST else int(np.log2(seconds / Histogram.SMALLEST)) + 1
+        self.buckets[min(bucket, Histogram.NUM_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        """Adds the durations of another histogram to this one.
+
+        Parameters
+        ----------
+        other   : Histogram
+            The histogram to add
+
+        """
+        self.buckets += other.buckets
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, q):
+        """Returns an estimate of a percentile of the durations: the upper edge of
+        the bucket containing it, capped by the largest duration.
+
+        Parameters
+        ----------
+        q   : float
+            Percentile, between 0 and 100
+
+        Returns
+        -------
+        float
+            The estimated percentile in seconds, 0 if the histogram is empty
+
+        """
+        if self.count == 0:
+            return 0.0
+        bucket = int(np.searchsorted(np.cumsum(self.buckets), q / 100 * self.count))
+        return min(Histogram.SMALLEST * 2**bucket, self.max)
+
+    def summary(self):
+        """Returns the statistics of the histogram.
+
+        Returns
+        -------
+        dict
+            The number of durations, their total, mean, minimum, median, 95th
+            percentile and maximum (in seconds), and the bucket counts
+
+        """
+        return {"count": self.count, "total": self.total,
+                "mean": self.total / self.count if self.count > 0 else 0.0,
+                "min": self.min if self.count > 0 else 0.0, "p50": self.percentile(50),
+                "p95": self.percentile(95), "max": self.max, "buckets": self.buckets.tolist()}
+
+class Profiler:
+    """This class collects built-in instrumentation of the MDP loop: a histogram of
+    the time spent in every stage of a step (ie. "policy", "transition", "reward",
+    "termination", "plotting") and counters of expensive operations (ie. shapely
+    polygon constructions, shapely predicate calls and state copies). Code is only
+    measured while a profiler is active:
+
+        with Profiler() as profiler:
+            rollout(...)
+        print(profiler.table())
+
+    A profiler contains:
+    1) a Histogram per stage
+    2) a counter per operation
+
+    """
+
+    def __init__(self):
+        """Initializes an empty, inactive profiler.
+
+        Returns
+        -------
+        Profiler
+            An instance of Profiler with no measurements
+
+        """
+        self.stages = {}
+        self.counters = {}
+        self._previous = None
+
+    def __enter__(self):
+        """Makes this profiler the active one, until the with block exits.
+        """
+        global _active_profiler
+        self._previous = _active_profiler
+        _active_profiler = self
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active_profiler
+        _active_profiler = self._previous
+        self._previous = None
+
+    def add_time(self, stage, seconds):
+        """Records the duration of one execution of a stage.
+
+        Parameters
+        ----------
+        stage   : str
+            Name of the stage
+        seconds : float
+            The duration
+
+        """
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = Histogram()
+        histogram.add(seconds)
+
+    def add_count(self, name, n=1):
+        """Increments a counter.
+
+        Parameters
+        ----------
+        name    : str
+            Name of the counter
+        n       : int, optional
+            Increment, 1 by default
+
+        """
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def merge(self, other):
+        """Adds the measurements of another profiler (ie. from a worker process) to
+        this one.
+
+        Parameters
+        ----------
+        other   : Profiler
+            The profiler to add
+
+        """
+        for stage, histogram in other.stages.items():
+            self.stages.setdefault(stage, Histogram()).merge(histogram)
+        for name, n in other.counters.items():
+            self.add_count(name, n)
+
+    def summary(self):
+        """Returns all measurements as JSON serializable data.
+
+        Returns
+        -------
+        dict
+            {"stages": {stage: Histogram.summary()}, "counters": {name: count}}
+
+        """
+        return {"stages": {stage: histogram.summary() for stage, histogram in sorted(self.stages.items())},
+                "counters": dict(sorted(self.counters.items()))}
+
+    def to_json(self, path=None):
+        """Exports the summary of the measurements as JSON.
+
+        Parameters
+        ----------
+        path    : str, optional
+            Path of a file to write the JSON to, None by default
+
+        Returns
+        -------
+        str
+            The JSON summary
+
+        """
+        text = json.dumps(self.summary(), indent=2)
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(text + "\n")
+        return text
+
+    def table(self):
+        """Formats the measurements as a plain text table, one line per stage
+        (times in milliseconds) followed by one line per counter.
+
+        Returns
+        -------
+        str
+            The summary table
+
+        """
+        lines = ["%-14s %9s %10s %9s %9s %9s %9s" % ("stage", "calls", "total ms", "mean ms", "p50 ms", "p95 ms", "max ms")]
+        for stage, s in self.summary()["stages"].items():
+            lines.append("%-14s %9d %10.2f %9.4f %9.4f %9.4f %9.4f" % (stage, s["count"], 1000*s["total"],
+                         1000*s["mean"], 1000*s["p50"], 1000*s["p95"], 1000*s["max"]))
+        for name, n in sorted(self.counters.items()):
+            lines.append("%-24s %9d" % (name, n))
+        return "\n".join(lines)
+
+def active_profiler():
+    """Returns the active profiler.
+
+    Returns
+    -------
+    Profiler
+        The profiler of the innermost active with block, or None
+
+    """
+    return _active_profiler
+
+def profile_count(name, n=1):
+    """Increments a counter of the active profiler, if any. This is cheap enough to
+    call on hot paths when no profiler is active.
+
+    Parameters
+    ----------
+    name    : str
+        Name of the counter
+    n       : int, optional
+        Increment, 1 by default
+
+    """
+    if _active_profiler is not None:
+        _active_profiler.add_count(name, n)
+
+def profile_time(stage, seconds):
+    """Records the duration of a stage in the active profiler, if any.
+
+    Parameters
+    ----------
+    stage   : str
+        Name of the stage
+    seconds : float
+        The duration
+
+    """
+    if _active_profiler is not None:
+        _active_profiler.add_time(stage, seconds)
+
+@contextmanager
+def profile_stage(stage):
+    """Times the body of a with block as one execution of a stage of the active
+    profiler, if any.
+
+    Parameters
+    ----------
+    stage   : str
+        Name of the stage
+
+    """
+    profiler = _active_profiler
+    if profiler is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.add_time(stage, time.perf_counter() - start)
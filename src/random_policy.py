@@ -2,13 +2,45 @@ from mdp import *
 
 class RandomPolicy(Policy):
     """This is a random policy that places an object anywhere in the bin,
-    rotated at any angle in 2 dimensions.
+    rotated at any angle in 2 dimensions. Random numbers are drawn from the
+    policy's generator (see Policy).
     """
 
+    def __init__(self, bin_length, bin_width, rng=None, max_tries=1, resolution=DEFAULT_RESOLUTION):
+        """Initializes a random policy given bin dimensions.
+
+        Parameters
+        ----------
+        bin_length  : int
+            Bin length dimension (x)
+        bin_width   : int
+            Bin width dimension (y)
+        rng         : numpy.random.Generator, optional
+            Random number generator, the default generator (None) by default
+        max_tries   : int, optional
+            Number of random placements to sample per action, 1 by default. With
+            more than 1, samples which stick out of the bin or hit an occupied
+            cell of the state's occupancy grid are discarded, and the first
+            other one is returned.
+        resolution  : float, optional
+            Cell size of the occupancy grid used to screen samples,
+            DEFAULT_RESOLUTION by default
+
+        Returns
+        -------
+        RandomPolicy
+            An instance of RandomPolicy with the above parameters
+
+        """
+        super(RandomPolicy, self).__init__(bin_length, bin_width, rng)
+        self.max_tries = max_tries
+        self.resolution = resolution
+
     def get_action(self, state):
         """Returns an action uniformly at random given the state. The angle of
         rotation and the translation are sampled uniformly at random given the
-        bin dimensions.
+        bin dimensions. If max_tries is more than 1, samples are screened (see
+        __init__), and the last sample is returned if none passes.
 
         Parameters
         ----------
@@ -21,11 +53,20 @@ class RandomPolicy(Policy):
             An action to take from this state.
 
         """
-        theta = np.random.uniform(0, 2*np.pi)
+        rng = get_rng(self.rng)
         bin_length = state.bin.length
         bin_width = state.bin.width
-        transform = np.array([[np.cos(theta), -1*np.sin(theta), np.random.uniform(-bin_length/2, bin_length/2)],
-                              [np.sin(theta), np.cos(theta), np.random.uniform(-bin_width/2, bin_width/2)],
-                              [0, 0, 1]])
-        action = Action(transform, state.next_object)
+        for attempt in range(self.max_tries):
+            theta = rng.uniform(0, 2*np.pi)
+            transform = np.array([[np.cos(theta), -1*np.sin(theta), rng.uniform(-bin_length/2, bin_length/2)],
+                                  [np.sin(theta), np.cos(theta), rng.uniform(-bin_width/2, bin_width/2)],
+                                  [0, 0, 1]])
+            action = Action(transform, state.next_object)
+            if (self.max_tries == 1):
+                break
+            # Cheap screening: vertices inside the bin, then a free footprint
+            vertices = transform_points(state.next_object.vertices(), transform[None])
+            if (points_in_convex(vertices, state.bin.vertices())[0] and
+                    state.occupancy(self.resolution).is_free(vertices[0])):
+                break
         return action
@@ -0,0 +1,113 @@
+import contextlib
+import numpy as np
+
+# Generator used by anything that is not given an explicit numpy.random.Generator
+_default_rng = np.random.default_rng()
+
+def get_rng(rng=None):
+    """Returns the input random number generator, or the default generator of this
+    module if there is none. Callers should look the default generator up every time
+    they draw (rather than storing it), so that seed_default_rng takes effect.
+
+    Parameters
+    ----------
+    rng : numpy.random.Generator, optional
+        An explicit random number generator, None by default
+
+    Returns
+    -------
+    numpy.random.Generator
+        The generator to draw random numbers from
+
+    """
+    if rng is None:
+        return _default_rng
+    return rng
+
+def seed_default_rng(seed=None):
+    """Replaces the default generator of this module with a newly seeded one. This
+    is the replacement for np.random.seed for code that does not pass an explicit
+    generator.
+
+    Parameters
+    ----------
+    seed : int, numpy.random.SeedSequence or numpy.random.Generator, optional
+        Seed of the new default generator, fresh entropy (None) by default
+
+    Returns
+    -------
+    numpy.random.Generator
+        The new default generator
+
+    """
+    global _default_rng
+    _default_rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+    return _default_rng
+
+@contextlib.contextmanager
+def default_rng_scope(rng):
+    """Makes a generator the default generator of this module for the duration of a
+    with block, and restores the previous default generator afterwards, so that
+    code which draws from the default generator (ie. a Reward constructed without
+    a generator) does not change the caller's stream.
+
+    Parameters
+    ----------
+    rng : numpy.random.Generator
+        The default generator inside the block
+
+    Returns
+    -------
+    context manager
+        Yields rng
+
+    """
+    caller_rng = _default_rng
+    seed_default_rng(rng)
+    try:
+        yield rng
+    finally:
+        seed_default_rng(caller_rng)
+
+def episode_seed(seed, episode):
+    """Returns the seed sequence of one episode of a run. Episode i gets the i-th
+    child of np.random.SeedSequence(seed), so its random numbers are independent of
+    every other episode's, and the episode can be rerun on its own, bit-for-bit,
+    from (seed, i) alone, in any worker process.
+
+    Parameters
+    ----------
+    seed    : int
+        Base seed of the run
+    episode : int
+        Number of the episode in the run
+
+    Returns
+    -------
+    numpy.random.SeedSequence
+        The seed sequence of the episode
+
+    """
+    return np.random.SeedSequence(seed, spawn_key=(episode,))
+
+def split_rng(seed, n):
+    """Splits a seed into n independent generators, ie. one per component of an
+    episode (policy, transition, reward) so that how many numbers one of them draws
+    does not change what the others draw.
+
+    Parameters
+    ----------
+    seed    : int or numpy.random.SeedSequence
+        Seed to split
+    n       : int
+        Number of generators
+
+    Returns
+    -------
+    list
+        n independent numpy.random.Generators
+
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return [np.random.default_rng(s) for s in seed.spawn(n)]
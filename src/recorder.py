@@ -0,0 +1,80 @@
+from utils import *
+
+class EpisodeRecorder:
+    """This class records the placements of an episode so that it can be rendered
+    after the episode has finished. Recording only keeps references to the placed
+    objects, so a headless rollout with a recorder never imports matplotlib or
+    descartes. They are only imported when render() is called.
+    A recorder contains:
+    1) the bin of the episode
+    2) the list of placed objects, in order of placement
+    3) a random number generator for the colors of the rendered objects
+
+    """
+
+    def __init__(self, rng=None):
+        """Initializes an empty recorder.
+
+        Parameters
+        ----------
+        rng     : numpy.random.Generator, optional
+            Random number generator of the colors of the rendered objects, the
+            default generator (None) by default
+
+        Returns
+        -------
+        EpisodeRecorder
+            An instance of EpisodeRecorder with no bin and no placed objects
+
+        """
+        self.bin = None
+        self.objects = []
+        self.rng = rng
+
+    def start(self, state):
+        """Starts recording an episode from its initial state. Any previously
+        recorded placements are discarded.
+
+        Parameters
+        ----------
+        state   : State
+            Initial state of the episode
+
+        """
+        self.bin = state.bin
+        self.objects = list(state.objects)
+
+    def record(self, object):
+        """Records an object that was just placed in the bin.
+
+        Parameters
+        ----------
+        object  : PlacementObject
+            Object placed in the bin
+
+        """
+        self.objects.append(object)
+
+    def render(self, show=True):
+        """Renders the recorded episode in a new matplotlib figure.
+
+        Parameters
+        ----------
+        show    : bool, optional
+            Default True, flag for whether to display the figure with pyplot.show()
+
+        Returns
+        -------
+        fig : matplotlib.pyplot.Figure
+            Figure used to display the bin and objects
+        ax  : an matplotlib.axes.SubplotBase subclass of Axes (or a subclass of Axes)
+            The axes of the subplot corresponding to the bin
+
+        """
+        fig = create_env()
+        ax, bin = add_bin(fig, self.bin.length, self.bin.width)
+        for object in self.objects:
+            add_object(fig, ax, object, self.rng)
+        if show:
+            display_env()
+        return fig, ax
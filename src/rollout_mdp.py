@@ -1,42 +1,155 @@
+import argparse
+import time
 from mdp import *
 from random_policy import *
 from rows_policy import *
 from heatmap import *
 from area_reward import *
 from rows_reward import *
+from recorder import *
 
-# Load the figure with just a bin, then with a bin and a square
-def main():
-    """This function is the driving function of the bin_packing 2D simulator module.
-    It initializes an environment with an initial state and rolls out a policy until
-    a termination state is reached.
-    """
-    
-    fig = create_env()
-    ax, bin = add_bin(fig, 20, 20)
-
-    policy = RowsPolicy(bin.length, bin.width)
-    first_object = PlacementObject.get_random()#Rectangle.get_random(2, 10) #
-    while (first_object.polygon.is_valid == False):
-        first_object = PlacementObject.get_random() #Rectangle.get_random(2, 10) #
-    initial_state = State(bin, [], first_object)
-    reward = RowsReward()
-    transition = Transition(fig, ax)
-    termination = Termination()
+_logger = get_logger(__name__)
+
+def rollout(initial_state, policy, transition, reward, termination, max_steps=None, event_log=None,
+            release_arrivals=True):
+    """Rolls out a policy from an initial state until a termination state is reached,
+    or until max_steps actions have been taken.
+
+    Parameters
+    ----------
+    initial_state   : State
+        State to start the episode from
+    policy          : Policy
+        Policy used to pick an action at every step
+    transition      : Transition
+        Transition used to execute the actions
+    reward          : Reward
+        Reward function evaluated at every step
+    termination     : Termination
+        Decides when the episode is finished
+    max_steps       : int, optional
+        Maximum number of actions to take, unlimited (None) by default
+    event_log       : EventLog, optional
+        Log receiving a "step" event for every step, with the action's transform,
+        the reward and the time spent in the policy, transition and reward
+        function, None by default
+    release_arrivals : bool, optional
+        Default True, flag for whether to free the arrivals before the current
+        state's next object as the episode advances (see ArrivalQueue.release).
+        Set it to False to look ahead or branch from earlier states of the
+        episode again afterwards.
 
-    heatmapper = HeatMap()
+    The time spent in the policy, transition, reward and termination is also
+    recorded in the active Profiler, if any (see profiling.Profiler).
 
+    Returns
+    -------
+    state   : State
+        The termination state of the episode
+    rewards : list
+        The reward received at every step of the episode
+
+    """
     rewards = []
     state = initial_state
-    while not termination.done(state):
-        # heatmapper.generate(state, transition, reward, 1)
+    while True:
+        start = time.perf_counter()
+        finished = termination.done(state)
+        profile_time("termination", time.perf_counter() - start)
+        if finished or (max_steps is not None and len(rewards) >= max_steps):
+            break
+        start = time.perf_counter()
         action = policy.get_action(state)
+        acted = time.perf_counter()
         next_state = transition.execute_action(state, action)
-        print("\nPoints of placed object are = " + str(np.array(next_state.objects[-1].bounding_box().polygon.exterior.coords)) + "\n")
+        transitioned = time.perf_counter()
+        if _logger.isEnabledFor(logging.DEBUG):
+            _logger.debug("Points of placed object are = %s", next_state.objects[-1].bounding_box().vertices())
         rewards.append(reward.get_reward(state, action, next_state))
+        rewarded = time.perf_counter()
+        profile_time("policy", acted - start)
+        profile_time("transition", transitioned - acted)
+        profile_time("reward", rewarded - transitioned)
+        if (event_log is not None):
+            event_log.record("step", step=len(rewards) - 1, transform=action.transform, reward=rewards[-1],
+                             policy_time=acted - start, transition_time=transitioned - acted,
+                             reward_time=rewarded - transitioned)
         state = next_state
+        if (release_arrivals and state.arrivals is not None):
+            # No state of the episode goes back to the arrivals before this one
+            state.arrivals.release(state.arrival_position)
+    return state, rewards
+
+# Load the figure with just a bin, then with a bin and a square
+def main(headless=False, recorder=None, seed=None, event_log=None):
+    """This function is the driving function of the bin_packing 2D simulator module.
+    It initializes an environment with an initial state and rolls out a policy until
+    a termination state is reached.
+
+    Parameters
+    ----------
+    headless    : bool, optional
+        Default False, flag for whether to run without creating a matplotlib figure
+    recorder    : EpisodeRecorder, optional
+        Records the episode so that it can be rendered after it has finished,
+        None by default
+    seed        : int, optional
+        Seed of the episode, split into independent generators for the policy, the
+        transition and the reward (see random_state.split_rng), fresh entropy
+        (None) by default
+    event_log   : EventLog, optional
+        Receives an event for every step of the episode (see rollout), and is
+        flushed at the end of the episode, None by default
+
+    Returns
+    -------
+    state   : State
+        The termination state of the episode
+    rewards : list
+        The reward received at every step of the episode
+
+    """
+    if headless:
+        fig, ax = None, None
+        bin = Rectangle(20, 20, np.eye(3))
+    else:
+        fig = create_env()
+        ax, bin = add_bin(fig, 20, 20)
+
+    policy_rng, transition_rng, reward_rng = split_rng(seed, 3)
+    policy = RowsPolicy(bin.length, bin.width, policy_rng)
+    transition = Transition(fig, ax, recorder, transition_rng)
+    first_object = next(transition.object_stream)
+    initial_state = State(bin, [], first_object)
+    reward = RowsReward(reward_rng)
+    termination = Termination()
+
+    if recorder is not None:
+        recorder.start(initial_state)
+    state, rewards = rollout(initial_state, policy, transition, reward, termination, event_log=event_log)
+    if event_log is not None:
+        event_log.flush()
 
-    display_env()
+    if not headless:
+        display_env()
+    return state, rewards
 
 
-if __name__ == "__main__": main()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roll out a policy in a single bin.")
+    parser.add_argument("--headless", action="store_true", help="run without creating a matplotlib figure")
+    parser.add_argument("--verbose", action="store_true", help="log the placed objects")
+    parser.add_argument("--event-log", default=None, help="write an event for every step to this file")
+    parser.add_argument("--profile", action="store_true", help="print the time spent in every stage of the episode")
+    args = parser.parse_args()
+    if args.verbose:
+        configure_logging(logging.DEBUG)
+    event_log = None
+    if args.event_log is not None:
+        event_log = EventLog(args.event_log)
+    if args.profile:
+        with Profiler() as profiler:
+            main(headless=args.headless, event_log=event_log)
+        print(profiler.table())
+    else:
+        main(headless=args.headless, event_log=event_log)
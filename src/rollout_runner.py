@@ -0,0 +1,165 @@
+import argparse
+import contextlib
+import multiprocessing
+import time
+from rollout_mdp import *
+
+def run_episode(episode, seed, policy_class=RowsPolicy, reward_class=RowsReward,
+                termination_class=Termination, bin_length=20, bin_width=20, max_steps=None, profile=False):
+    """Runs a single headless episode from a fresh bin and returns its statistics.
+
+    Parameters
+    ----------
+    episode             : int
+        Number identifying the episode
+    seed                : int
+        Base seed of the run that the episode belongs to (see random_state.episode_seed)
+    policy_class        : type, optional
+        Policy subclass, constructed as policy_class(bin_length, bin_width, rng), RowsPolicy by default
+    reward_class        : type, optional
+        Reward subclass, constructed without arguments, RowsReward by default. It
+        draws from the default generator, which is reseeded for the episode.
+    termination_class   : type, optional
+        Termination subclass, constructed without arguments, Termination by default
+    bin_length          : int, optional
+        Bin length dimension (x), 20 by default
+    bin_width           : int, optional
+        Bin width dimension (y), 20 by default
+    max_steps           : int, optional
+        Maximum number of actions per episode, unlimited (None) by default
+    profile             : bool, optional
+        Default False, flag for whether to profile the episode
+
+    Returns
+    -------
+    dict
+        The episode number and seed, the reward at every step, the total reward,
+        the number of steps, the number of validly placed objects, the fraction of
+        the bin area they fill, and the wall clock time of the episode in seconds.
+        With profile=True, also the Profiler of the episode.
+
+    """
+    start = time.time()
+    # Independent streams for the policy, the object generation and everything else.
+    # The caller's default generator is restored afterwards
+    policy_rng, transition_rng, default_rng = split_rng(episode_seed(seed, episode), 3)
+    with default_rng_scope(default_rng):
+        return _run_seeded_episode(episode, seed, policy_class, reward_class, termination_class, bin_length,
+                                   bin_width, max_steps, profile, policy_rng, transition_rng, start)
+
+def _run_seeded_episode(episode, seed, policy_class, reward_class, termination_class, bin_length, bin_width,
+                        max_steps, profile, policy_rng, transition_rng, start):
+    """Runs the episode of run_episode once the generators are set up.
+    """
+    bin = Rectangle(bin_length, bin_width, np.eye(3))
+    transition = Transition(rng=transition_rng)
+    initial_state = State(bin, [], next(transition.object_stream))
+    profiler = Profiler()
+    with (profiler if profile else contextlib.nullcontext()):
+        state, rewards = rollout(initial_state, policy_class(bin_length, bin_width, policy_rng),
+                                 transition, reward_class(), termination_class(), max_steps)
+    # Objects after the last validated one are the ones which ended the episode
+    num_objects = min(state.num_validated, len(state.objects))
+    result = {
+        "episode": episode,
+        "seed": seed,
+        "rewards": [float(r) for r in rewards],
+        "total_reward": float(sum(rewards)),
+        "steps": len(rewards),
+        "num_objects": num_objects,
+        "fill_ratio": state.fill_fraction(num_objects),
+        "time": time.time() - start,
+    }
+    if profile:
+        result["profile"] = profiler
+    return result
+
+def _run_episode_args(args):
+    """Unpacks a tuple of arguments for run_episode, for use with Pool.imap_unordered.
+    """
+    return run_episode(*args)
+
+def run_episodes(num_episodes, policy_class=RowsPolicy, reward_class=RowsReward,
+                 termination_class=Termination, bin_length=20, bin_width=20,
+                 seed=0, processes=None, max_steps=None, profile=False):
+    """Runs independent headless episodes across a pool of worker processes, and
+    yields the statistics of every episode as soon as it finishes. Episode i draws
+    from the i-th child of np.random.SeedSequence(seed), so results do not depend on
+    the number of processes or the order in which episodes finish, and any single
+    episode can be rerun with run_episode(i, seed).
+
+    Parameters
+    ----------
+    num_episodes        : int
+        Number of episodes to run
+    policy_class        : type, optional
+        Policy subclass, constructed as policy_class(bin_length, bin_width, rng), RowsPolicy by default
+    reward_class        : type, optional
+        Reward subclass, constructed without arguments, RowsReward by default
+    termination_class   : type, optional
+        Termination subclass, constructed without arguments, Termination by default
+    bin_length          : int, optional
+        Bin length dimension (x), 20 by default
+    bin_width           : int, optional
+        Bin width dimension (y), 20 by default
+    seed                : int, optional
+        Base seed of the episodes, 0 by default
+    processes           : int, optional
+        Number of worker processes, the number of CPUs (None) by default. With
+        1 process, episodes run in this process without a pool.
+    max_steps           : int, optional
+        Maximum number of actions per episode, unlimited (None) by default
+    profile             : bool, optional
+        Default False, flag for whether to profile every episode (see run_episode)
+
+    Returns
+    -------
+    generator
+        Yields the dict returned by run_episode for every episode, in order of completion
+
+    """
+    args = [(i, seed, policy_class, reward_class, termination_class,
+             bin_length, bin_width, max_steps, profile) for i in range(num_episodes)]
+    if processes == 1:
+        for a in args:
+            yield run_episode(*a)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        for result in pool.imap_unordered(_run_episode_args, args):
+            yield result
+
+def main():
+    """Runs a batch of RowsPolicy episodes from the command line and prints one line
+    per finished episode followed by averages over all episodes.
+    """
+    parser = argparse.ArgumentParser(description="Run independent bin placing episodes in parallel.")
+    parser.add_argument("--episodes", type=int, default=100)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-steps", type=int, default=None)
+    parser.add_argument("--verbose", action="store_true", help="log why every episode terminated")
+    parser.add_argument("--profile", action="store_true", help="print the time spent in every stage of the episodes")
+    parser.add_argument("--profile-json", default=None, help="write the profile of the episodes to this JSON file")
+    args = parser.parse_args()
+    if args.verbose:
+        configure_logging(logging.INFO)
+
+    results = []
+    profile = args.profile or args.profile_json is not None
+    profiler = Profiler()
+    for result in run_episodes(args.episodes, seed=args.seed, processes=args.processes,
+                               max_steps=args.max_steps, profile=profile):
+        results.append(result)
+        if profile:
+            profiler.merge(result["profile"])
+        print("episode %d: reward %.3f, %d objects, fill %.3f, %.3fs" % (result["episode"],
+              result["total_reward"], result["num_objects"], result["fill_ratio"], result["time"]))
+    print("mean reward %.3f, mean objects %.2f, mean fill %.3f" % (np.mean([r["total_reward"] for r in results]),
+          np.mean([r["num_objects"] for r in results]), np.mean([r["fill_ratio"] for r in results])))
+    if args.profile:
+        print(profiler.table())
+    if args.profile_json is not None:
+        profiler.to_json(args.profile_json)
+
+
+if __name__ == "__main__": main()
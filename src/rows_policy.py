@@ -1,12 +1,131 @@
 from mdp import *
 
+class RowFrontier:
+    """This class is the frontier of the row being filled by a RowsPolicy, derived
+    from the objects placed in a state. It is stored in the state's memo, so that
+    the successors of the state only fold in the objects placed after it, in O(1)
+    per object, instead of rescanning every object at every action.
+    A row frontier contains:
+    1) the number of objects of the state that it accounts for
+    2) the baseline (bottom) of the current row and the top of the tallest object
+       in it
+    3) the rightmost x reached in the row, and the bottom of the object which
+       reached it and the row's top at that point
+    4) the rightmost x reached before that object, 0 objects in the row meaning
+       the left edge of the bin
+
+    Frontiers are immutable, so states and their copies share them.
+
+    """
+
+    def __init__(self, count, baseline, top, right_x, right_bottom, right_top, previous_x):
+        """Initializes a row frontier (see the class description for its fields).
+        Use RowFrontier.of to get the frontier of a state.
+
+        Returns
+        -------
+        RowFrontier
+            An instance of RowFrontier with the above parameters
+
+        """
+        self.count = count
+        self.baseline = baseline
+        self.top = top
+        self.right_x = right_x
+        self.right_bottom = right_bottom
+        self.right_top = right_top
+        self.previous_x = previous_x
+
+    @staticmethod
+    def empty(bin):
+        """Returns the frontier of an empty bin: an empty row at the bottom.
+
+        Parameters
+        ----------
+        bin     : Rectangle
+            The bin, centered at the origin
+
+        Returns
+        -------
+        RowFrontier
+            The frontier accounting for no objects
+
+        """
+        left_edge, bottom_edge = -bin.length / 2, -bin.width / 2
+        return RowFrontier(0, bottom_edge, bottom_edge, left_edge, bottom_edge, bottom_edge, left_edge)
+
+    @staticmethod
+    def of(state):
+        """Returns the row frontier of a state, folding in the objects placed since
+        the frontier in the state's memo (inherited from the state it was copied
+        from) and storing the result back in the memo.
+
+        Parameters
+        ----------
+        state   : State
+            State whose objects were placed by a RowsPolicy (or otherwise)
+
+        Returns
+        -------
+        RowFrontier
+            The frontier accounting for every object of the state
+
+        """
+        frontier = state.memo.get("rows_frontier")
+        if frontier is None or frontier.count > len(state.objects):
+            frontier = RowFrontier.empty(state.bin)
+        left_edge = -state.bin.length / 2
+        for i in range(frontier.count, len(state.objects)):
+            frontier = frontier.advance(state.objects.bounds(i), left_edge)
+        state.memo["rows_frontier"] = frontier
+        return frontier
+
+    def advance(self, bounds, left_edge, tol=0.0001):
+        """Returns the frontier after one more object is placed. Objects below the
+        current row are ignored. An object in a non-empty row that starts at or
+        above the row's top, where RowsPolicy places an object that does not fit
+        in the row, starts the next row.
+
+        Parameters
+        ----------
+        bounds      : tuple
+            (minx, miny, maxx, maxy) bounding box of the placed object
+        left_edge   : float
+            x coordinate of the left edge of the bin
+        tol         : float, optional
+            Tolerance on the bottom of an object starting the next row
+
+        Returns
+        -------
+        RowFrontier
+            The new frontier
+
+        """
+        smallest_x, smallest_y, biggest_x, biggest_y = bounds
+        frontier = self
+        if (frontier.right_x > left_edge and smallest_y >= frontier.right_top - tol):
+            row_y = frontier.right_top
+            frontier = RowFrontier(self.count, row_y, row_y, left_edge, row_y, row_y, left_edge)
+        elif (smallest_y < frontier.baseline - tol):
+            # this object is not in the current row
+            return RowFrontier(self.count + 1, self.baseline, self.top, self.right_x,
+                               self.right_bottom, self.right_top, self.previous_x)
+
+        top = max(frontier.top, biggest_y)
+        if (biggest_x > frontier.right_x):
+            # the y value of the lowest point with biggest x in the bounding box (bottom right corner)
+            return RowFrontier(self.count + 1, frontier.baseline, top, biggest_x,
+                               smallest_y, top, frontier.right_x)
+        return RowFrontier(self.count + 1, frontier.baseline, top, frontier.right_x,
+                           frontier.right_bottom, frontier.right_top, frontier.previous_x)
+
 class RowsPolicy(Policy):
     """This is a policy that places an object in the next available spot when
     objects are being placed in rows across the bin, from bottom to top along
     the y-axis.
     """
 
-    def __init__(self, bin_length, bin_width):
+    def __init__(self, bin_length, bin_width, rng=None):
         """Returns an instance of the RowsPolicy given bin dimensions.
 
         Parameters
@@ -15,6 +134,9 @@ class RowsPolicy(Policy):
             Bin length dimension (x)
         bin_width   : int
             Bin width dimension (y)
+        rng         : numpy.random.Generator, optional
+            Random number generator for random placements when the bin is full,
+            the default generator (None) by default
 
         Returns
         -------
@@ -22,13 +144,13 @@ class RowsPolicy(Policy):
             An instance of RowsPolicy with the above parameters
 
         """
-        super(RowsPolicy, self).__init__(bin_width, bin_length)
-        self.next_y = -self.bin_width / 2
-        self.old_y = -self.bin_width / 2
+        super(RowsPolicy, self).__init__(bin_width, bin_length, rng)
 
     def get_action(self, state):
         """Returns an action by discovering the current placement of objects in
-        the bin already and finding the next available placement location. Given
+        the bin already (see RowFrontier) and finding the next available placement
+        location. The policy keeps no state between calls, so one policy can serve
+        many episodes at once. Given
         an object at its initial location, this method tests the object rotated at
         0 radians and pi radians before picking the optimal rotation. 
 
@@ -44,8 +166,7 @@ class RowsPolicy(Policy):
 
         """
         # Get the bin
-        left_edge = -self.bin_length / 2
-        bottom_edge = -self.bin_width / 2
+        left_edge = -state.bin.length / 2
 
         # Get the oriented bounding box of the next object
         # aabb = state.next_object.bounding_box()
@@ -65,62 +186,37 @@ class RowsPolicy(Policy):
         aabb = obj_copy.bounding_box()
 
         # Translate bounding box so that it is centered at (0,0)
-        avgpt = np.mean(np.array(aabb.polygon.exterior.coords), axis=0)
+        avgpt = np.mean(aabb.vertices(), axis=0)
         move_to_center = np.array([[1, 0, -avgpt[0]],
                                    [0, 1, -avgpt[1]],
                                    [0, 0, 1]])
-        aabb.apply_transform(move_to_center)
-        new_avgpt = np.mean(np.array(aabb.polygon.exterior.coords), axis=0)
 
         best_rotation = 0
         next_row = False
 
-        # Go through all the objects already in the bin
-        place_x = left_edge
-        place_y = self.next_y  # the y-value of the next row after this one
-        adjacent_y = self.old_y
-
-        # Go through objects in the current row only (see the first if statement)
-        for obj in state.objects:
-            points = np.array(obj.bounding_box().polygon.exterior.coords)
-            # Get the bottom right corner of the polygon
-            biggest_x = np.max(points, axis=0)[0]   # biggest x among the points of this object (rightmost)
-            smallest_y = np.min(points, axis=0)[1]  # smallest y seen among points of this object (bottommost)
-            biggest_y = np.max(points, axis=0)[1] # get the top right corner's y-value too (topmost)
-
-            # if this object is not in the current row, continue (skip it)
-            if (smallest_y < self.old_y):
-                continue
-
-            # Update place_y, which holds the max height of any object in this row
-            if (biggest_y > place_y):
-                place_y = biggest_y
-
-            # find the y value of the lowest point with biggest x in this object (bottom right corner)
-            a = [list(i) for i in points if i[0] == biggest_x]
-            right_bottom = np.min(a, axis=0)[1]
-            # If this object is further right than objects seen so far, set the adjacent_y to be this object's bottom right edge
-            if (biggest_x > place_x):
-                place_x = biggest_x   # biggest x seen so far in this row
-                adjacent_y = right_bottom
-                self.next_y = place_y
-
-            # Check if the aabb fits in its current rotation
-            # If it does not, check if it fits with a 90 degree rotation
-            # Otherwise there is no space in the row, so set stuff to the next row
+        # The current row, brought up to date with the objects placed since the
+        # state's frontier was last computed
+        frontier = RowFrontier.of(state)
+        place_x = frontier.right_x
+        adjacent_y = frontier.right_bottom
+
+        # Check if the aabb fits in its current rotation
+        # If it does not, check if it fits with a 90 degree rotation
+        # Otherwise there is no space in the row, so set stuff to the next row
+        if (frontier.right_x > left_edge):
             if (state.bin.length/2 - place_x < aabb.length):
                 if (state.bin.length/2 - place_x < aabb.width):
-                    # object does not fit in this row. Start next row
+                    # object does not fit in this row. Start next row. It would
+                    # have been rotated to fit after the previous object of the row
+                    previous_space = state.bin.length/2 - frontier.previous_x
+                    if (frontier.previous_x > left_edge and aabb.width <= previous_space < aabb.length):
+                        best_rotation = np.pi / 2
                     place_x = left_edge
-                    adjacent_y = self.next_y
-                    self.old_y = self.next_y
+                    adjacent_y = frontier.right_top
                     next_row = True
-                    # self.next_y = place_y
-                    break # Don't continue looking through objects in this bin if you can't fit in this row
                 else:
                     best_rotation = np.pi / 2
 
-
         if (best_rotation != 0 and \
             state.bin.length/2 - place_x >= aabb.width and \
             state.bin.width/2 - adjacent_y >= aabb.length):
@@ -152,12 +248,13 @@ class RowsPolicy(Policy):
 
         # When the bin is full, place object randomly
         # This means the object doesn't fit in this row in either orientation, neither does it fit in the next row in either orientation
-        theta = np.random.uniform(0, 2*np.pi)
+        rng = get_rng(self.rng)
+        theta = rng.uniform(0, 2*np.pi)
         bin_length = state.bin.length
         bin_width = state.bin.width
 
-        transform = np.array([[np.cos(theta), -1*np.sin(theta), np.random.uniform(-bin_length/2, bin_length/2)],
-                              [np.sin(theta), np.cos(theta), np.random.uniform(-bin_width/2, bin_width/2)],
+        transform = np.array([[np.cos(theta), -1*np.sin(theta), rng.uniform(-bin_length/2, bin_length/2)],
+                              [np.sin(theta), np.cos(theta), rng.uniform(-bin_width/2, bin_width/2)],
                               [0, 0, 1]])
         final_transform = np.matmul(transform, np.matmul(move_to_center, bb_rotation))
         action = Action(final_transform, state.next_object)
@@ -1,15 +1,27 @@
 from mdp import *
 from rows_policy import *
+from cache import *
+
+_logger = get_logger(__name__)
 
 class RowsReward(Reward):
     """This is a reward function based on the similarity of an outcome (state, action, next_state)
     to the expected outcome of the RowsPolicy.
     """
 
-    def __init__(self):
-        """Initializes a reward function with a saved policy and a dictionary
+    def __init__(self, rng=None, cache_size=1024):
+        """Initializes a reward function with a saved policy and a bounded cache
         of previously seen states mapping to previously used actions. (This is
-        metadata for the reward evaluation.)
+        metadata for the reward evaluation.) States are keyed by their content
+        (see State.digest), so copies of a state and states reached by the same
+        actions share an entry.
+
+        Parameters
+        ----------
+        rng         : numpy.random.Generator, optional
+            Random number generator of the saved policy, the default generator (None) by default
+        cache_size  : int, optional
+            Maximum number of states remembered, least recently used first out, 1024 by default
 
         Returns
         -------
@@ -17,8 +29,8 @@ class RowsReward(Reward):
             An instance of RowsReward with the above parameters
 
         """
-        self.policy = RowsPolicy(20, 20)
-        self.seen_already = dict()
+        self.policy = RowsPolicy(20, 20, rng)
+        self.seen_already = LRUCache(cache_size)
 
     def get_reward(self, state, action, next_state):
         """Returns RowsPolicy based reward given state, action, and resulting
@@ -46,11 +58,11 @@ class RowsReward(Reward):
             RowsPolicy.
 
         """
-        if (state in self.seen_already):
-            rows_action = self.seen_already[state]
-        else:
+        key = state.digest()
+        rows_action = self.seen_already.get(key)
+        if (rows_action is None):
             rows_action = self.policy.get_action(state)
-            self.seen_already[state] = rows_action
+            self.seen_already.put(key, rows_action)
 
         # Compute the distance between the rows_next_action and the action
         rows_translation = rows_action.translation
@@ -62,16 +74,20 @@ class RowsReward(Reward):
         obj_copy.apply_transform(action.transform)
 
         # Use np.all_close instead of equals comparison for floating point
-        print("Intersecting: " + str(intersecting(obj_copy, state.bin))  + "\n")
-        print("Polygon area: " + str(obj_copy.polygon.area)  + "\n")
-        print("Valid = " + str(obj_copy.polygon.is_valid) + "\n")
+        ring = obj_copy.vertices()
+        valid = obj_copy.polygon.is_valid
+        inside = contained(ring, state.bin.vertices())
+        _logger.debug("Contained = %s, valid = %s", inside, valid)
 
-        if (obj_copy.polygon.is_valid and intersecting(obj_copy, state.bin) < obj_copy.polygon.area):
+        if (valid and not inside):
             return 0
         #
         # # If the action puts the new object on top of an object in the bin, return 0
-        for o in state.objects:
-            if (obj_copy.polygon.is_valid and o.polygon.is_valid and intersecting(obj_copy, o) != 0):
+        neighbors = state.query_indices(obj_copy.bounds())
+        if (valid and len(neighbors) > 0):
+            objects = state.objects
+            if np.any(overlaps_many(ring, objects.padded_vertices(neighbors), objects.all_bounds(neighbors),
+                                    objects.convex(neighbors))):
                 return 0
 
         if dist == 0:
@@ -0,0 +1,179 @@
+from objects import *
+
+# Transform of every object handed out by an ObjectStream. Transforms are replaced
+# (see PlacementObject.apply_transform), never modified in place, so one read-only
+# identity is shared instead of allocating one per object
+_IDENTITY = np.eye(3)
+_IDENTITY.flags.writeable = False
+
+def random_polygons(count, rng=None, min_vertices=3, max_vertices=8, min_bound=2, max_bound=10):
+    """Generates a batch of random simple polygons in a single vectorized pass, by
+    angle-sorted radial sampling: each polygon's vertices are placed at increasing
+    angles around the origin, at random distances from it. The angular gap between
+    consecutive vertices is always less than pi, so the origin is inside every
+    polygon, each polygon is star-shaped around it, and so it is always simple
+    (valid). Unlike BagOfPoints.generate_random, no sample is ever rejected.
+
+    Parameters
+    ----------
+    count           : int
+        Number of polygons
+    rng             : numpy.random.Generator, optional
+        Random number generator, the default generator (None) by default
+    min_vertices    : int, optional
+        Minimum number of vertices of a polygon, 3 by default
+    max_vertices    : int, optional
+        Maximum number of vertices of a polygon (exclusive), 8 by default
+    min_bound       : int, optional
+        Minimum distance bound of the vertices from the origin, 2 by default
+    max_bound       : int, optional
+        Maximum distance bound of the vertices from the origin (exclusive), 10 by default
+
+    Returns
+    -------
+    vertices    : numpy array (count, max_vertices, 2)
+        The closed exterior rings of the polygons, counter clockwise. Ring i has
+        counts[i] + 1 points (the last one repeating the first), and is padded
+        with copies of its first point.
+    counts      : numpy array (count,)
+        The number of vertices of each polygon
+
+    """
+    rng = get_rng(rng)
+    counts = rng.integers(min_vertices, max_vertices, count)
+    bounds = rng.integers(min_bound, max_bound, count)
+    slots = np.arange(max_vertices)
+    used = slots[None, :] < counts[:, None]
+
+    # Random angular gaps. With weights in [0.6, 1], no gap of a triangle (and so
+    # of any polygon with more vertices) reaches half a turn.
+    gaps = np.where(used, rng.uniform(0.6, 1.0, (count, max_vertices)), 0)
+    angles = np.cumsum(gaps, axis=1) - gaps
+    angles = angles * (2*np.pi / np.sum(gaps, axis=1))[:, None]
+    angles += rng.uniform(0, 2*np.pi, count)[:, None]
+    radii = rng.uniform(0.3, 1.0, (count, max_vertices)) * bounds[:, None]
+
+    vertices = np.stack([radii * np.cos(angles), radii * np.sin(angles)], axis=-1)
+    # Close the rings and pad them with their first point
+    vertices[~used] = np.repeat(vertices[:, :1], max_vertices, axis=1)[~used]
+    return vertices, counts
+
+class ObjectStream:
+    """This class is an endless stream of random PlacementObjects. Objects are
+    generated ahead of time, a batch at a time, with random_polygons, and are
+    handed out one by one without building any shapely geometry until a caller
+    asks for their polygons, or as arrays of vertices with next_batch, without
+    building any PlacementObject.
+    An object stream contains:
+    1) a random number generator
+    2) the batch size and the shape parameters of random_polygons
+    3) the pre-generated batch of objects not handed out yet
+
+    """
+
+    def __init__(self, rng=None, batch_size=1024, min_vertices=3, max_vertices=8, min_bound=2, max_bound=10):
+        """Initializes an object stream, given a generator, batch size and shape
+        parameters (see random_polygons).
+
+        Parameters
+        ----------
+        rng             : numpy.random.Generator, optional
+            Random number generator, the default generator (None) by default. The
+            default generator is looked up whenever a new batch is generated.
+        batch_size      : int, optional
+            Number of objects generated at a time, 1024 by default
+        min_vertices    : int, optional
+            Minimum number of vertices of an object, 3 by default
+        max_vertices    : int, optional
+            Maximum number of vertices of an object (exclusive), 8 by default
+        min_bound       : int, optional
+            Minimum distance bound of the vertices from the origin, 2 by default
+        max_bound       : int, optional
+            Maximum distance bound of the vertices from the origin (exclusive), 10 by default
+
+        Returns
+        -------
+        ObjectStream
+            An instance of ObjectStream with the above parameters
+
+        """
+        self.rng = rng
+        self.batch_size = batch_size
+        self.shape = (min_vertices, max_vertices, min_bound, max_bound)
+        self._vertices, self._counts = None, None
+        self._position = batch_size
+
+    def _generate_batch(self):
+        """Replaces the current batch with a freshly generated one.
+        """
+        self._vertices, self._counts = random_polygons(self.batch_size, self.rng, *self.shape)
+        self._position = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        """Returns the next object of the stream.
+
+        Returns
+        -------
+        PlacementObject
+            A random, valid PlacementObject of type "random" at the origin
+
+        """
+        if self._position >= self.batch_size:
+            self._generate_batch()
+        i = self._position
+        self._position += 1
+        obj = PlacementObject.__new__(PlacementObject)
+        obj._init_points(self._vertices[i, :self._counts[i] + 1], _IDENTITY, "random")
+        return obj
+
+    def next_batch(self, count):
+        """Returns the next `count` objects of the stream as arrays, in the format of
+        random_polygons, without building any PlacementObject. These are the
+        objects that `count` calls to next would return.
+
+        Parameters
+        ----------
+        count   : int
+            Number of objects
+
+        Returns
+        -------
+        vertices    : numpy array (count, max_vertices, 2)
+            The closed exterior rings of the objects, padded (see random_polygons).
+            A view of the pre-generated batch if the objects all come from it, so
+            it must not be modified.
+        counts      : numpy array (count,)
+            The number of vertices of each object
+
+        """
+        vertices, counts = [], []
+        while (count > 0 or len(vertices) == 0):
+            if self._position >= self.batch_size:
+                self._generate_batch()
+            start = self._position
+            self._position = min(start + count, self.batch_size)
+            vertices.append(self._vertices[start:self._position])
+            counts.append(self._counts[start:self._position])
+            count -= self._position - start
+        if len(vertices) == 1:
+            return vertices[0], counts[0]
+        return np.concatenate(vertices), np.concatenate(counts)
+
+    def take(self, count):
+        """Returns the next `count` objects of the stream.
+
+        Parameters
+        ----------
+        count   : int
+            Number of objects
+
+        Returns
+        -------
+        list
+            The next `count` PlacementObjects of the stream
+
+        """
+        return [next(self) for i in range(count)]
@@ -0,0 +1,235 @@
+import collections
+from mdp import *
+
+class Skyline:
+    """This class is the skyline of a bin: the upper envelope of the bounding
+    boxes of the objects placed in it, as a sorted list of horizontal segments
+    from the left edge of the bin to its right edge. Any box which lies above the
+    skyline and inside the bin is free, so placements found on the skyline never
+    overlap a placed object. It is stored in the state's memo, so that the
+    successors of a state only fold in the objects placed after it.
+    A skyline contains:
+    1) the number of objects of the state that it accounts for
+    2) the left x coordinate of every segment, in increasing order, and the x
+       coordinate of the right edge of the bin
+    3) the height (y coordinate) of every segment, adjacent segments having
+       different heights
+
+    Skylines are immutable, so states and their copies share them.
+
+    """
+
+    def __init__(self, count, xs, heights, right_x):
+        """Initializes a skyline (see the class description for its fields). Use
+        Skyline.of to get the skyline of a state.
+
+        Returns
+        -------
+        Skyline
+            An instance of Skyline with the above parameters
+
+        """
+        self.count = count
+        self.xs = xs
+        self.heights = heights
+        self.right_x = right_x
+
+    @staticmethod
+    def empty(bin):
+        """Returns the skyline of an empty bin: one segment along its bottom.
+
+        Parameters
+        ----------
+        bin     : Rectangle
+            The bin, centered at the origin
+
+        Returns
+        -------
+        Skyline
+            The skyline accounting for no objects
+
+        """
+        return Skyline(0, np.array([-bin.length / 2]), np.array([-bin.width / 2]), bin.length / 2)
+
+    @staticmethod
+    def of(state):
+        """Returns the skyline of a state, folding in the objects placed since the
+        skyline in the state's memo (inherited from the state it was copied from)
+        and storing the result back in the memo.
+
+        Parameters
+        ----------
+        state   : State
+            The state
+
+        Returns
+        -------
+        Skyline
+            The skyline accounting for every object of the state
+
+        """
+        skyline = state.memo.get("skyline")
+        if skyline is None or skyline.count > len(state.objects):
+            skyline = Skyline.empty(state.bin)
+        for i in range(skyline.count, len(state.objects)):
+            skyline = skyline.advance(state.objects.bounds(i))
+        state.memo["skyline"] = skyline
+        return skyline
+
+    def advance(self, bounds, tol=0.0001):
+        """Returns the skyline after one more object is placed: the segments under
+        the object's bounding box are raised to its top, which also covers any gap
+        left below the object.
+
+        Parameters
+        ----------
+        bounds  : tuple
+            (minx, miny, maxx, maxy) bounding box of the placed object
+        tol     : float, optional
+            Objects narrower than this distance inside the bin are ignored
+
+        Returns
+        -------
+        Skyline
+            The new skyline
+
+        """
+        minx = max(bounds[0], self.xs[0])
+        maxx = min(bounds[2], self.right_x)
+        if (maxx - minx < tol):
+            return Skyline(self.count + 1, self.xs, self.heights, self.right_x)
+        xs = np.union1d(self.xs, [minx, maxx])
+        xs = xs[xs < self.right_x]
+        heights = self.heights[np.searchsorted(self.xs, xs, side="right") - 1]
+        under = (xs >= minx) & (xs < maxx)
+        heights[under] = np.maximum(heights[under], bounds[3])
+        # Merge adjacent segments of the same height
+        keep = np.concatenate([[True], np.abs(np.diff(heights)) > tol])
+        return Skyline(self.count + 1, xs[keep], heights[keep], self.right_x)
+
+    def find(self, length, width, top, tol=0.0001):
+        """Finds the lowest position of a box resting on the skyline, with its left
+        side on the left end of a segment. This is one sliding window maximum over
+        the segments, in amortized constant time per segment.
+
+        Parameters
+        ----------
+        length  : float
+            Length (x) of the box
+        width   : float
+            Width (y) of the box
+        top     : float
+            y coordinate that the top of the box may not exceed (ie. the top of
+            the bin)
+        tol     : float, optional
+            Distance by which the box may stick out of the bin
+
+        Returns
+        -------
+        tuple
+            (x, y) of the lower left corner of the box, or None if the box fits
+            nowhere
+
+        """
+        xs, heights = self.xs, self.heights
+        # Segments xs[i:ends[i]] lie under a box whose left side is at xs[i]. The
+        # box always rests on segment i, even when it is no longer than tol
+        ends = np.maximum(np.searchsorted(xs, xs + length - tol, side="left"), np.arange(1, len(xs) + 1))
+        best = None
+        window = collections.deque()
+        j = 0
+        for i in range(len(xs)):
+            if (xs[i] + length > self.right_x + tol):
+                break
+            while (j < ends[i]):
+                while (window and heights[window[-1]] <= heights[j]):
+                    window.pop()
+                window.append(j)
+                j += 1
+            while (window[0] < i):
+                window.popleft()
+            y = heights[window[0]]
+            if (y + width <= top + tol and (best is None or y < best[1] - tol)):
+                best = (xs[i], y)
+        return best
+
+class SkylinePolicy(Policy):
+    """This is a bottom left fill policy: it places the oriented bounding box of
+    the next object, unrotated or rotated by pi/2, at the lowest spot of the bin's
+    skyline (see Skyline), leftmost first. The skyline is updated incrementally in
+    the state's memo, so finding the spot does not depend on the number of placed
+    objects, and the placements it finds never overlap placed objects.
+    """
+
+    def __init__(self, bin_length, bin_width, rng=None):
+        """Returns an instance of the SkylinePolicy given bin dimensions.
+
+        Parameters
+        ----------
+        bin_length  : int
+            Bin length dimension (x)
+        bin_width   : int
+            Bin width dimension (y)
+        rng         : numpy.random.Generator, optional
+            Random number generator, unused since the policy is deterministic
+
+        Returns
+        -------
+        SkylinePolicy
+            An instance of SkylinePolicy with the above parameters
+
+        """
+        super(SkylinePolicy, self).__init__(bin_length, bin_width, rng)
+
+    def get_action(self, state):
+        """Returns the action which places the next object's oriented bounding box
+        on the skyline, in the orientation whose top ends lowest (then leftmost).
+        If the object fits in neither orientation, it is placed on the lowest spot
+        anyway, sticking out of the top of the bin, which ends the episode.
+
+        Parameters
+        ----------
+        state       : State
+            Starting state
+
+        Returns
+        -------
+        action      : Action
+            An action to take from this state.
+
+        """
+        # Rotate the next object so that its oriented bounding box is axis
+        # aligned, and center the box at the origin
+        bb_points = np.array(state.next_object.oriented_bounding_box().polygon.exterior.coords)
+        side = bb_points[1] - bb_points[0]
+        theta = -np.arctan2(side[1], side[0])
+        bb_rotation = np.array([[np.cos(theta), -np.sin(theta), 0],
+                                [np.sin(theta), np.cos(theta), 0],
+                                [0, 0, 1]])
+        aligned = transform_points(state.next_object.vertices(), bb_rotation[None])[0]
+        low, high = aligned.min(axis=0), aligned.max(axis=0)
+        center = (low + high) / 2
+        move_to_center = np.array([[1, 0, -center[0]],
+                                   [0, 1, -center[1]],
+                                   [0, 0, 1]])
+        length, width = high - low
+
+        skyline = Skyline.of(state)
+        top = state.bin.width / 2
+        best = None
+        for rotation, size in [(0, (length, width)), (np.pi / 2, (width, length))]:
+            spot = skyline.find(size[0], size[1], top)
+            if (spot is None):
+                spot = skyline.find(size[0], size[1], np.inf)
+            if (spot is not None and (best is None or spot[1] + size[1] < best[1][1] + best[2][1] - 0.0001)):
+                best = (rotation, spot, size)
+        if (best is None):
+            # Wider than the bin in both orientations
+            best = (0, (-state.bin.length / 2, np.max(skyline.heights)), (length, width))
+
+        rotation, (x, y), size = best
+        transform = np.array([[np.cos(rotation), -np.sin(rotation), x + size[0] / 2],
+                              [np.sin(rotation), np.cos(rotation), y + size[1] / 2],
+                              [0, 0, 1]])
+        final_transform = np.matmul(transform, np.matmul(move_to_center, bb_rotation))
+        return Action(final_transform, state.next_object)
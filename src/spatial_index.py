@@ -0,0 +1,156 @@
+import math
+
+class GridIndex:
+    """This class is a uniform grid spatial index over axis aligned bounding boxes.
+    Items are identified by the order in which they were inserted (0, 1, 2, ...),
+    which matches their position in a State's list of objects.
+    A grid index contains:
+    1) a cell size
+    2) a dictionary mapping grid cells to the ids of the items overlapping them
+    3) the bounding box of every inserted item
+
+    Copies share their storage until one of them inserts a new item (copy-on-write),
+    so a branch of an ObjectList does not copy the index of the objects it shares
+    with the list it branched from (see copy).
+    """
+
+    def __init__(self, cell_size):
+        """Initializes an empty grid index, given the side length of a grid cell.
+
+        Parameters
+        ----------
+        cell_size   : float
+            Side length of the square grid cells
+
+        Returns
+        -------
+        GridIndex
+            An instance of GridIndex with no items
+
+        """
+        self.cell_size = float(cell_size)
+        self.cells = dict()
+        self.bounds = []
+        self.cell_range = None  # (min i, min j, max i, max j) of occupied cells
+        self._shared = False
+
+    def __len__(self):
+        return len(self.bounds)
+
+    def _cell_span(self, bounds):
+        """Returns the range of grid cells covered by a bounding box.
+
+        Parameters
+        ----------
+        bounds  : tuple
+            (minx, miny, maxx, maxy) bounding box
+
+        Returns
+        -------
+        tuple
+            (min i, min j, max i, max j) grid cell indices, inclusive
+
+        """
+        minx, miny, maxx, maxy = bounds
+        return (int(math.floor(minx / self.cell_size)), int(math.floor(miny / self.cell_size)),
+                int(math.floor(maxx / self.cell_size)), int(math.floor(maxy / self.cell_size)))
+
+    def insert(self, bounds):
+        """Inserts an item into the index, given its bounding box.
+
+        Parameters
+        ----------
+        bounds  : tuple
+            (minx, miny, maxx, maxy) bounding box of the item
+
+        Returns
+        -------
+        int
+            The id of the newly inserted item
+
+        """
+        id = len(self.bounds)
+        if self._shared:
+            # Items past the end of a truncated copy are dropped here
+            cells = {cell: [i for i in ids if i < id] for cell, ids in self.cells.items()}
+            self.cells = {cell: ids for cell, ids in cells.items() if ids}
+            self.bounds = list(self.bounds)
+            self._shared = False
+        self.bounds.append(tuple(bounds))
+        i0, j0, i1, j1 = self._cell_span(bounds)
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                self.cells.setdefault((i, j), []).append(id)
+        if self.cell_range is None:
+            self.cell_range = (i0, j0, i1, j1)
+        else:
+            a, b, c, d = self.cell_range
+            self.cell_range = (min(a, i0), min(b, j0), max(c, i1), max(d, j1))
+        return id
+
+    def query(self, bounds):
+        """Returns the ids of all items whose bounding boxes overlap (or touch) the
+        input bounding box. The bounding box may be unbounded (ie. use infinity).
+
+        Parameters
+        ----------
+        bounds  : tuple
+            (minx, miny, maxx, maxy) bounding box to query
+
+        Returns
+        -------
+        list
+            Sorted ids of the items near the input bounding box
+
+        """
+        if self.cell_range is None:
+            return []
+        minx, miny, maxx, maxy = bounds
+        a, b, c, d = self.cell_range
+        # Clip the query to the occupied cells, so that unbounded queries are finite
+        i0 = a if minx == -math.inf else max(a, int(math.floor(minx / self.cell_size)))
+        j0 = b if miny == -math.inf else max(b, int(math.floor(miny / self.cell_size)))
+        i1 = c if maxx == math.inf else min(c, int(math.floor(maxx / self.cell_size)))
+        j1 = d if maxy == math.inf else min(d, int(math.floor(maxy / self.cell_size)))
+        if (i0 > i1 or j0 > j1):
+            return []
+        found = set()
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                found.update(self.cells.get((i, j), ()))
+        result = []
+        num_items = len(self.bounds)
+        for id in found:
+            if id >= num_items:
+                # inserted into a shared copy after this index was truncated
+                continue
+            ominx, ominy, omaxx, omaxy = self.bounds[id]
+            if ominx <= maxx and minx <= omaxx and ominy <= maxy and miny <= omaxy:
+                result.append(id)
+        result.sort()
+        return result
+
+    def copy(self, count=None):
+        """Returns a copy of this index which shares storage with it until either
+        of them is modified.
+
+        Parameters
+        ----------
+        count   : int, optional
+            Only keep the first `count` items in the copy, all of them (None) by
+            default. The copy's range of occupied cells may then be too large,
+            which only costs time.
+
+        Returns
+        -------
+        GridIndex
+            A copy of this instance of GridIndex
+
+        """
+        index = GridIndex(self.cell_size)
+        index.cells = self.cells
+        index.bounds = self.bounds if count is None else self.bounds[:count]
+        index.cell_range = self.cell_range
+        index._shared = True
+        self._shared = True
+        return index
@@ -1,5 +1,8 @@
 from objects import *
 
+# matplotlib and descartes are only imported by the plotting functions below,
+# so that headless simulations never pay for (or require) them.
+
 ENV_CREATED = False
 
 SIZE = (8.0, 4.0*(math.sqrt(5)-1))
@@ -11,13 +14,15 @@ COLOR = {
     4: '#fff130'    #yellow
     }
 
-def v_color(ob):
+def v_color(ob, rng=None):
     """Returns a random hex color code by sampling from a finite set.
 
     Parameters
     ----------
     ob       : PlacementObject
         A placement object to color.
+    rng      : numpy.random.Generator, optional
+        Random number generator, the default generator (None) by default
 
     Returns
     -------
@@ -25,7 +30,7 @@ def v_color(ob):
         The hex color code of one of 5 colors
 
     """
-    index = np.random.choice(len(COLOR))
+    index = get_rng(rng).choice(len(COLOR))
     return COLOR[index]
 
 def plot_coords(ax, ob, color):
@@ -55,6 +60,7 @@ def create_env():
 
     """
     # Create the figure for matplotlib to which you will add the objects
+    from matplotlib import pyplot
     fig = pyplot.figure(1, figsize=SIZE, dpi=90)
     return fig
 
@@ -78,6 +84,7 @@ def add_bin(fig, length, width):
 
     """
     # Code to create a bin and to add it to the figure
+    from descartes.patch import PolygonPatch
     ax = fig.add_subplot(121)
     bin = Rectangle(length, width, np.eye(3))
     polygon = bin.polygon
@@ -98,7 +105,7 @@ def add_bin(fig, length, width):
     ax.set_aspect(1)
     return ax, bin
 
-def add_object(fig, ax, object):
+def add_object(fig, ax, object, rng=None):
     """Adds an input object to the matplotlib simulation given the figure and
     axes for the bin.
 
@@ -110,10 +117,13 @@ def add_object(fig, ax, object):
         The axes of the subplot corresponding to the bin
     object  : PlacementObject
         Object to be added to the bin
+    rng     : numpy.random.Generator, optional
+        Random number generator of the object's color, the default generator (None) by default
 
     """
+    from descartes.patch import PolygonPatch
     polygon = object.polygon
-    color = v_color(polygon)
+    color = v_color(polygon, rng)
 
     plot_coords(ax, polygon.exterior, color)
 
@@ -149,4 +159,145 @@ def display_env():
     """Displays the matplotlib simulation by calling pyplot.show().
     """
     # May be unnecessary
+    from matplotlib import pyplot
     pyplot.show()
+
+def transform_points(points, transforms):
+    """Applies a stack of 3x3 homogeneous transforms to a single array of points
+    in one batched operation.
+
+    Parameters
+    ----------
+    points      : numpy array (V,2)
+        The 2D points (ie. polygon vertices) to transform
+    transforms  : numpy array (N,3,3)
+        A stack of N homogeneous coordinates transformation matrices
+
+    Returns
+    -------
+    numpy array (N,V,2)
+        The points transformed by each of the N transforms
+
+    """
+    points = np.asarray(points, dtype=float)
+    rotations = transforms[:, :2, :2]
+    translations = transforms[:, :2, 2]
+    return np.einsum('nij,vj->nvi', rotations, points) + translations[:, None, :]
+
+def grid_transforms(thetas, xs, ys):
+    """Builds the stacked transforms for every combination of rotation angle and
+    (x, y) translation on a grid.
+
+    Parameters
+    ----------
+    thetas  : numpy array (R,)
+        Rotation angles in radians
+    xs      : numpy array (L,)
+        Translations along the x-axis
+    ys      : numpy array (W,)
+        Translations along the y-axis
+
+    Returns
+    -------
+    numpy array (R,W,L,3,3)
+        transforms[r, j, i] rotates by thetas[r] and translates by (xs[i], ys[j])
+
+    """
+    thetas, xs, ys = np.asarray(thetas), np.asarray(xs), np.asarray(ys)
+    transforms = np.zeros((len(thetas), len(ys), len(xs), 3, 3))
+    cos, sin = np.cos(thetas)[:, None, None], np.sin(thetas)[:, None, None]
+    transforms[..., 0, 0] = cos
+    transforms[..., 0, 1] = -sin
+    transforms[..., 1, 0] = sin
+    transforms[..., 1, 1] = cos
+    transforms[..., 0, 2] = xs[None, None, :]
+    transforms[..., 1, 2] = ys[None, :, None]
+    transforms[..., 2, 2] = 1
+    return transforms
+
+def points_in_convex(points, hull, tol=0.0001):
+    """Checks, for each group of points, whether every point lies inside (or on
+    the boundary of) a convex polygon. A polygon is contained in a convex polygon
+    exactly when all of its vertices are.
+
+    Parameters
+    ----------
+    points  : numpy array (N,V,2)
+        N groups of V points each (ie. the vertices of N candidate polygons)
+    hull    : numpy array (H,2)
+        The closed exterior ring of a convex polygon (first point == last point)
+    tol     : float, optional
+        Distance tolerance for points that lie just outside the boundary
+
+    Returns
+    -------
+    numpy array (N,) of bool
+        True where all V points of a group are inside the convex polygon
+
+    """
+    hull = np.asarray(hull, dtype=float)
+    starts, ends = hull[:-1], hull[1:]
+    edges = ends - starts
+    # Orient the edges so that the inside of the polygon is on the left
+    signed_area = np.sum(starts[:, 0] * ends[:, 1] - ends[:, 0] * starts[:, 1])
+    if signed_area < 0:
+        edges = -edges
+    lengths = np.linalg.norm(edges, axis=1)
+    rel = points[:, :, None, :] - starts[None, None, :, :]
+    cross = edges[None, None, :, 0] * rel[..., 1] - edges[None, None, :, 1] * rel[..., 0]
+    return np.all(cross >= -tol * lengths, axis=(1, 2))
+
+def points_in_polygon(points, ring):
+    """Checks which points lie inside an arbitrary (simple) polygon, with the even-odd
+    rule: a point is inside if a ray from it crosses the polygon's boundary an odd
+    number of times. Points exactly on the boundary may be reported either way.
+
+    Parameters
+    ----------
+    points  : numpy array (P,2)
+        The points to test
+    ring    : numpy array (V,2)
+        The closed exterior ring of the polygon, which may be padded with
+        repeated points
+
+    Returns
+    -------
+    numpy array (P,) of bool
+        True where the point is inside the polygon
+
+    """
+    ring = np.asarray(ring, dtype=float)
+    px, py = points[:, 0, None], points[:, 1, None]
+    xi, yi = ring[None, :-1, 0], ring[None, :-1, 1]
+    xj, yj = ring[None, 1:, 0], ring[None, 1:, 1]
+    # Edges which straddle the horizontal line through the point (never horizontal edges)
+    straddles = (yi > py) != (yj > py)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crossing_x = xi + (py - yi) * (xj - xi) / (yj - yi)
+    crossings = np.count_nonzero(straddles & (px < crossing_x), axis=1)
+    return crossings % 2 == 1
+
+def bounds_overlap(boundsA, boundsB, tol=0.0001):
+    """Checks which pairs of axis aligned bounding boxes overlap with positive area.
+
+    Parameters
+    ----------
+    boundsA : numpy array (N,4)
+        Bounding boxes as rows of (minx, miny, maxx, maxy)
+    boundsB : numpy array (M,4)
+        Bounding boxes as rows of (minx, miny, maxx, maxy)
+    tol     : float, optional
+        Boxes that overlap by less than this distance are treated as touching
+
+    Returns
+    -------
+    numpy array (N,M) of bool
+        True where boundsA[n] and boundsB[m] overlap
+
+    """
+    boundsA = np.asarray(boundsA, dtype=float).reshape(-1, 4)
+    boundsB = np.asarray(boundsB, dtype=float).reshape(-1, 4)
+    return ((boundsA[:, None, 0] < boundsB[None, :, 2] - tol) &
+            (boundsB[None, :, 0] < boundsA[:, None, 2] - tol) &
+            (boundsA[:, None, 1] < boundsB[None, :, 3] - tol) &
+            (boundsB[None, :, 1] < boundsA[:, None, 3] - tol))
@@ -0,0 +1,234 @@
+from mdp import *
+
+class BatchState:
+    """This class is the state of B bins stepped in lockstep by a VectorEnv, as
+    stacked arrays instead of B State objects. The arrays are views of the
+    environment's buffers, so a BatchState is only valid until the next call to
+    step or reset (use VectorEnv.state to get a persistent State for one bin).
+    A batch state contains:
+    1) the closed, padded exterior rings of the objects placed in every bin, in
+       world space coordinates, with their bounding boxes
+    2) the number of objects placed in every bin, and their total area
+    3) the closed, padded exterior rings of every bin's next object, at the origin
+
+    """
+
+    def __init__(self, placed, placed_bounds, num_placed, placed_area, next_vertices):
+        """Initializes a batch state from the environment's arrays.
+
+        Parameters
+        ----------
+        placed          : numpy array (B,N,V,2)
+            Rings of the placed objects. Only the first num_placed[b] are set.
+        placed_bounds   : numpy array (B,N,4)
+            (minx, miny, maxx, maxy) of the placed objects
+        num_placed      : numpy array (B,) of int
+            Number of objects placed in every bin
+        placed_area     : numpy array (B,)
+            Total area of the objects placed in every bin
+        next_vertices   : numpy array (B,V,2)
+            Rings of the next objects
+
+        Returns
+        -------
+        BatchState
+            An instance of BatchState with the above parameters
+
+        """
+        self.placed = placed
+        self.placed_bounds = placed_bounds
+        self.num_placed = num_placed
+        self.placed_area = placed_area
+        self.next_vertices = next_vertices
+
+class VectorEnv:
+    """This class is a vectorized environment which steps B bins in lockstep, in
+    the manner of vectorized gym environments: one call to step takes B actions
+    as a (B,3,3) array of transforms, and updates all bins with batched array
+    operations, amortizing the Python overhead of the MDP classes over all bins.
+
+    Each bin follows the single bin MDP with AreaReward and Termination: the
+    reward of a step is the fraction of the bin area that the placed object adds,
+    and a bin is done when its newly placed object sticks out of the bin or
+    overlaps another object (or when the bin is out of room for objects). Next
+    objects are drawn with random_polygons, like an ObjectStream.
+    A vector environment contains:
+    1) the number of bins and their dimensions
+    2) a random number generator for the next objects
+    3) preallocated arrays for the placed objects and the next objects of all
+       bins (see BatchState)
+    4) whether bins which are done are reset automatically
+
+    """
+
+    def __init__(self, num_envs, bin_length=20, bin_width=20, rng=None, max_objects=64,
+                 max_vertices=8, autoreset=True):
+        """Initializes a vectorized environment with empty bins.
+
+        Parameters
+        ----------
+        num_envs        : int
+            Number of bins B
+        bin_length      : int, optional
+            Bin length dimension (x), 20 by default
+        bin_width       : int, optional
+            Bin width dimension (y), 20 by default
+        rng             : numpy.random.Generator, optional
+            Random number generator for the next objects, the default generator
+            (None) by default
+        max_objects     : int, optional
+            Maximum number of objects per bin, 64 by default. A bin which reaches
+            it is done.
+        max_vertices    : int, optional
+            Maximum number of vertices of the next objects (exclusive), 8 by default
+        autoreset       : bool, optional
+            Default True, flag for whether to empty the bins which are done at the
+            end of the step in which they finish
+
+        Returns
+        -------
+        VectorEnv
+            An instance of VectorEnv with the above parameters
+
+        """
+        self.num_envs = num_envs
+        self.bin = Rectangle(bin_length, bin_width, np.eye(3))
+        self.rng = rng
+        self.max_objects = max_objects
+        self.max_vertices = max_vertices
+        self.autoreset = autoreset
+        self._bin_ring = self.bin.vertices()
+        self.placed = np.zeros((num_envs, max_objects, max_vertices, 2))
+        self.placed_bounds = np.zeros((num_envs, max_objects, 4))
+        self.placed_convex = np.zeros((num_envs, max_objects), dtype=bool)
+        self.num_placed = np.zeros(num_envs, dtype=np.intp)
+        self.placed_area = np.zeros(num_envs)
+        self.next_vertices = np.zeros((num_envs, max_vertices, 2))
+        self.next_counts = np.zeros(num_envs, dtype=np.intp)
+        self.next_convex = np.zeros(num_envs, dtype=bool)
+        self.reset()
+
+    def _draw_next_objects(self, envs):
+        """Replaces the next objects of some bins with new random ones.
+        """
+        vertices, counts = random_polygons(len(envs), self.rng, max_vertices=self.max_vertices)
+        self.next_vertices[envs] = vertices
+        self.next_counts[envs] = counts
+        self.next_convex[envs] = is_convex_many(vertices)
+
+    def _batch_state(self):
+        return BatchState(self.placed, self.placed_bounds, self.num_placed, self.placed_area, self.next_vertices)
+
+    def reset(self):
+        """Empties every bin and draws new next objects.
+
+        Returns
+        -------
+        BatchState
+            The state of the bins
+
+        """
+        self.num_placed[:] = 0
+        self.placed_area[:] = 0
+        self._draw_next_objects(np.arange(self.num_envs))
+        return self._batch_state()
+
+    def step(self, transforms):
+        """Places the next object of every bin with one transform per bin.
+
+        Parameters
+        ----------
+        transforms  : numpy array (B,3,3)
+            The action of every bin: a transform from the origin in world space
+            coordinates, applied to the bin's next object
+
+        Returns
+        -------
+        state   : BatchState
+            The state of the bins after the step (for bins which were done and
+            reset, the state of the new, empty bin)
+        rewards : numpy array (B,)
+            The reward of every bin: the fraction of its area covered by the
+            placed object, 0 for bins which had no room left for it
+        dones   : numpy array (B,) of bool
+            Whether every bin is done
+        info    : dict
+            With autoreset, "final_observation": a BatchState (of copies) of the
+            bins which were done, before they were reset, in order of position, and
+            "_final_observation": the dones mask telling which bins these are
+
+        """
+        transforms = np.asarray(transforms, dtype=float)
+        envs = np.arange(self.num_envs)
+        candidates = np.einsum('bij,bvj->bvi', transforms[:, :2, :2], self.next_vertices) + transforms[:, None, :2, 2]
+        candidate_bounds = np.concatenate([candidates.min(axis=1), candidates.max(axis=1)], axis=1)
+        x, y = candidates[..., 0], candidates[..., 1]
+        areas = np.abs(np.sum(x[:, :-1] * y[:, 1:] - x[:, 1:] * y[:, :-1], axis=1)) / 2
+
+        # Containment in the (convex) bin, then bounding box rejection and exact
+        # tests against the objects already in each bin
+        valid = points_in_convex(candidates, self._bin_ring)
+        slots = np.arange(self.max_objects)[None, :]
+        tol = 0.0001
+        a, b = candidate_bounds[:, None, :], self.placed_bounds
+        maybe_overlapping = ((slots < self.num_placed[:, None]) & valid[:, None] &
+                             (a[..., 0] < b[..., 2] - tol) & (b[..., 0] < a[..., 2] - tol) &
+                             (a[..., 1] < b[..., 3] - tol) & (b[..., 1] < a[..., 3] - tol))
+        pairs_b, pairs_n = np.nonzero(maybe_overlapping)
+        convex_pairs = self.next_convex[pairs_b] & self.placed_convex[pairs_b, pairs_n]
+        overlapping = np.zeros(len(pairs_b), dtype=bool)
+        if np.any(convex_pairs):
+            overlapping[convex_pairs] = convex_overlap_pairs(candidates[pairs_b[convex_pairs]],
+                                                             self.placed[pairs_b[convex_pairs], pairs_n[convex_pairs]])
+        for pair in np.flatnonzero(~convex_pairs):
+            if valid[pairs_b[pair]]:
+                overlapping[pair] = polygons_overlap(candidates[pairs_b[pair]], self.placed[pairs_b[pair], pairs_n[pair]])
+        valid[pairs_b[overlapping]] = False
+
+        # Place the objects (invalid ones too, like Transition does)
+        room = self.num_placed < self.max_objects
+        placing = envs[room]
+        slots = self.num_placed[room]
+        self.placed[placing, slots] = candidates[room]
+        self.placed_bounds[placing, slots] = candidate_bounds[room]
+        self.placed_convex[placing, slots] = self.next_convex[room]
+        self.num_placed[room] += 1
+        self.placed_area[room] += areas[room]
+        # Bins without room place nothing, so they are not rewarded
+        rewards = np.where(room, areas / self.bin.area, 0.0)
+        dones = ~valid | (self.num_placed >= self.max_objects)
+
+        self._draw_next_objects(envs)
+        info = {}
+        if self.autoreset:
+            # Keep the terminal states of the bins before emptying them
+            info["final_observation"] = BatchState(self.placed[dones], self.placed_bounds[dones],
+                                                   self.num_placed[dones], self.placed_area[dones],
+                                                   self.next_vertices[dones])
+            info["_final_observation"] = dones
+            self.num_placed[dones] = 0
+            self.placed_area[dones] = 0
+        return self._batch_state(), rewards, dones, info
+
+    def state(self, b):
+        """Returns a State for one bin, ie. to run a single bin Policy on it.
+
+        Parameters
+        ----------
+        b   : int
+            Position of the bin
+
+        Returns
+        -------
+        State
+            A new State with the bin's placed objects and next object
+
+        """
+        objects = []
+        for n in range(self.num_placed[b]):
+            obj = PlacementObject.__new__(PlacementObject)
+            obj._init_points(self.placed[b, n].copy(), np.eye(3), "random")
+            objects.append(obj)
+        next_object = PlacementObject.__new__(PlacementObject)
+        next_object._init_points(self.next_vertices[b, :self.next_counts[b] + 1].copy(), np.eye(3), "random")
+        return State(self.bin, objects, next_object)
@@ -0,0 +1,46 @@
+import pytest
+from rollout_mdp import *
+
+def test_rollout_ends_when_replay_runs_out(tmp_path):
+    path = str(tmp_path / "replay.jsonl")
+    write_replay(path, [Rectangle(2, 2, np.eye(3)) for _ in range(3)])
+    rng = np.random.default_rng(0)
+    bin = Rectangle(20, 20, np.eye(3))
+    initial_state = State(bin, [], None, ArrivalQueue(ReplaySource(path), 1))
+    state, rewards = rollout(initial_state, RowsPolicy(20, 20, rng), Transition(rng=rng), AreaReward(),
+                             Termination())
+    assert state.next_object is None
+    assert len(state.objects) == 3
+    assert len(rewards) == 3
+
+def test_prefetching_source_reraises_producer_errors():
+    def failing():
+        yield Rectangle(1, 1, np.eye(3))
+        raise ValueError("broken source")
+
+    source = PrefetchingSource(failing())
+    assert next(source).area == pytest.approx(1)
+    with pytest.raises(ValueError, match="broken source"):
+        next(source)
+    with pytest.raises(ValueError):
+        next(source)
+
+def test_rollout_releases_the_arrivals_behind_it(tmp_path):
+    path = str(tmp_path / "replay.jsonl")
+    write_replay(path, [Rectangle(2, 2, np.eye(3)) for _ in range(6)])
+    bin = Rectangle(20, 20, np.eye(3))
+    for release in (True, False):
+        rng = np.random.default_rng(0)
+        arrivals = ArrivalQueue(ReplaySource(path), 2)
+        state, rewards = rollout(State(bin, [], None, arrivals), RowsPolicy(20, 20, rng), Transition(rng=rng),
+                                 AreaReward(), Termination(), max_steps=4, release_arrivals=release)
+        assert state.arrival_position == 4
+        assert len(state.lookahead()) == 1
+        if release:
+            assert arrivals.offset == 4
+            assert len(arrivals.objects) == 2
+            with pytest.raises(IndexError):
+                arrivals.get(3)
+        else:
+            assert arrivals.offset == 0
+            assert len(arrivals.objects) == 6
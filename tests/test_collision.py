@@ -0,0 +1,53 @@
+from shapely.geometry import MultiPoint
+from collision import *
+from collision import _polygons_overlap
+
+def random_convex_ring(rng, center, size):
+    hull = MultiPoint(rng.uniform(-size, size, (8, 2)) + center).convex_hull
+    return np.array(hull.exterior.coords)
+
+def reflect_across_edge(ring, k):
+    """Mirrors a convex ring across the line through its k-th edge, which gives a
+    convex ring touching it along that edge.
+    """
+    a, b = ring[k], ring[k + 1]
+    direction = (b - a) / np.linalg.norm(b - a)
+    relative = ring - a
+    along = relative @ direction
+    return a + 2 * along[:, None] * direction - relative
+
+def test_separating_axis_test_agrees_with_shapely():
+    rng = np.random.default_rng(0)
+    ringsA, ringsB, expected = [], [], []
+    while len(expected) < 500:
+        ringA = random_convex_ring(rng, (0, 0), 2)
+        ringB = random_convex_ring(rng, rng.uniform(-4, 4, 2), 2)
+        area = Polygon(ringA).intersection(Polygon(ringB)).area
+        if (0 < area < 0.001):
+            # too close to touching for the tolerance to be irrelevant
+            continue
+        ringsA.append(ringA)
+        ringsB.append(ringB)
+        expected.append(area > 0)
+    width = max(len(r) for r in ringsA + ringsB)
+    pad = lambda r: np.concatenate([r, np.repeat(r[-1:], width - len(r), axis=0)])
+    result = convex_overlap_pairs(np.array([pad(r) for r in ringsA]), np.array([pad(r) for r in ringsB]))
+    assert result.tolist() == expected
+    assert 0 < sum(expected) < len(expected)
+    for ringA, ringB, overlap in zip(ringsA, ringsB, expected):
+        assert _polygons_overlap(ringA, ringB) == overlap
+
+def test_touching_convex_polygons_do_not_overlap():
+    rng = np.random.default_rng(1)
+    for _ in range(100):
+        ringA = random_convex_ring(rng, (0, 0), 2)
+        k = rng.integers(len(ringA) - 1)
+        ringB = reflect_across_edge(ringA, k)
+        assert not convex_overlap_pairs(ringA[None], ringB[None])[0]
+        assert not _polygons_overlap(ringA, ringB)
+        assert not polygons_overlap(ringA, ringB)
+        # Pushed into each other by much more than the tolerance, they overlap
+        normal = ringB.mean(axis=0) - ringA.mean(axis=0)
+        pushed = ringB - 0.05 * normal / np.linalg.norm(normal)
+        assert convex_overlap_pairs(ringA[None], pushed[None])[0]
+        assert _polygons_overlap(ringA, pushed)
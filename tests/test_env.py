@@ -0,0 +1,28 @@
+from env import *
+
+def play(env, seed, policy_seed, steps):
+    """Resets env, and yields after every step (so that callers can interleave
+    environments) the step's reward and done flag.
+    """
+    env.reset(seed)
+    policy = RandomPolicy(20, 20, np.random.default_rng(policy_seed))
+    for _ in range(steps):
+        observation, reward, done, info = env.step(policy.get_action(env.state))
+        yield reward, done, observation["occupancy"].sum()
+        if done:
+            env.reset(seed)
+
+def test_environments_do_not_share_random_streams():
+    # RowsReward draws from the default generator
+    alone = list(play(BinPlacingEnv(reward=RowsReward()), 1, 10, 12))
+
+    caller_rng = seed_default_rng(123)
+    expected_draw = np.random.default_rng(123).uniform()
+    first = play(BinPlacingEnv(reward=RowsReward()), 1, 10, 12)
+    second = play(BinPlacingEnv(reward=RowsReward()), 2, 20, 12)
+    interleaved = []
+    for a, b in zip(first, second):
+        interleaved.append(a)
+    assert interleaved == alone
+    assert get_rng() is caller_rng
+    assert get_rng().uniform() == expected_draw
@@ -0,0 +1,31 @@
+import gc
+from mcts_policy import *
+
+def start_state(seed):
+    transition = Transition(rng=np.random.default_rng(seed))
+    return State(Rectangle(20, 20, np.eye(3)), [], next(transition.object_stream))
+
+def test_worker_processes_stop_on_exit_and_collection():
+    state = start_state(0)
+    with MCTSPolicy(20, 20, np.random.default_rng(1), budget=4, depth=2, processes=2) as policy:
+        policy.get_action(state)
+        workers = list(policy._pool._pool)
+    assert policy._pool is None
+    assert not any(worker.is_alive() for worker in workers)
+
+    # Without close, the workers stop when the policy is collected
+    policy = MCTSPolicy(20, 20, np.random.default_rng(1), budget=4, depth=2, processes=2)
+    policy.get_action(state)
+    workers, finalizer = list(policy._pool._pool), policy._pool_finalizer
+    del policy
+    gc.collect()
+    assert not finalizer.alive
+    assert not any(worker.is_alive() for worker in workers)
+
+def test_searches_reuse_the_policy_transition():
+    policy = MCTSPolicy(20, 20, np.random.default_rng(1), budget=8, depth=2)
+    transition = policy.transition
+    for seed in range(3):
+        action = policy.get_action(start_state(seed))
+        assert action.transform.shape == (3, 3)
+    assert policy.transition is transition
@@ -0,0 +1,40 @@
+from shapely.geometry import box
+from nfp_policy import *
+
+def rectangle_ring(minx, miny, maxx, maxy, start=0):
+    ring = np.array([(minx, miny), (maxx, miny), (maxx, maxy), (minx, maxy)], dtype=float)
+    ring = np.roll(ring, -start, axis=0)
+    return np.concatenate([ring, ring[:1]])
+
+def test_no_fit_polygon_of_rectangles_is_offset_by_the_reference_points():
+    nfps = NoFitPolygons()
+    # A ⊕ −B for A = [3,7]x[1,3] and B = [0,2]x[0,1] around its reference point (0,0)
+    cases = [(rectangle_ring(3, 1, 7, 3), rectangle_ring(0, 0, 2, 1), box(1, 0, 7, 3)),
+             # The same shapes, translated and from other first points, hit the cache
+             (rectangle_ring(-5, 2, -1, 4, start=2), rectangle_ring(-1, -0.5, 1, 0.5, start=1), box(-6, 1.5, 0, 4.5)),
+             (rectangle_ring(3, 1, 7, 3), rectangle_ring(-1, -0.5, 1, 0.5), box(2, 0.5, 8, 3.5))]
+    for ringA, ringB, expected in cases:
+        nfp = nfps.no_fit_polygon(ringA, ringB)
+        assert nfp.symmetric_difference(expected).area < 1e-9
+        # B overlaps A exactly when its reference point is inside the NFP
+        inside = np.array(expected.representative_point().coords[0])
+        assert polygons_overlap(ringA, ringB + inside)
+        for corner in np.array(expected.exterior.coords[:-1]):
+            assert not polygons_overlap(ringA, ringB + corner)
+
+def test_nfp_placements_never_overlap():
+    bin = Rectangle(20, 20, np.eye(3))
+    for seed in range(3):
+        rng = np.random.default_rng(seed)
+        policy, transition = NFPPolicy(20, 20, rng), Transition(rng=rng)
+        state = State(bin, [], next(transition.object_stream))
+        for _ in range(40):
+            action = policy.get_action(state)
+            if np.array_equal(action.transform, np.eye(3)):
+                break  # fits nowhere
+            state = transition.execute_action(state, action)
+            ring = state.objects.vertices(len(state.objects) - 1)
+            assert contained(ring, bin.vertices())
+            for i in range(len(state.objects) - 1):
+                assert not polygons_overlap(ring, state.objects.vertices(i)), (seed, i)
+        assert len(state.objects) >= 5
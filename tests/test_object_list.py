@@ -0,0 +1,53 @@
+import pytest
+from mdp import *
+
+def placed(x, y, size=1.0):
+    return Rectangle(size, size, np.array([[1, 0, x], [0, 1, y], [0, 0, 1.0]]))
+
+def contents(state):
+    return [tuple(np.round(state.objects.bounds(i), 9)) for i in range(len(state.objects))]
+
+def brute_force_query(objects, bounds):
+    minx, miny, maxx, maxy = bounds
+    return [i for i, o in enumerate(objects)
+            if o[0] <= maxx and minx <= o[2] and o[1] <= maxy and miny <= o[3]]
+
+@pytest.mark.parametrize("num_parent", [0, 1, 31, 32, 33, 70])
+def test_sibling_branches_keep_their_own_objects(num_parent):
+    bin = Rectangle(200, 200, np.eye(3))
+    parent = State(bin, [])
+    for k in range(num_parent):
+        parent.add_object(placed(k % 20, k // 20))
+    expected_parent = contents(parent)
+    parent_area = parent.placed_area()
+    # Query before branching, so that the index is shared with the branches
+    parent.query_indices((-1, -1, 5, 5))
+
+    left, right = parent.copy(), parent.copy()
+    for k in range(40):
+        left.add_object(placed(50 + k, 50))
+    for k in range(3):
+        right.add_object(placed(-50, -50 - 2 * k, 0.5))
+    # A second branch off the right one, and the parent growing after its children
+    right_branch = right.copy()
+    right.add_object(placed(-80, -80))
+    right_branch.add_object(placed(80, 80))
+    parent.add_object(placed(90, -90))
+
+    assert contents(left) == expected_parent + [(49.5 + k, 49.5, 50.5 + k, 50.5) for k in range(40)]
+    assert contents(right) == (expected_parent + [(-50.25, -50.25 - 2 * k, -49.75, -49.75 - 2 * k) for k in range(3)] +
+                               [(-80.5, -80.5, -79.5, -79.5)])
+    assert contents(right_branch) == contents(right)[:-1] + [(79.5, 79.5, 80.5, 80.5)]
+    assert contents(parent) == expected_parent + [(89.5, -90.5, 90.5, -89.5)]
+    assert parent.placed_area(num_parent) == pytest.approx(parent_area)
+    assert left.placed_area() == pytest.approx(parent_area + 40)
+
+    # Every state's index only returns its own objects
+    for state in (parent, left, right, right_branch):
+        for bounds in [(-100, -100, 100, 100), (-1, -1, 5, 5), (45, 45, 95, 55), (-51, -60, -49, -40), (79, 79, 81, 81)]:
+            assert state.query_indices(bounds) == brute_force_query(contents(state), bounds)
+
+    # Digests tell the branches apart, and agree with a list built from scratch
+    assert len({s.digest() for s in (parent, left, right, right_branch)}) == 4
+    rebuilt = State(bin, [left.objects[i] for i in range(len(left.objects))])
+    assert rebuilt.digest() == left.digest()
@@ -0,0 +1,36 @@
+import pytest
+from shapely.geometry import Polygon
+from object_store import *
+from shape_generator import *
+
+def placed_objects():
+    move = np.array([[0, -1, 3], [1, 0, -2], [0, 0, 1.0]])
+    rectangle = Rectangle(4, 2, np.eye(3))
+    rectangle.apply_transform(move)
+    objects = [rectangle, Square(3, move), PlacementObject(Polygon([(0, 0), (2, 0), (1, 3)]), np.eye(3), "triangle"),
+               rectangle.bounding_box()]
+    objects.extend(ObjectStream(np.random.default_rng(0)).take(40))
+    return objects
+
+def test_views_round_trip_class_and_attributes():
+    objects = placed_objects()
+    store = ObjectStore()
+    for obj in objects:
+        store.append(obj)
+    # Views of a branch go through a copied partial chunk as well as shared ones
+    branch = store.prefix(CHUNK_SIZE + 5)
+    for source in (store, branch):
+        for i in range(len(source)):
+            view = source.view(i)
+            original = objects[i]
+            assert type(view) is type(original)
+            assert view.type == original.type
+            np.testing.assert_allclose(view.vertices(), original.vertices())
+            for name in ("length", "width", "side_length", "area"):
+                assert getattr(view, name, None) == getattr(original, name, None)
+    rectangle = store.view(0)
+    assert isinstance(rectangle, Rectangle)
+    assert (rectangle.length, rectangle.width) == (4, 2)
+    assert rectangle.polygon.area == pytest.approx(8)
+    assert type(store.view(2)) is PlacementObject
+    assert not hasattr(store.view(2), "length")
@@ -0,0 +1,44 @@
+from mdp import *
+
+def placed(x, y, size=1.0):
+    return Rectangle(size, size, np.array([[1, 0, x], [0, 1, y], [0, 0, 1.0]]))
+
+def scratch_mask(state):
+    grid = OccupancyGrid(state.bin)
+    for i in range(len(state.objects)):
+        grid.mask[grid._clip(*grid.footprint(state.objects.vertices(i)))] = 1
+    return grid.mask
+
+def test_grids_copy_only_the_tiles_new_objects_touch():
+    parent = State(Rectangle(20, 20, np.eye(3)), [placed(-5, -8), placed(6, 7, 2.0)])
+    parent_grid = parent.occupancy()
+    parent_mask = parent_grid.mask.copy()
+    child, sibling = parent.copy(), parent.copy()
+    child.add_object(placed(0, -9.5))
+    sibling.add_object(placed(3.3, 2.2, 3.0))
+    sibling.add_object(placed(11, 0))  # out of the bin, touches nothing
+    child_grid, sibling_grid = child.occupancy(), sibling.occupancy()
+
+    for state, grid in [(parent, parent_grid), (child, child_grid), (sibling, sibling_grid)]:
+        np.testing.assert_array_equal(grid.mask, scratch_mask(state))
+    np.testing.assert_array_equal(parent_grid.mask, parent_mask)
+    # The child only copied the bottom tile, the sibling the tiles around y = 2.2
+    shared = [a is b for a, b in zip(parent_grid.tiles, child_grid.tiles)]
+    assert shared == [False] + [True] * (len(shared) - 1)
+    rows = np.arange(len(shared)) * TILE_ROWS * parent_grid.resolution - 10
+    touched = (rows < 3.7) & (rows + TILE_ROWS * parent_grid.resolution > 0.7)
+    assert [a is not b for a, b in zip(parent_grid.tiles, sibling_grid.tiles)] == touched.tolist()
+
+def test_tiles_and_mask_answer_alike():
+    rng = np.random.default_rng(0)
+    state = State(Rectangle(20, 20, np.eye(3)), [])
+    for _ in range(6):
+        state = state.copy()
+        state.add_object(placed(*rng.uniform(-10, 10, 2), rng.uniform(0.5, 4)))
+    grid = state.occupancy()
+    candidates = [placed(*rng.uniform(-11, 11, 2), rng.uniform(0.2, 3)).vertices() for _ in range(200)]
+    from_tiles = [grid.is_free(vertices) for vertices in candidates]
+    assert grid.occupied_fraction() == np.count_nonzero(scratch_mask(state)) / grid.mask.size
+    from_mask = [grid.is_free(vertices) for vertices in candidates]
+    assert from_tiles == from_mask
+    assert True in from_tiles and False in from_tiles
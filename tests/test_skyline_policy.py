@@ -0,0 +1,45 @@
+import pytest
+from skyline_policy import *
+
+def skyline_of(boxes):
+    skyline = Skyline.empty(Rectangle(20, 20, np.eye(3)))
+    for bounds in boxes:
+        skyline = skyline.advance(bounds)
+    return skyline
+
+def test_advance_merges_segments_of_the_same_height():
+    skyline = skyline_of([(-10, -10, -6, -7), (-2, -10, 2, -7)])
+    assert skyline.xs.tolist() == [-10, -6, -2, 2]
+    assert skyline.heights.tolist() == [-7, -10, -7, -10]
+    # Filling the gap at the same height merges three segments into one
+    skyline = skyline.advance((-6, -10, -2, -7))
+    assert skyline.xs.tolist() == [-10, 2]
+    assert skyline.heights.tolist() == [-7, -10]
+    # A box above a gap covers the gap, boxes narrower than tol are ignored
+    skyline = skyline.advance((1, -5, 10, -3)).advance((4, 0, 4.00001, 5))
+    assert skyline.xs.tolist() == [-10, 1]
+    assert skyline.heights.tolist() == [-7, -3]
+    assert skyline.count == 5
+
+def test_find_picks_the_lowest_fit_then_the_leftmost():
+    # Heights: -7 on [-10,-6), -10 on [-6,-4), -7 on [-4,0), -9 on [0,10)
+    skyline = skyline_of([(-10, -10, -6, -7), (-4, -10, 0, -7), (0, -10, 10, -9)])
+    assert skyline.find(2, 1, 10) == (-6, -10)
+    # Too wide for the gap at -10: the lowest spot is on the right
+    assert skyline.find(3, 1, 10) == (0, -9)
+    assert skyline.find(10, 1, 10) == (0, -9)
+    # Wider than the right part, it rests on the highest segment under it
+    assert skyline.find(10.5, 1, 10) == (-10, -7)
+    assert skyline.find(20, 1, 10) == (-10, -7)
+    assert skyline.find(21, 1, 10) is None
+    # Too tall to fit anywhere below the top of the bin
+    assert skyline.find(3, 19.5, 10) is None
+    assert skyline.find(3, 19, 10) == (0, -9)
+    assert skyline.find(2, 19.5, 10) == (-6, -10)
+    # Ties go to the leftmost spot
+    assert skyline_of([]).find(4, 1, 10) == (-10, -10)
+
+@pytest.mark.parametrize("length", [0, 0.00005, 0.0001])
+def test_find_places_boxes_no_longer_than_the_tolerance(length):
+    skyline = skyline_of([(-10, -10, -6, -7), (-4, -10, 0, -7), (0, -10, 10, -9)])
+    assert skyline.find(length, 1, 10) == (-6, -10)
@@ -0,0 +1,41 @@
+import math
+import numpy as np
+from spatial_index import *
+
+def random_boxes(rng, count):
+    low = rng.uniform(-20, 20, (count, 2))
+    high = low + rng.uniform(0, 6, (count, 2))
+    return [(a, b, c, d) for (a, b), (c, d) in zip(low, high)]
+
+def brute_force_query(boxes, bounds):
+    minx, miny, maxx, maxy = bounds
+    return [i for i, (a, b, c, d) in enumerate(boxes) if a <= maxx and minx <= c and b <= maxy and miny <= d]
+
+def test_branches_never_see_their_siblings_items():
+    rng = np.random.default_rng(0)
+    parent, parent_boxes = GridIndex(4), []
+    for box in random_boxes(rng, 30):
+        parent.insert(box)
+        parent_boxes.append(box)
+    indexes = [(parent, parent_boxes)]
+    # Branches of every size, with their own items, then branches of branches,
+    # while the indexes they were copied from keep growing
+    for generation in range(2):
+        branches = []
+        for index, boxes in indexes:
+            for count in (0, len(boxes) // 2, len(boxes), None):
+                branches.append((index.copy(count), boxes[:count]))
+            for box in random_boxes(rng, 3):
+                index.insert(box)
+                boxes.append(box)
+        for branch, boxes in branches:
+            for box in random_boxes(rng, rng.integers(0, 8)):
+                assert branch.insert(box) == len(boxes)
+                boxes.append(box)
+        indexes += branches
+
+    queries = random_boxes(rng, 50) + [(-math.inf, -math.inf, math.inf, math.inf), (0, -math.inf, 5, math.inf)]
+    for index, boxes in indexes:
+        assert len(index) == len(boxes)
+        for bounds in queries:
+            assert index.query(bounds) == brute_force_query(boxes, bounds)
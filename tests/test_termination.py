@@ -0,0 +1,25 @@
+from rollout_mdp import *
+
+def test_incremental_done_agrees_with_revalidation():
+    """Along random rollouts, with branches, the incremental check must give the
+    same answer as testing every object again.
+    """
+    outcomes = set()
+    for seed in range(20):
+        rng = np.random.default_rng(seed)
+        rows, scatter = RowsPolicy(20, 20, rng), RandomPolicy(20, 20, rng)
+        transition = Transition(rng=rng)
+        termination = Termination()
+        state = State(Rectangle(20, 20, np.eye(3)), [], next(transition.object_stream))
+        for step in range(30):
+            # Mostly tidy placements, with random ones which may overlap or stick out
+            policy = scatter if rng.uniform() < 0.2 else rows
+            sibling = transition.execute_action(state, scatter.get_action(state))
+            state = transition.execute_action(state, policy.get_action(state))
+            for candidate in (state, sibling):
+                incremental = termination.done(candidate.copy())
+                outcomes.add(incremental)
+                assert incremental == termination.done(candidate.copy(), revalidate=True), (seed, step)
+            if termination.done(state):
+                break
+    assert outcomes == {True, False}
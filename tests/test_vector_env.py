@@ -0,0 +1,45 @@
+from vector_env import *
+
+def translations(offsets):
+    transforms = np.repeat(np.eye(3)[None], len(offsets), axis=0)
+    transforms[:, :2, 2] = offsets
+    return transforms
+
+def test_full_bins_are_not_rewarded():
+    env = VectorEnv(3, rng=np.random.default_rng(0), max_objects=2, autoreset=False)
+    for step, x in enumerate([-5.0, 5.0, 0.0]):
+        areas = [Polygon(env.next_vertices[b]).area for b in range(3)]
+        state, rewards, dones, info = env.step(translations([(x, -5), (x, 0), (x, 5)]))
+        if step < 2:
+            np.testing.assert_allclose(rewards, np.array(areas) / 400)
+        else:
+            # Out of room: nothing placed, nothing rewarded
+            assert np.all(rewards == 0)
+        assert dones.tolist() == [step >= 1] * 3
+        assert state.num_placed.tolist() == [min(step + 1, 2)] * 3
+        assert info == {}
+
+def test_autoreset_returns_the_final_observation():
+    resetting = VectorEnv(4, rng=np.random.default_rng(1), max_objects=8)
+    manual = VectorEnv(4, rng=np.random.default_rng(1), max_objects=8, autoreset=False)
+    offsets = np.random.default_rng(2).uniform(-6, 6, (12, 4, 2))
+    num_done = 0
+    for step_offsets in offsets:
+        state, rewards, dones, info = resetting.step(translations(step_offsets))
+        expected, expected_rewards, expected_dones, _ = manual.step(translations(step_offsets))
+        np.testing.assert_array_equal(rewards, expected_rewards)
+        np.testing.assert_array_equal(dones, expected_dones)
+        assert info["_final_observation"] is dones
+        final = info["final_observation"]
+        # The terminal states of the done bins, as the bins which are not reset leave them
+        np.testing.assert_array_equal(final.num_placed, expected.num_placed[dones])
+        np.testing.assert_array_equal(final.placed_area, expected.placed_area[dones])
+        np.testing.assert_array_equal(final.placed, expected.placed[dones])
+        np.testing.assert_array_equal(final.next_vertices, expected.next_vertices[dones])
+        assert np.all(final.num_placed > 0)
+        assert np.all(state.num_placed[dones] == 0)
+        np.testing.assert_array_equal(state.num_placed[~dones], expected.num_placed[~dones])
+        manual.num_placed[dones] = 0
+        manual.placed_area[dones] = 0
+        num_done += np.sum(dones)
+    assert 0 < num_done < offsets.shape[0] * 4